@@ -5,9 +5,11 @@ import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
 import os
+import io
+import csv
 import json
-from utils.data_utils import load_student_data, load_parent_observations, save_prediction_data, save_parent_observation
-from utils.model_utils import load_model, make_prediction
+from utils.data_utils import load_student_data, load_parent_observations, save_prediction_data, save_parent_observation, iter_student_data, get_data_summary
+from utils.model_utils import get_model_manager, get_model_version, make_prediction
 
 def get_text(key, language='English'):
     """Get localized text based on language setting"""
@@ -360,13 +362,20 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+@st.cache_resource
+def get_model_resource():
+    """Share the process-wide model manager across sessions and warm it on first use"""
+    manager = get_model_manager()
+    manager.get_model()
+    return manager
+
 # Check offline mode
 @st.cache_data
 def check_offline_mode():
     """Check if application can work offline"""
     try:
         # Try to load model and data
-        model = load_model()
+        model = get_model_resource().get_model()
         data = load_student_data()
         return False, "Online Mode"
     except:
@@ -787,8 +796,8 @@ def render_dashboard():
     
     # Metrics grid
     try:
-        data = load_student_data()
-        total_students = len(data) if data else 0
+        # Cached row counts rather than loading every prediction
+        total_students = get_data_summary().get('total_students', 0)
         at_risk = int(total_students * 0.25) if total_students > 0 else 0
         on_track = total_students - at_risk
         interventions = int(at_risk * 0.6) if at_risk > 0 else 0
@@ -971,7 +980,8 @@ def render_assessment():
                         'risk_level': risk_level,
                         'probability': probability,
                         'risk_color': risk_color,
-                        'student_data': student_data
+                        'student_data': student_data,
+                        'model_version': get_model_version()
                     }
                 else:
                     # Offline mode - simple rule-based assessment
@@ -994,7 +1004,8 @@ def render_assessment():
                         'risk_level': risk_level,
                         'probability': probability,
                         'risk_color': risk_color,
-                        'student_data': student_data
+                        'student_data': student_data,
+                        'model_version': 'rule-based'
                     }
                 
                 st.rerun()
@@ -1115,6 +1126,7 @@ def render_assessment():
                         'prediction': 1 if result['risk_level'] == 'High Risk' else 0,
                         'probability': result['probability'],
                         'risk_level': result['risk_level'],
+                        'model_version': result.get('model_version'),
                         'timestamp': datetime.now().isoformat(),
                         'recommendations': get_recommendations(result['risk_level'])
                     }
@@ -2072,90 +2084,98 @@ def render_bottom_navigation():
     with col2:
         if st.button(get_text('export_data', current_language), key="export_data", help="Export assessment data as CSV"):
             try:
-                # Load actual saved data
-                student_data = load_student_data()
+                # Assessments are streamed from the database straight into the
+                # CSV files rather than loaded into a list and a DataFrame first
                 parent_data = load_parent_observations()
+                assessment_columns = ['Type', 'Date', 'Student_Name', 'Grade_Level', 'Math_Score', 'Reading_Score',
+                                      'Writing_Score', 'Attendance', 'Behavior', 'Literacy', 'Risk_Level',
+                                      'Probability', 'Recommendations']
+                tracker_columns = ['Type', 'Date', 'Student_Name', 'Homework_Completion', 'Reading_Time',
+                                   'Focus_Level', 'Behavior_Rating', 'Mood_Rating', 'Sleep_Hours', 'Energy_Level',
+                                   'Screen_Time', 'Physical_Activity', 'Learning_Wins', 'Challenges_Faced']
+                all_columns = assessment_columns + [col for col in tracker_columns if col not in assessment_columns]
                 
-                if student_data or parent_data:
-                    # Create comprehensive export data
-                    export_records = []
-                    
-                    # Add assessment data
-                    for record in student_data:
-                        export_records.append({
-                            'Type': 'Assessment',
-                            'Date': record.get('timestamp', ''),
-                            'Student_Name': record.get('student_name', ''),
-                            'Grade_Level': record.get('grade_level', ''),
-                            'Math_Score': record.get('math_score', ''),
-                            'Reading_Score': record.get('reading_score', ''),
-                            'Writing_Score': record.get('writing_score', ''),
-                            'Attendance': record.get('attendance', ''),
-                            'Behavior': record.get('behavior', ''),
-                            'Literacy': record.get('literacy', ''),
-                            'Risk_Level': record.get('risk_level', ''),
-                            'Probability': record.get('probability', ''),
-                            'Recommendations': ', '.join(record.get('recommendations', []))
-                        })
+                all_file, assessment_file, tracker_file = io.StringIO(), io.StringIO(), io.StringIO()
+                all_writer = csv.DictWriter(all_file, all_columns, lineterminator='\n')
+                assessment_writer = csv.DictWriter(assessment_file, assessment_columns, lineterminator='\n')
+                tracker_writer = csv.DictWriter(tracker_file, tracker_columns, lineterminator='\n')
+                for writer in (all_writer, assessment_writer, tracker_writer):
+                    writer.writeheader()
+                
+                # Add assessment data
+                assessment_count = 0
+                for record in iter_student_data():
+                    row = {
+                        'Type': 'Assessment',
+                        'Date': record.get('timestamp', ''),
+                        'Student_Name': record.get('student_name', ''),
+                        'Grade_Level': record.get('grade_level', ''),
+                        'Math_Score': record.get('math_score', ''),
+                        'Reading_Score': record.get('reading_score', ''),
+                        'Writing_Score': record.get('writing_score', ''),
+                        'Attendance': record.get('attendance', ''),
+                        'Behavior': record.get('behavior', ''),
+                        'Literacy': record.get('literacy', ''),
+                        'Risk_Level': record.get('risk_level', ''),
+                        'Probability': record.get('probability', ''),
+                        'Recommendations': ', '.join(record.get('recommendations', []))
+                    }
+                    all_writer.writerow(row)
+                    assessment_writer.writerow(row)
+                    assessment_count += 1
+                
+                # Add parent tracker data
+                for record in parent_data:
+                    row = {
+                        'Type': 'Parent_Tracker',
+                        'Date': record.get('date', ''),
+                        'Student_Name': record.get('child_name', ''),
+                        'Homework_Completion': record.get('homework_completion', ''),
+                        'Reading_Time': record.get('reading_time', ''),
+                        'Focus_Level': record.get('focus_level', ''),
+                        'Behavior_Rating': record.get('behavior_rating', ''),
+                        'Mood_Rating': record.get('mood_rating', ''),
+                        'Sleep_Hours': record.get('sleep_hours', ''),
+                        'Energy_Level': record.get('energy_level', ''),
+                        'Screen_Time': record.get('screen_time', ''),
+                        'Physical_Activity': record.get('physical_activity', ''),
+                        'Learning_Wins': record.get('learning_wins', ''),
+                        'Challenges_Faced': record.get('challenges_faced', '')
+                    }
+                    all_writer.writerow(row)
+                    tracker_writer.writerow(row)
+                
+                if assessment_count or parent_data:
+                    # Combined data download
+                    st.download_button(
+                        label="Download All Data (CSV)",
+                        data=all_file.getvalue(),
+                        file_name=f'eduscan_all_data_{datetime.now().strftime("%Y%m%d_%H%M")}.csv',
+                        mime='text/csv',
+                        key="download_csv_all"
+                    )
                     
-                    # Add parent tracker data
-                    for record in parent_data:
-                        export_records.append({
-                            'Type': 'Parent_Tracker',
-                            'Date': record.get('date', ''),
-                            'Student_Name': record.get('child_name', ''),
-                            'Homework_Completion': record.get('homework_completion', ''),
-                            'Reading_Time': record.get('reading_time', ''),
-                            'Focus_Level': record.get('focus_level', ''),
-                            'Behavior_Rating': record.get('behavior_rating', ''),
-                            'Mood_Rating': record.get('mood_rating', ''),
-                            'Sleep_Hours': record.get('sleep_hours', ''),
-                            'Energy_Level': record.get('energy_level', ''),
-                            'Screen_Time': record.get('screen_time', ''),
-                            'Physical_Activity': record.get('physical_activity', ''),
-                            'Learning_Wins': record.get('learning_wins', ''),
-                            'Challenges_Faced': record.get('challenges_faced', '')
-                        })
+                    # Separate downloads for each data type
+                    if assessment_count:
+                        st.download_button(
+                            label="Download Assessments Only (CSV)",
+                            data=assessment_file.getvalue(),
+                            file_name=f'eduscan_assessments_{datetime.now().strftime("%Y%m%d_%H%M")}.csv',
+                            mime='text/csv',
+                            key="download_assessments"
+                        )
                     
-                    if export_records:
-                        df = pd.DataFrame(export_records)
-                        csv = df.to_csv(index=False)
-                        # Combined data download
+                    if parent_data:
                         st.download_button(
-                            label="Download All Data (CSV)",
-                            data=csv,
-                            file_name=f'eduscan_all_data_{datetime.now().strftime("%Y%m%d_%H%M")}.csv',
+                            label="Download Parent Tracker Data (CSV)",
+                            data=tracker_file.getvalue(),
+                            file_name=f'eduscan_parent_tracker_{datetime.now().strftime("%Y%m%d_%H%M")}.csv',
                             mime='text/csv',
-                            key="download_csv_all"
+                            key="download_tracker"
                         )
-                        
-                        # Separate downloads for each data type
-                        if student_data:
-                            assessment_df = pd.DataFrame([r for r in export_records if r['Type'] == 'Assessment'])
-                            assessment_csv = assessment_df.to_csv(index=False)
-                            st.download_button(
-                                label="Download Assessments Only (CSV)",
-                                data=assessment_csv,
-                                file_name=f'eduscan_assessments_{datetime.now().strftime("%Y%m%d_%H%M")}.csv',
-                                mime='text/csv',
-                                key="download_assessments"
-                            )
-                        
-                        if parent_data:
-                            tracker_df = pd.DataFrame([r for r in export_records if r['Type'] == 'Parent_Tracker'])
-                            tracker_csv = tracker_df.to_csv(index=False)
-                            st.download_button(
-                                label="Download Parent Tracker Data (CSV)",
-                                data=tracker_csv,
-                                file_name=f'eduscan_parent_tracker_{datetime.now().strftime("%Y%m%d_%H%M")}.csv',
-                                mime='text/csv',
-                                key="download_tracker"
-                            )
-                        
-                        st.success(f"Ready to download {len(export_records)} total records!")
-                        st.info(f"📊 {len(student_data)} assessments | 👨‍👩‍👧‍👦 {len(parent_data)} tracker entries")
-                    else:
-                        st.warning("No data available to export")
+                    
+                    st.success(f"Ready to download {assessment_count + len(parent_data)} total records!")
+                    st.info(f"📊 {assessment_count} assessments | 👨‍👩‍👧‍👦 {len(parent_data)} tracker entries")
                 else:
                     st.info("No saved data found. Complete some assessments or tracker entries first.")
                     
@@ -0,0 +1,6 @@
+"""
+Benchmarks for the EduScan storage and model code
+
+They are kept out of the installed utils and database packages. Run them
+from the repository root, e.g. python -m benchmarks.file_store stores
+"""
@@ -0,0 +1,114 @@
+"""
+PostgreSQL connection pool benchmark (utils/db_utils)
+
+Needs DATABASE_URL. Compares borrowing a pooled connection with opening one
+per call, and shows how the pool queues threads when it is exhausted.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import psycopg2
+
+from utils import db_utils
+
+
+def benchmark_checkout(calls=200):
+    """
+    Time one trivial query with a pooled connection and with a new connection per call
+
+    Returns:
+        dict: average milliseconds per call for both
+    """
+    dsn = os.environ['DATABASE_URL']
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        conn = psycopg2.connect(dsn, connect_timeout=db_utils.CONNECT_TIMEOUT)
+        try:
+            conn.cursor().execute("SELECT 1")
+        finally:
+            conn.close()
+    connect_ms = (time.perf_counter() - start) / calls * 1000
+
+    # The first checkout creates the pool
+    with db_utils.db_connection() as conn:
+        conn.cursor().execute("SELECT 1")
+    start = time.perf_counter()
+    for _ in range(calls):
+        with db_utils.db_connection() as conn:
+            conn.cursor().execute("SELECT 1")
+            conn.rollback()
+    pooled_ms = (time.perf_counter() - start) / calls * 1000
+
+    return {'calls': calls, 'connect_per_call_ms': connect_ms, 'pooled_ms': pooled_ms}
+
+
+def benchmark_contention(threads=16, max_size=10, hold_seconds=0.05, timeout=5):
+    """
+    Let more threads than the pool has connections hold one each for hold_seconds
+
+    Returns:
+        dict: the pool's statistics afterwards (waits, timeouts, wait times)
+    """
+    pool = db_utils.ConnectionPool(os.environ['DATABASE_URL'], minconn=1, maxconn=max_size, timeout=timeout)
+    errors = []
+
+    def hold():
+        try:
+            conn = pool.getconn()
+        except db_utils.PoolTimeout as e:
+            errors.append(e)
+            return
+        try:
+            time.sleep(hold_seconds)
+        finally:
+            pool.putconn(conn)
+
+    try:
+        workers = [threading.Thread(target=hold) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        stats = pool.get_stats()
+    finally:
+        pool.closeall()
+
+    stats['threads'] = threads
+    stats['failed_checkouts'] = len(errors)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the PostgreSQL connection pool")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    checkout_parser = commands.add_parser('checkout', help="Pooled connection against connect-per-call")
+    checkout_parser.add_argument('--calls', type=int, default=200)
+
+    contention_parser = commands.add_parser('contention', help="More threads than pooled connections")
+    contention_parser.add_argument('--threads', type=int, default=16)
+    contention_parser.add_argument('--max-size', type=int, default=10)
+    contention_parser.add_argument('--hold', type=float, default=0.05, help="Seconds each thread holds its connection")
+
+    args = parser.parse_args(argv)
+
+    if 'DATABASE_URL' not in os.environ:
+        print("Error: DATABASE_URL is not set")
+        return 1
+
+    if args.command == 'checkout':
+        results = benchmark_checkout(args.calls)
+    elif args.command == 'contention':
+        results = benchmark_contention(args.threads, args.max_size, args.hold)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
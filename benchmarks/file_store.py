@@ -0,0 +1,159 @@
+"""
+File store benchmarks: the legacy JSON array store against the JSONL store,
+and retention on one JSONL file against month partitions
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from utils.jsonl_store import JsonlStore, PartitionedJsonlStore
+
+
+def _json_array_append(path, record):
+    """The legacy save path: read the whole array, append, rewrite it"""
+    existing = []
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            existing = json.load(f)
+    existing.append(record)
+    with open(path, 'w') as f:
+        json.dump(existing, f, indent=2)
+
+
+def benchmark_stores(sizes=(10_000, 100_000, 1_000_000), saves=5, fsync_policy='always'):
+    """
+    Compare the JSON array store with the JSONL store at several history sizes
+
+    Returns:
+        list: one dict per size with average save time and full load time (ms)
+    """
+    record = {
+        'timestamp': '2025-01-01T00:00:00', 'student_name': 'Benchmark Student', 'grade_level': '3',
+        'math_score': 70, 'reading_score': 65, 'writing_score': 60, 'attendance': 90,
+        'behavior': 3, 'literacy': 6, 'prediction': 0, 'probability': 0.25,
+        'risk_level': 'Low Risk', 'notes': ''
+    }
+    results = []
+    directory = tempfile.mkdtemp(prefix='eduscan_store_bench_')
+    try:
+        for size in sizes:
+            json_path = os.path.join(directory, f'records_{size}.json')
+            jsonl_path = os.path.join(directory, f'records_{size}.jsonl')
+            with open(json_path, 'w') as f:
+                json.dump([record] * size, f, indent=2)
+            store = JsonlStore(jsonl_path, fsync_policy=fsync_policy)
+            store.rewrite([record] * size)
+
+            start = time.perf_counter()
+            for _ in range(saves):
+                _json_array_append(json_path, record)
+            json_save = (time.perf_counter() - start) / saves
+
+            start = time.perf_counter()
+            for _ in range(saves):
+                store.append(record)
+            jsonl_save = (time.perf_counter() - start) / saves
+
+            start = time.perf_counter()
+            with open(json_path, 'r') as f:
+                json.load(f)
+            json_load = time.perf_counter() - start
+
+            start = time.perf_counter()
+            store.load()
+            jsonl_load = time.perf_counter() - start
+
+            results.append({
+                'records': size,
+                'json_save_ms': json_save * 1000,
+                'jsonl_save_ms': jsonl_save * 1000,
+                'json_load_ms': json_load * 1000,
+                'jsonl_load_ms': jsonl_load * 1000
+            })
+            os.remove(json_path)
+            os.remove(jsonl_path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return results
+
+
+def benchmark_retention(months=24, records_per_month=20_000, keep_days=90):
+    """
+    Compare retention on a single JSONL file with dropping month partitions
+
+    The single-file path is the previous clean_old_data: parse every record's
+    timestamp and rewrite the file.
+
+    Returns:
+        dict: record count and timings in milliseconds
+    """
+    now = datetime.now()
+    cutoff = now - timedelta(days=keep_days)
+    records = []
+    for month in range(months):
+        day = now - timedelta(days=30 * month)
+        timestamp = day.replace(hour=12).isoformat()
+        records.extend({'timestamp': timestamp, 'student_name': f'Student {i}', 'probability': 0.2}
+                       for i in range(records_per_month))
+
+    def keep(batch):
+        return [record for record in batch if datetime.fromisoformat(record['timestamp']) > cutoff]
+
+    directory = tempfile.mkdtemp(prefix='eduscan_retention_bench_')
+    try:
+        single = JsonlStore(os.path.join(directory, 'records.jsonl'), fsync_policy='never')
+        single.rewrite(records)
+        start = time.perf_counter()
+        single.update(keep)
+        single_ms = (time.perf_counter() - start) * 1000
+
+        partitioned = PartitionedJsonlStore(os.path.join(directory, 'partitions'), fsync_policy='never')
+        partitioned.rewrite(records)
+        start = time.perf_counter()
+        result = partitioned.drop_before(cutoff, keep)
+        partitioned_ms = (time.perf_counter() - start) * 1000
+
+        return {
+            'records': len(records),
+            'removed': result['removed'],
+            'dropped_partitions': len(result['dropped_partitions']),
+            'single_file_ms': single_ms,
+            'partitioned_ms': partitioned_ms
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the EduScan file stores")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    stores_parser = commands.add_parser('stores', help="JSON array store against the JSONL store")
+    stores_parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    stores_parser.add_argument('--saves', type=int, default=5)
+    stores_parser.add_argument('--fsync', default='always', choices=['always', 'interval', 'never'])
+
+    retention_parser = commands.add_parser('retention', help="Single-file retention against dropping partitions")
+    retention_parser.add_argument('--months', type=int, default=24)
+    retention_parser.add_argument('--records-per-month', type=int, default=20_000)
+    retention_parser.add_argument('--keep-days', type=int, default=90)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'stores':
+        results = benchmark_stores(sizes=args.sizes, saves=args.saves, fsync_policy=args.fsync)
+    elif args.command == 'retention':
+        results = benchmark_retention(args.months, args.records_per_month, args.keep_days)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
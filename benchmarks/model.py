@@ -0,0 +1,121 @@
+"""
+Model serving benchmarks: risk table lookups against live inference, and
+cold loads of the pickle against the memory-mapped artifact
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+
+from utils import model_utils
+from utils.model_artifact import MANIFEST_NAME, load_artifact
+
+
+def benchmark_risk_table(n_samples=2000, backend=None, seed=0):
+    """
+    Compare risk table lookups with live single-row inference
+
+    Returns:
+        dict: build time and size of the table plus per-call latency of
+            table lookups and of live inference, in microseconds
+    """
+    model_package = model_utils.get_cached_model()
+    table = model_utils.get_risk_table(model_utils.get_model_manager().model_hash)
+    if table is None:
+        raise ValueError("No risk table for the current model, run build_risk_table() first")
+
+    rng = np.random.default_rng(seed)
+    grid = table.manifest['grid']
+    samples = [
+        [axis['low'] + axis['step'] * rng.integers(0, size) for axis, size in zip(grid, table.manifest['shape'])]
+        for _ in range(n_samples)
+    ]
+
+    start = time.perf_counter()
+    for values in samples:
+        table.lookup(values)
+    lookup_seconds = (time.perf_counter() - start) / n_samples
+
+    start = time.perf_counter()
+    for values in samples:
+        model_utils._score_features(model_package, np.array([values], dtype=float), backend)
+    live_seconds = (time.perf_counter() - start) / n_samples
+
+    return {
+        'entries': table.manifest['entries'],
+        'build_seconds': table.manifest['build_seconds'],
+        'size_bytes': table.manifest['size_bytes'],
+        'lookup_us': lookup_seconds * 1e6,
+        'live_inference_us': live_seconds * 1e6,
+        'speedup': live_seconds / lookup_seconds if lookup_seconds else None
+    }
+
+
+def benchmark_model_load(repeats=5):
+    """
+    Compare cold-load time of the pickle file and the array artifact
+
+    Returns:
+        dict: best-of-repeats load time in milliseconds for each format
+    """
+    pickle_path = model_utils._pickle_source_path()
+    artifact_directory = model_utils.get_artifact_directory()
+    if not os.path.exists(os.path.join(artifact_directory, MANIFEST_NAME)):
+        raise ValueError("No model artifact found, run export_model_artifact() first")
+
+    def best_of(load):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            load()
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000
+
+    def load_pickle():
+        with open(pickle_path, 'rb') as f:
+            pickle.load(f)
+
+    pickle_ms = best_of(load_pickle)
+    artifact_ms = best_of(lambda: load_artifact(artifact_directory))
+
+    return {
+        'pickle_ms': pickle_ms,
+        'artifact_ms': artifact_ms,
+        'speedup': pickle_ms / artifact_ms if artifact_ms else None
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark model serving")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    table_parser = commands.add_parser('risk-table', help="Risk table lookups against live inference")
+    table_parser.add_argument('--samples', type=int, default=2000)
+    table_parser.add_argument('--backend', choices=['sklearn', 'compiled', 'fused'])
+    table_parser.add_argument('--build', action='store_true', help="Build the risk table first")
+
+    load_parser = commands.add_parser('load', help="Pickle against the memory-mapped artifact")
+    load_parser.add_argument('--repeats', type=int, default=5)
+    load_parser.add_argument('--export', action='store_true', help="Export the model artifact first")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'risk-table':
+        if args.build:
+            model_utils.build_risk_table(backend=args.backend)
+        results = benchmark_risk_table(args.samples, args.backend)
+    elif args.command == 'load':
+        if args.export:
+            model_utils.export_model_artifact()
+        results = benchmark_model_load(args.repeats)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Parent Tracker benchmark: the observation index against scanning every
+family's records (utils/observation_index)
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from utils.observation_index import ObservationIndex
+
+
+def _generate_observations(families, days):
+    """Synthetic daily logs for the benchmark"""
+    first_day = date.today() - timedelta(days=days - 1)
+    rng = random.Random(0)
+    observations = []
+    for day in range(days):
+        obs_date = (first_day + timedelta(days=day)).isoformat()
+        for family in range(families):
+            observations.append({
+                'child_name': f'Child {family}',
+                'date': obs_date,
+                'homework_completion': rng.randint(0, 100),
+                'reading_time': rng.randint(0, 60),
+                'focus_level': 'Good',
+                'subjects_struggled': [],
+                'behavior_rating': rng.randint(1, 5),
+                'mood_rating': rng.randint(1, 5),
+                'sleep_hours': 9.0,
+                'energy_level': 'Normal',
+                'screen_time': 2.0,
+                'physical_activity': 30,
+                'medication_taken': False,
+                'timestamp': f'{obs_date}T20:00:00'
+            })
+    return observations
+
+
+def benchmark_tracker(families=500, days=730, lookups=50):
+    """
+    Compare the Parent Tracker's data step with and without the index
+
+    Uses families x days daily observations. The scan is the previous page
+    code: filter every observation by child and parse its date. Both sides
+    start from an already loaded list, so file or database reads are not
+    part of the timing.
+
+    Returns:
+        dict: timings in milliseconds per lookup
+    """
+    observations = _generate_observations(families, days)
+    rng = random.Random(1)
+    today = date.today()
+
+    start = time.perf_counter()
+    index = ObservationIndex(observations)
+    build = time.perf_counter() - start
+
+    queries = [(f'Child {rng.randrange(families)}', today - timedelta(days=30), today) for _ in range(lookups)]
+
+    def scan_range(child_name, start_date, end_date):
+        return [obs for obs in observations
+                if obs.get('child_name') == child_name
+                and start_date <= date.fromisoformat(obs['date']) <= end_date]
+
+    def scan_log(child_name):
+        child_observations = [obs for obs in observations if obs.get('child_name') == child_name]
+        child_observations.sort(key=lambda x: x['date'], reverse=True)
+        return child_observations
+
+    timings = {}
+    for name, fn in (
+        ('scan_range', lambda q: scan_range(*q)),
+        ('index_range', lambda q: index.query(*q)),
+        ('scan_log', lambda q: scan_log(q[0])),
+        ('index_log', lambda q: index.query(q[0])[::-1])
+    ):
+        start = time.perf_counter()
+        for query in queries:
+            fn(query)
+        timings[f'{name}_ms'] = (time.perf_counter() - start) / lookups * 1000
+
+    start = time.perf_counter()
+    for query in queries:
+        index.add(dict(observations[0], child_name=query[0], date=today.isoformat()))
+    timings['index_add_ms'] = (time.perf_counter() - start) / lookups * 1000
+
+    return {'observations': len(observations), 'index_build_ms': build * 1000, **timings}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Parent Tracker observation index")
+    parser.add_argument('--families', type=int, default=500)
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--lookups', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    print(json.dumps(benchmark_tracker(args.families, args.days, args.lookups), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+PostgreSQL backend benchmarks (utils/db_utils)
+
+Need DATABASE_URL. They write benchmark students (names starting with
+'eduscan-benchmark-') and delete them again afterwards.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from utils import db_utils
+from utils.repository import ANALYTICS_COLUMNS
+from utils.table_counters import combined_stats_query, stats_from_row
+
+
+def benchmark_bulk_insert(rows=10_000, students=500):
+    """
+    Compare save_prediction_to_db row by row with save_predictions_bulk
+
+    Writes `rows` predictions each way for benchmark students (names starting
+    with 'eduscan-benchmark-') and deletes them again afterwards.
+
+    Returns:
+        dict: seconds and rows per second for both paths
+    """
+    now = datetime.now().isoformat()
+    records = [
+        {'timestamp': now, 'student_name': f'eduscan-benchmark-{i % students}', 'grade_level': '3',
+         'math_score': 70, 'reading_score': 65, 'writing_score': 60, 'attendance': 90, 'behavior': 3,
+         'literacy': 6, 'prediction': 0, 'probability': 0.25, 'risk_level': 'Low Risk', 'notes': ''}
+        for i in range(rows)
+    ]
+
+    results = {'rows': rows}
+    try:
+        db_utils.delete_benchmark_students()
+        start = time.perf_counter()
+        saved = sum(1 for record in records if db_utils.save_prediction_to_db(record))
+        results['per_row_seconds'] = time.perf_counter() - start
+        results['per_row_saved'] = saved
+        db_utils.delete_benchmark_students()
+
+        start = time.perf_counter()
+        results['bulk_saved'] = db_utils.save_predictions_bulk(records)
+        results['bulk_seconds'] = time.perf_counter() - start
+    finally:
+        db_utils.delete_benchmark_students()
+
+    results['per_row_rows_per_second'] = rows / results['per_row_seconds']
+    results['bulk_rows_per_second'] = rows / results['bulk_seconds']
+    results['speedup'] = results['per_row_seconds'] / results['bulk_seconds']
+    return results
+
+
+def _generate_benchmark_predictions(rows, students):
+    """Generate `rows` predictions server-side for `students` benchmark students"""
+    with db_utils.db_connection() as conn:
+        cur = conn.cursor()
+        # Generating a million rows can outlast the pool's statement timeout
+        cur.execute("SET LOCAL statement_timeout = 0")
+        cur.execute("""
+            INSERT INTO students (name, grade_level)
+            SELECT 'eduscan-benchmark-' || g, '3' FROM generate_series(0, %s - 1) g
+        """, (students,))
+        cur.execute("""
+            WITH ids AS (
+                SELECT array_agg(id ORDER BY id) AS student_ids FROM students
+                WHERE name LIKE 'eduscan-benchmark-%%'
+            ), scored AS (
+                SELECT g, random() * 100 AS math_score, random() AS noise FROM generate_series(0, %s - 1) g
+            )
+            INSERT INTO predictions (
+                student_id, math_score, reading_score, writing_score, attendance,
+                behavior, literacy, prediction, probability, risk_level, notes, timestamp
+            )
+            SELECT student_ids[1 + g %% %s], math_score, math_score * 0.6 + noise * 40,
+                   math_score * 0.3 + noise * 70, 60 + noise * 40, 1 + (g %% 5), 1 + (g %% 10),
+                   (math_score < 40)::int, 1 - math_score / 100,
+                   CASE WHEN math_score < 30 THEN 'High Risk' WHEN math_score < 60 THEN 'Medium Risk' ELSE 'Low Risk' END,
+                   '', now() - (g || ' minutes')::interval
+            FROM scored, ids
+        """, (rows, students))
+        cur.execute("ANALYZE predictions")
+        conn.commit()
+
+
+def _analytics_with_pandas(student_name):
+    """The Historical Analysis computations as they ran before, on a full load"""
+    df = pd.DataFrame(db_utils.load_student_predictions())
+    df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
+    trends = df.groupby([df['timestamp'].dt.date, 'risk_level']).size().unstack(fill_value=0)
+    correlations = df[ANALYTICS_COLUMNS].corr()
+    progress = df[df['student_name'] == student_name].sort_values('timestamp')
+    return trends, correlations, progress
+
+
+def benchmark_analytics(rows=1_000_000, students=1000):
+    """
+    Compare the SQL analytics with loading every prediction into pandas
+
+    Generates `rows` predictions server-side for benchmark students (names
+    starting with 'eduscan-benchmark-'), times risk trends, the correlation
+    matrix and one student's progress both ways, then deletes them again.
+
+    Returns:
+        dict: seconds per analysis for both paths and the largest correlation difference
+    """
+    student_name = 'eduscan-benchmark-7'
+    results = {'rows': rows}
+    try:
+        db_utils.delete_benchmark_students()
+        _generate_benchmark_predictions(rows, students)
+
+        start = time.perf_counter()
+        trends, correlations, progress = _analytics_with_pandas(student_name)
+        results['pandas_seconds'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        db_utils.get_risk_trend_counts('day')
+        results['sql_trends_seconds'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sql_correlations = db_utils.get_score_correlations()
+        results['sql_correlation_seconds'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sql_progress = list(db_utils.iter_student_predictions(student_name=student_name))
+        results['sql_progress_seconds'] = time.perf_counter() - start
+
+        results['sql_seconds'] = results['sql_trends_seconds'] + results['sql_correlation_seconds'] + results['sql_progress_seconds']
+        results['speedup'] = results['pandas_seconds'] / results['sql_seconds']
+        results['max_correlation_difference'] = max(
+            float(abs(correlations.loc[a, b] - sql_correlations[(a, b)]))
+            for a in ANALYTICS_COLUMNS for b in ANALYTICS_COLUMNS
+        )
+        results['progress_rows_match'] = len(sql_progress) == len(progress)
+        return results
+    finally:
+        db_utils.delete_benchmark_students()
+
+
+def benchmark_database_stats(rows=1_000_000, students=1000):
+    """
+    Compare get_database_stats as six separate COUNT/MAX queries with the
+    combined query, planner estimates, the row counters and the TTL cache
+
+    Generates `rows` benchmark predictions first and deletes them afterwards.
+
+    Returns:
+        dict: seconds per call for each variant and whether the counters match COUNT(*)
+    """
+    legacy_queries = [
+        "SELECT COUNT(*) FROM students", "SELECT COUNT(*) FROM predictions",
+        "SELECT COUNT(*) FROM parent_observations", "SELECT COUNT(*) FROM users",
+        "SELECT MAX(timestamp) FROM predictions", "SELECT MAX(timestamp) FROM parent_observations"
+    ]
+
+    def timed(run, repeat=5):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = run()
+        return (time.perf_counter() - start) / repeat, result
+
+    def legacy():
+        with db_utils.db_connection() as conn:
+            cur = conn.cursor()
+            for query in legacy_queries:
+                cur.execute(query)
+                cur.fetchone()
+
+    def combined(estimate):
+        with db_utils.db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(combined_stats_query(db_utils._counted_tables, estimate))
+            return stats_from_row(db_utils._counted_tables, cur.fetchone())
+
+    results = {'rows': rows}
+    try:
+        db_utils.delete_benchmark_students()
+        _generate_benchmark_predictions(rows, students)
+
+        results['legacy_seconds'], _ = timed(legacy)
+        results['combined_seconds'], exact = timed(lambda: combined(False))
+        results['estimate_seconds'], estimated = timed(lambda: combined(True))
+        results['counters_seconds'], counted = timed(lambda: db_utils._query_database_stats(False))
+        db_utils.clear_caches()
+        db_utils.get_database_stats()
+        results['cached_seconds'], _ = timed(db_utils.get_database_stats, repeat=1000)
+
+        results['counters_match'] = counted == exact
+        results['estimate_error'] = abs(estimated['total_predictions'] - exact['total_predictions']) / exact['total_predictions']
+        results['speedup'] = results['legacy_seconds'] / results['counters_seconds']
+        return results
+    finally:
+        db_utils.delete_benchmark_students()
+        db_utils.clear_caches()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the PostgreSQL backend")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    bulk_parser = commands.add_parser('bulk-insert', help="Row-by-row saves against save_predictions_bulk")
+    bulk_parser.add_argument('--rows', type=int, default=10_000)
+    bulk_parser.add_argument('--students', type=int, default=500)
+
+    analytics_parser = commands.add_parser('analytics', help="SQL analytics against pandas on a full load")
+    analytics_parser.add_argument('--rows', type=int, default=1_000_000)
+    analytics_parser.add_argument('--students', type=int, default=1000)
+
+    stats_parser = commands.add_parser('stats', help="get_database_stats variants: COUNT queries, counters, cache")
+    stats_parser.add_argument('--rows', type=int, default=1_000_000)
+    stats_parser.add_argument('--students', type=int, default=1000)
+
+    args = parser.parse_args(argv)
+
+    if 'DATABASE_URL' not in os.environ:
+        print("Error: DATABASE_URL is not set")
+        return 1
+
+    if args.command == 'bulk-insert':
+        results = benchmark_bulk_insert(args.rows, args.students)
+    elif args.command == 'analytics':
+        results = benchmark_analytics(args.rows, args.students)
+    elif args.command == 'stats':
+        results = benchmark_database_stats(args.rows, args.students)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
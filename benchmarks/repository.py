@@ -0,0 +1,160 @@
+"""
+Repository benchmark: the common operations on every storage backend
+
+The file stores (JSONL and legacy JSON) and SQLite run in a temporary
+directory; PostgreSQL runs on DATABASE_URL when it is set, where only
+benchmark records are written and deleted again.
+
+Usage:
+    python -m benchmarks.repository [--backend sqlite] [--rows 10000]
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from utils.repository import (
+    BACKENDS, BENCHMARK_PREFIX, BENCHMARK_START, DatabaseRepository, FileRepository
+)
+
+
+def benchmark_predictions(rows, students, days=90):
+    """`rows` prediction records for benchmark students, oldest first, spread over `days` days"""
+    records = []
+    for i in range(rows):
+        math_score = (i * 37) % 100
+        reading_score = (i * 53) % 100
+        records.append({
+            'timestamp': (BENCHMARK_START + timedelta(seconds=i * days * 86400 // rows)).isoformat(),
+            'student_name': f'{BENCHMARK_PREFIX}{i % students}',
+            'grade_level': '3',
+            'math_score': math_score,
+            'reading_score': reading_score,
+            'writing_score': (math_score + reading_score) / 2,
+            'attendance': 50 + (i * 11) % 50,
+            'behavior': 1 + i % 5,
+            'literacy': 1 + i % 10,
+            'prediction': int(math_score < 40),
+            'probability': 1 - math_score / 100,
+            'risk_level': 'High Risk' if math_score < 30 else 'Medium Risk' if math_score < 60 else 'Low Risk',
+            'model_version': 'benchmark',
+            'notes': ''
+        })
+    return records
+
+
+def _timed_ms(run, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = run()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def benchmark_repository(repository, rows=10_000, single_saves=200):
+    """
+    Time the common operations of a repository
+
+    Saves `single_saves` benchmark predictions one by one (as the app does)
+    and the rest of `rows` in one bulk save, then times the reads the pages
+    make, and deletes the benchmark records again. Reads cover whatever else
+    the store holds as well.
+
+    Returns:
+        dict: milliseconds per operation and bulk rows per second
+    """
+    records = benchmark_predictions(rows, students=max(1, rows // 20))
+    single_saves = min(single_saves, rows)
+    results = {'backend': repository.name, 'rows': rows}
+    try:
+        repository.delete_benchmark_records()
+        elapsed, _ = _timed_ms(lambda: [repository.save_prediction(record) for record in records[:single_saves]])
+        results['save_ms'] = elapsed / max(single_saves, 1)
+        elapsed, _ = _timed_ms(lambda: repository.save_predictions(records[single_saves:]))
+        results['bulk_rows_per_second'] = (rows - single_saves) / elapsed * 1000 if elapsed else None
+
+        repository.clear_caches()
+        results['load_ms'], _ = _timed_ms(repository.load_predictions)
+        results['cached_load_ms'], _ = _timed_ms(repository.load_predictions, repeat=10)
+        results['page_ms'], _ = _timed_ms(lambda: repository.load_predictions_page(limit=50), repeat=10)
+        results['student_ms'], _ = _timed_ms(
+            lambda: list(repository.iter_predictions(student_name=records[0]['student_name'])), repeat=10)
+        results['trends_ms'], _ = _timed_ms(lambda: repository.risk_trend_counts('day'))
+        results['correlation_ms'], _ = _timed_ms(repository.score_correlations)
+        repository.clear_caches()
+        results['stats_ms'], _ = _timed_ms(repository.get_stats)
+        return results
+    finally:
+        repository.delete_benchmark_records()
+
+
+@contextmanager
+def scratch_repositories(backends=BACKENDS):
+    """
+    Open the available backends for benchmarking
+
+    The file stores (JSONL and legacy JSON) and SQLite live in a temporary
+    directory; PostgreSQL is the DATABASE_URL database, where only benchmark
+    records are written and deleted.
+
+    Yields:
+        dict: label -> repository
+    """
+    directory = tempfile.mkdtemp(prefix='eduscan_repository_')
+    previous_path = os.environ.get('EDUSCAN_SQLITE_PATH')
+    repositories = {}
+    try:
+        if 'files' in backends:
+            for storage_format in ('jsonl', 'json'):
+                data_directory = os.path.join(directory, storage_format)
+                os.makedirs(data_directory)
+                repositories[f'files ({storage_format})'] = FileRepository(data_directory, storage_format)
+        if 'sqlite' in backends:
+            os.environ['EDUSCAN_SQLITE_PATH'] = os.path.join(directory, 'eduscan.db')
+            # Mark the file store as imported, so the app's real data stays out of it
+            marker = sqlite3.connect(os.environ['EDUSCAN_SQLITE_PATH'])
+            marker.execute("PRAGMA user_version = 1")
+            marker.close()
+            repositories['sqlite'] = DatabaseRepository('sqlite')
+        if 'postgres' in backends and os.environ.get('DATABASE_URL'):
+            try:
+                repositories['postgres'] = DatabaseRepository('postgres')
+            except ImportError as e:
+                print(f"Skipping postgres: {e}")
+        yield repositories
+    finally:
+        if 'sqlite' in repositories:
+            repositories['sqlite'].backend.close_connections()
+        if previous_path is None:
+            os.environ.pop('EDUSCAN_SQLITE_PATH', None)
+        else:
+            os.environ['EDUSCAN_SQLITE_PATH'] = previous_path
+        for repository in repositories.values():
+            repository.clear_caches()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the common repository operations on every storage backend")
+    parser.add_argument('--backend', choices=BACKENDS, action='append',
+                        help="Only this backend (repeatable; default: all available)")
+    parser.add_argument('--rows', type=int, default=10_000, help="Predictions to save and read back")
+    args = parser.parse_args(argv)
+
+    with scratch_repositories(args.backend or BACKENDS) as repositories:
+        for label, repository in repositories.items():
+            print(label)
+            for key, value in benchmark_repository(repository, args.rows).items():
+                if isinstance(value, float):
+                    value = f"{value:,.2f}"
+                print(f"  {key:>22} {value}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+SQLite backend benchmark: SQLite against the JSONL and legacy JSON file stores
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+from utils import sqlite_utils
+from utils.jsonl_store import PartitionedJsonlStore, update_json_array
+
+
+def benchmark_backends(predictions=10_000, observations=10_000):
+    """
+    Compare SQLite with the JSONL and legacy JSON file stores
+
+    Saves the given number of records one by one (as the app does), then
+    times a full load and one child's observations for the last 30 days.
+
+    Returns:
+        dict: per backend, average save time and load/lookup times (ms)
+    """
+    now = datetime.now()
+    prediction_records = [
+        {'timestamp': now.isoformat(), 'student_name': f'Student {i % 500}', 'grade_level': '3',
+         'math_score': 70, 'reading_score': 65, 'writing_score': 60, 'attendance': 90, 'behavior': 3,
+         'literacy': 6, 'prediction': 0, 'probability': 0.25, 'risk_level': 'Low Risk', 'notes': ''}
+        for i in range(predictions)
+    ]
+    observation_records = [
+        {'child_name': f'Child {i % 500}', 'date': date.fromordinal(now.toordinal() - i // 500).isoformat(),
+         'homework_completion': 80, 'reading_time': 20, 'focus_level': 'Good', 'subjects_struggled': ['Math'],
+         'behavior_rating': 4, 'mood_rating': 4, 'sleep_hours': 9, 'energy_level': 'Normal', 'screen_time': 2,
+         'physical_activity': 30, 'medication_taken': False, 'timestamp': now.isoformat()}
+        for i in range(observations)
+    ]
+    since = date.fromordinal(now.toordinal() - 30).isoformat()
+
+    directory = tempfile.mkdtemp(prefix='eduscan_backend_bench_')
+    previous_path = os.environ.get('EDUSCAN_SQLITE_PATH')
+    results = {}
+    try:
+        # SQLite
+        os.environ['EDUSCAN_SQLITE_PATH'] = os.path.join(directory, 'bench.db')
+        # Mark the file store as imported, so the app's real data stays out of it
+        marker = sqlite3.connect(os.environ['EDUSCAN_SQLITE_PATH'])
+        marker.execute("PRAGMA user_version = 1")
+        marker.close()
+        sqlite_utils.get_db_connection()
+        start = time.perf_counter()
+        for record in prediction_records:
+            sqlite_utils.save_prediction_to_db(record)
+        for record in observation_records:
+            sqlite_utils.save_parent_observation_to_db(record)
+        save_ms = (time.perf_counter() - start) / (predictions + observations) * 1000
+
+        start = time.perf_counter()
+        sqlite_utils.load_student_predictions()
+        sqlite_utils.load_parent_observations()
+        load_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        sqlite_utils.get_db_connection().execute(
+            "SELECT * FROM parent_observations WHERE child_name = ? AND date >= ? ORDER BY date",
+            ('Child 7', since)
+        ).fetchall()
+        lookup_ms = (time.perf_counter() - start) * 1000
+        results['sqlite'] = {'save_ms': save_ms, 'load_ms': load_ms, 'child_lookup_ms': lookup_ms}
+        sqlite_utils.close_connections()
+
+        # Partitioned JSONL (the file fallback)
+        stores = {name: PartitionedJsonlStore(os.path.join(directory, name)) for name in ('predictions', 'observations')}
+        start = time.perf_counter()
+        for record in prediction_records:
+            stores['predictions'].append(record)
+        for record in observation_records:
+            stores['observations'].append(record)
+        save_ms = (time.perf_counter() - start) / (predictions + observations) * 1000
+
+        start = time.perf_counter()
+        stores['predictions'].load()
+        loaded = stores['observations'].load()
+        load_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        [obs for obs in stores['observations'].load() if obs['child_name'] == 'Child 7' and obs['date'] >= since]
+        lookup_ms = (time.perf_counter() - start) * 1000
+        results['jsonl'] = {'save_ms': save_ms, 'load_ms': load_ms, 'child_lookup_ms': lookup_ms}
+
+        # Legacy JSON arrays, on a tenth of the records (every save rewrites the file)
+        paths = {name: os.path.join(directory, f'{name}.json') for name in ('predictions', 'observations')}
+        sample = max(1, min(predictions, observations) // 10)
+        start = time.perf_counter()
+        for record in prediction_records[:sample]:
+            update_json_array(paths['predictions'], lambda records: records + [record])
+        for record in observation_records[:sample]:
+            update_json_array(paths['observations'], lambda records: records + [record])
+        save_ms = (time.perf_counter() - start) / (2 * sample) * 1000
+        results['json'] = {'save_ms': save_ms, 'records_saved': 2 * sample}
+
+        results['records'] = {'predictions': predictions, 'observations': len(loaded)}
+        return results
+    finally:
+        sqlite_utils.close_connections()
+        if previous_path is None:
+            os.environ.pop('EDUSCAN_SQLITE_PATH', None)
+        else:
+            os.environ['EDUSCAN_SQLITE_PATH'] = previous_path
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SQLite against the file stores")
+    parser.add_argument('--predictions', type=int, default=10_000)
+    parser.add_argument('--observations', type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    print(json.dumps(benchmark_backends(args.predictions, args.observations), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
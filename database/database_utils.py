@@ -1,21 +1,37 @@
 """
 Database utility functions for the Learning Risk Assessment Application
-Provides high-level database operations and data management
+Creates the schema through the SQLAlchemy models and records interventions.
+Predictions, observations, users and statistics are read and written
+through the PostgreSQL repository (utils/repository), so both APIs share one
+implementation, connection pool and set of caches. Like the ORM session it
+always uses the database on DATABASE_URL, whichever backend utils/data_utils
+is configured with, so interventions and predictions land in one database.
 """
 
 from database.models import (
-    Student, Prediction, ParentObservation, User, InterventionRecord,
+    Student, User, InterventionRecord,
     get_session, create_tables, get_database_engine
 )
-from sqlalchemy.exc import SQLAlchemyError
-from datetime import datetime, date
-import json
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from utils.repository import DatabaseRepository
+from utils.student_identity import StudentIdCache
+from utils.table_counters import STATS_ESTIMATE
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_repository = None
+
+def get_repository():
+    """Get the PostgreSQL repository the prediction, observation and user functions use"""
+    global _repository
+    if _repository is None:
+        _repository = DatabaseRepository('postgres')
+    return _repository
+
 def initialize_database():
     """Initialize database and create tables if they don't exist"""
     try:
@@ -67,204 +83,87 @@ def initialize_database():
         logger.error(f"Error initializing database: {e}")
         return False
 
+# INSERT ... ON CONFLICT DO NOTHING for the dialects that support it
+_UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+_student_ids = StudentIdCache()
+
+def _insert_students(session, keys):
+    """Create the (name, grade_level) students that do not exist yet"""
+    rows = [{'name': name, 'grade_level': grade_level} for name, grade_level in keys]
+    upsert = _UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if upsert is not None:
+        session.execute(upsert(Student).on_conflict_do_nothing(index_elements=['name', 'grade_level']), rows)
+    else:
+        session.execute(insert(Student), rows)
+
+def _resolve_student(session, name, grade_level):
+    """
+    Get a student's id, creating the student if needed
+    
+    grade_level None (records that do not know the grade) matches the
+    student's oldest row with any grade and creates a missing student as
+    'Unknown'. The caller caches the id once it has committed.
+    """
+    student_id = _student_ids.get((name, grade_level))
+    if student_id is not None:
+        return student_id
+    
+    if grade_level is None:
+        student_id = session.scalar(
+            select(Student.id).where(Student.name == name).order_by(Student.id).limit(1)
+        )
+        if student_id is not None:
+            return student_id
+    
+    lookup = select(Student.id).where(Student.name == name, Student.grade_level == (grade_level or 'Unknown'))
+    student_id = session.scalar(lookup)
+    if student_id is None:
+        _insert_students(session, [(name, grade_level or 'Unknown')])
+        student_id = session.scalar(lookup)
+    return student_id
+
 def save_prediction_to_db(prediction_data):
     """Save prediction data to database"""
-    session = get_session()
-    try:
-        # Get or create student
-        student_name = prediction_data.get('student_name', 'Unknown Student')
-        grade_level = prediction_data.get('grade_level', 'Unknown')
-        
-        student = session.query(Student).filter_by(name=student_name).first()
-        if not student:
-            student = Student(name=student_name, grade_level=grade_level)
-            session.add(student)
-            session.flush()  # Get the student ID
-        
-        # Create prediction record
-        prediction = Prediction(
-            student_id=student.id,
-            math_score=prediction_data.get('math_score'),
-            reading_score=prediction_data.get('reading_score'),
-            writing_score=prediction_data.get('writing_score'),
-            attendance=prediction_data.get('attendance'),
-            behavior=prediction_data.get('behavior'),
-            literacy=prediction_data.get('literacy'),
-            prediction=prediction_data.get('prediction'),
-            probability=prediction_data.get('probability'),
-            risk_level=prediction_data.get('risk_level'),
-            notes=prediction_data.get('notes', ''),
-            timestamp=datetime.fromisoformat(prediction_data.get('timestamp', datetime.now().isoformat()))
-        )
-        
-        session.add(prediction)
-        session.commit()
-        logger.info(f"Prediction saved for student: {student_name}")
-        return True
-        
-    except Exception as e:
-        session.rollback()
-        logger.error(f"Error saving prediction: {e}")
-        return False
-    finally:
-        session.close()
+    return get_repository().save_prediction(prediction_data)
+
+def save_predictions_bulk(records):
+    """
+    Save many predictions (e.g. a scored batch upload) in one transaction
+    
+    Returns:
+        int: number of predictions saved (0 on error)
+    """
+    return get_repository().save_predictions(records)
 
 def save_parent_observation_to_db(observation_data):
     """Save parent observation to database"""
-    session = get_session()
-    try:
-        # Get or create student
-        child_name = observation_data.get('child_name', 'Unknown Child')
-        
-        student = session.query(Student).filter_by(name=child_name).first()
-        if not student:
-            student = Student(name=child_name, grade_level='Unknown')
-            session.add(student)
-            session.flush()
-        
-        # Convert subjects_struggled list to JSON string
-        subjects_struggled = observation_data.get('subjects_struggled', [])
-        if isinstance(subjects_struggled, list):
-            subjects_struggled = json.dumps(subjects_struggled)
-        
-        # Create observation record
-        observation = ParentObservation(
-            student_id=student.id,
-            child_name=child_name,
-            date=datetime.fromisoformat(observation_data.get('date', date.today().isoformat())),
-            homework_completion=observation_data.get('homework_completion'),
-            reading_time=observation_data.get('reading_time'),
-            focus_level=observation_data.get('focus_level'),
-            subjects_struggled=subjects_struggled,
-            behavior_rating=observation_data.get('behavior_rating'),
-            mood_rating=observation_data.get('mood_rating'),
-            sleep_hours=observation_data.get('sleep_hours'),
-            energy_level=observation_data.get('energy_level'),
-            social_interactions=observation_data.get('social_interactions', ''),
-            learning_wins=observation_data.get('learning_wins', ''),
-            challenges_faced=observation_data.get('challenges_faced', ''),
-            strategies_used=observation_data.get('strategies_used', ''),
-            screen_time=observation_data.get('screen_time'),
-            physical_activity=observation_data.get('physical_activity'),
-            medication_taken=observation_data.get('medication_taken', False),
-            special_events=observation_data.get('special_events', ''),
-            timestamp=datetime.fromisoformat(observation_data.get('timestamp', datetime.now().isoformat()))
-        )
-        
-        session.add(observation)
-        session.commit()
-        logger.info(f"Parent observation saved for: {child_name}")
-        return True
-        
-    except Exception as e:
-        session.rollback()
-        logger.error(f"Error saving parent observation: {e}")
-        return False
-    finally:
-        session.close()
+    return get_repository().save_observation(observation_data)
 
 def load_student_predictions():
     """Load all student prediction data from database"""
-    session = get_session()
-    try:
-        predictions = session.query(Prediction).join(Student).all()
-        
-        prediction_list = []
-        for pred in predictions:
-            prediction_dict = {
-                'id': pred.id,
-                'student_name': pred.student.name,
-                'grade_level': pred.student.grade_level,
-                'math_score': pred.math_score,
-                'reading_score': pred.reading_score,
-                'writing_score': pred.writing_score,
-                'attendance': pred.attendance,
-                'behavior': pred.behavior,
-                'literacy': pred.literacy,
-                'prediction': pred.prediction,
-                'probability': pred.probability,
-                'risk_level': pred.risk_level,
-                'notes': pred.notes,
-                'timestamp': pred.timestamp.isoformat()
-            }
-            prediction_list.append(prediction_dict)
-        
-        return prediction_list
-        
-    except Exception as e:
-        logger.error(f"Error loading predictions: {e}")
-        return []
-    finally:
-        session.close()
+    return list(get_repository().load_predictions())
+
+def load_predictions_page(limit=50, after=None, student_name=None):
+    """
+    Load one page of predictions, newest first
+    
+    Returns:
+        tuple: (records, cursor for the next page or None after the last page)
+    """
+    return get_repository().load_predictions_page(limit, after, student_name)
+
+def iter_student_predictions(batch_size=1000, student_name=None):
+    """Stream predictions, newest first, batch_size rows at a time"""
+    yield from get_repository().iter_predictions(batch_size, student_name)
 
 def load_parent_observations():
     """Load all parent observation data from database"""
-    session = get_session()
-    try:
-        observations = session.query(ParentObservation).join(Student).all()
-        
-        observation_list = []
-        for obs in observations:
-            # Parse subjects_struggled back to list
-            subjects_struggled = obs.subjects_struggled or '[]'
-            try:
-                subjects_struggled = json.loads(subjects_struggled)
-            except json.JSONDecodeError:
-                subjects_struggled = []
-            
-            observation_dict = {
-                'id': obs.id,
-                'child_name': obs.child_name,
-                'date': obs.date.isoformat(),
-                'homework_completion': obs.homework_completion,
-                'reading_time': obs.reading_time,
-                'focus_level': obs.focus_level,
-                'subjects_struggled': subjects_struggled,
-                'behavior_rating': obs.behavior_rating,
-                'mood_rating': obs.mood_rating,
-                'sleep_hours': obs.sleep_hours,
-                'energy_level': obs.energy_level,
-                'social_interactions': obs.social_interactions,
-                'learning_wins': obs.learning_wins,
-                'challenges_faced': obs.challenges_faced,
-                'strategies_used': obs.strategies_used,
-                'screen_time': obs.screen_time,
-                'physical_activity': obs.physical_activity,
-                'medication_taken': obs.medication_taken,
-                'special_events': obs.special_events,
-                'timestamp': obs.timestamp.isoformat()
-            }
-            observation_list.append(observation_dict)
-        
-        return observation_list
-        
-    except Exception as e:
-        logger.error(f"Error loading observations: {e}")
-        return []
-    finally:
-        session.close()
+    return list(get_repository().load_observations())
 
 def authenticate_user_db(username, password):
     """Authenticate user against database"""
-    session = get_session()
-    try:
-        user = session.query(User).filter_by(username=username, password=password).first()
-        if user:
-            return {
-                'id': user.id,
-                'username': user.username,
-                'user_type': user.user_type,
-                'full_name': user.full_name,
-                'email': user.email,
-                'created_date': user.created_date.isoformat()
-            }
-        return None
-        
-    except Exception as e:
-        logger.error(f"Error authenticating user: {e}")
-        return None
-    finally:
-        session.close()
+    return get_repository().authenticate(username, password)
 
 def save_intervention_record(intervention_data):
     """Save intervention tracking record"""
@@ -272,16 +171,11 @@ def save_intervention_record(intervention_data):
     try:
         # Get or create student
         student_name = intervention_data.get('student_name', 'Unknown Student')
-        
-        student = session.query(Student).filter_by(name=student_name).first()
-        if not student:
-            student = Student(name=student_name, grade_level='Unknown')
-            session.add(student)
-            session.flush()
+        student_id = _resolve_student(session, student_name, None)
         
         # Create intervention record
         intervention = InterventionRecord(
-            student_id=student.id,
+            student_id=student_id,
             intervention_type=intervention_data.get('intervention_type'),
             baseline_score=intervention_data.get('baseline_score'),
             current_score=intervention_data.get('current_score'),
@@ -291,47 +185,23 @@ def save_intervention_record(intervention_data):
         
         session.add(intervention)
         session.commit()
+        _student_ids.put((student_name, None), student_id)
         logger.info(f"Intervention record saved for: {student_name}")
         return True
         
     except Exception as e:
         session.rollback()
+        _student_ids.clear()
         logger.error(f"Error saving intervention record: {e}")
         return False
     finally:
         session.close()
 
-def get_database_stats():
-    """Get database statistics"""
-    session = get_session()
-    try:
-        stats = {
-            'total_students': session.query(Student).count(),
-            'total_predictions': session.query(Prediction).count(),
-            'total_observations': session.query(ParentObservation).count(),
-            'total_users': session.query(User).count(),
-            'total_interventions': session.query(InterventionRecord).count()
-        }
-        
-        # Get latest records
-        latest_prediction = session.query(Prediction).order_by(Prediction.timestamp.desc()).first()
-        latest_observation = session.query(ParentObservation).order_by(ParentObservation.timestamp.desc()).first()
-        
-        stats['last_prediction_date'] = latest_prediction.timestamp.isoformat() if latest_prediction else None
-        stats['last_observation_date'] = latest_observation.timestamp.isoformat() if latest_observation else None
-        
-        return stats
-        
-    except Exception as e:
-        logger.error(f"Error getting database stats: {e}")
-        return {
-            'total_students': 0,
-            'total_predictions': 0,
-            'total_observations': 0,
-            'total_users': 0,
-            'total_interventions': 0,
-            'last_prediction_date': None,
-            'last_observation_date': None
-        }
-    finally:
-        session.close()
\ No newline at end of file
+def get_database_stats(estimate=STATS_ESTIMATE):
+    """
+    Get database statistics
+    
+    Read from the trigger-maintained row counters and reused for
+    EDUSCAN_DB_STATS_TTL seconds (see the backend's get_database_stats).
+    """
+    return get_repository().get_stats(estimate)
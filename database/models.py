@@ -3,16 +3,36 @@ Database models for the Learning Risk Assessment Application
 Using SQLAlchemy for database operations
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import create_engine, event, exc, inspect, text, Column, Index, Integer, JSON, String, Float, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import scoped_session, sessionmaker, relationship
+from sqlalchemy.pool import QueuePool
 from datetime import datetime
 import os
+import threading
+import time
+
+from utils.migrations import migrate
+from utils.student_identity import STUDENT_KEY_INDEX
+
+# Engine pool settings, shared with the psycopg2 pool in utils/db_utils.
+# POOL_MIN connections are kept open; up to POOL_MAX are opened under load
+POOL_MIN_SIZE = int(os.environ.get('EDUSCAN_DB_POOL_MIN', 2))
+POOL_MAX_SIZE = int(os.environ.get('EDUSCAN_DB_POOL_MAX', 10))
+POOL_TIMEOUT = float(os.environ.get('EDUSCAN_DB_POOL_TIMEOUT', 10))
+# Reconnect connections older than this many seconds (server/proxy idle limits)
+POOL_RECYCLE = int(os.environ.get('EDUSCAN_DB_POOL_RECYCLE', 1800))
 
 Base = declarative_base()
 
 class Student(Base):
     __tablename__ = 'students'
+    __table_args__ = (
+        # One row per student; saves upsert against this key
+        Index(STUDENT_KEY_INDEX, 'name', 'grade_level', unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     name = Column(String(100))
@@ -25,6 +45,11 @@ class Student(Base):
 
 class Prediction(Base):
     __tablename__ = 'predictions'
+    __table_args__ = (
+        # Keyset pagination over all predictions and per student
+        Index('ix_predictions_timestamp', 'timestamp', 'id'),
+        Index('ix_predictions_student_timestamp', 'student_id', 'timestamp'),
+    )
     
     id = Column(Integer, primary_key=True)
     student_id = Column(Integer, ForeignKey('students.id'))
@@ -41,6 +66,8 @@ class Prediction(Base):
     prediction = Column(Integer)  # 0 or 1
     probability = Column(Float)
     risk_level = Column(String(20))
+    model_version = Column(String(64))  # Registry version of the model that scored it
+    extra = Column(JSON().with_variant(JSONB(), 'postgresql'))  # Fields without a column, e.g. recommendations
     
     # Additional information
     notes = Column(Text)
@@ -51,6 +78,13 @@ class Prediction(Base):
 
 class ParentObservation(Base):
     __tablename__ = 'parent_observations'
+    __table_args__ = (
+        # Retention and the newest-observation lookup of the row counters
+        Index('ix_parent_observations_timestamp', 'timestamp'),
+        # A child's observations over a date range
+        Index('ix_parent_observations_student_date', 'student_id', 'date'),
+        Index('ix_parent_observations_child_date', 'child_name', 'date'),
+    )
     
     id = Column(Integer, primary_key=True)
     student_id = Column(Integer, ForeignKey('students.id'))
@@ -61,7 +95,7 @@ class ParentObservation(Base):
     homework_completion = Column(Float)
     reading_time = Column(Float)
     focus_level = Column(String(20))
-    subjects_struggled = Column(Text)  # JSON string
+    subjects_struggled = Column(JSON().with_variant(JSONB(), 'postgresql'))  # list of subjects
     
     # Behavioral observations
     behavior_rating = Column(Integer)
@@ -112,23 +146,181 @@ class InterventionRecord(Base):
     # Relationships
     student = relationship("Student")
 
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a free connection"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+    
+    def reset_stats(self):
+        with self._stats_lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return conn
+
+_engine_state = {'url': None, 'engine': None, 'sessionmaker': None, 'scoped': None, 'invalidations': 0}
+_engine_lock = threading.Lock()
+
+def _create_engine(database_url):
+    if make_url(database_url).get_backend_name() == 'sqlite':
+        return create_engine(database_url)
+    
+    engine = create_engine(
+        database_url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=POOL_MIN_SIZE,
+        max_overflow=max(POOL_MAX_SIZE - POOL_MIN_SIZE, 0),
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=True
+    )
+    
+    @event.listens_for(engine.pool, 'invalidate')
+    def _count_invalidation(dbapi_connection, connection_record, exception):
+        _engine_state['invalidations'] += 1
+    
+    return engine
+
 def get_database_engine():
-    """Create database engine from environment variables"""
+    """Get the process-wide database engine, creating it on first use"""
     database_url = os.environ.get('DATABASE_URL')
     if not database_url:
         raise ValueError("DATABASE_URL environment variable not set")
     
-    engine = create_engine(database_url)
-    return engine
+    engine = _engine_state['engine']
+    if engine is not None and _engine_state['url'] == database_url:
+        return engine
+    
+    with _engine_lock:
+        if _engine_state['engine'] is None or _engine_state['url'] != database_url:
+            if _engine_state['engine'] is not None:
+                _engine_state['scoped'].remove()
+                _engine_state['engine'].dispose()
+            engine = _create_engine(database_url)
+            session_factory = sessionmaker(bind=engine)
+            _engine_state.update({
+                'url': database_url,
+                'engine': engine,
+                'sessionmaker': session_factory,
+                'scoped': scoped_session(session_factory)
+            })
+        return _engine_state['engine']
+
+def dispose_engine():
+    """Close all pooled connections and forget the engine (e.g. after forking)"""
+    with _engine_lock:
+        if _engine_state['engine'] is not None:
+            _engine_state['scoped'].remove()
+            _engine_state['engine'].dispose()
+        _engine_state.update({'url': None, 'engine': None, 'sessionmaker': None, 'scoped': None})
+
+def get_engine_stats():
+    """Get pool size and checkout wait statistics of the engine"""
+    engine = _engine_state['engine']
+    if engine is None:
+        return {}
+    
+    pool = engine.pool
+    stats = {
+        'pool_class': type(pool).__name__,
+        'status': pool.status(),
+        'invalidations': _engine_state['invalidations']
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'pool_size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'checked_in': pool.checkedin()
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update({
+            'checkouts': pool.checkouts,
+            'timeouts': pool.timeouts,
+            'avg_wait_ms': pool.wait_seconds / pool.checkouts * 1000 if pool.checkouts else 0.0,
+            'max_wait_ms': pool.max_wait_seconds * 1000
+        })
+    return stats
+
+def add_missing_columns(engine):
+    """Add columns declared on the models that older tables do not have yet"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+def add_missing_indexes(engine):
+    """Create indexes declared on the models that older tables do not have yet"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+
+def run_migrations(engine):
+    """Apply the schema migrations of utils/migrations shared with the psycopg2 and SQLite backends"""
+    if engine.dialect.name not in ('postgresql', 'sqlite'):
+        return []
+    conn = engine.raw_connection()
+    try:
+        return migrate(conn, engine.dialect.name)
+    finally:
+        conn.close()
 
 def create_tables():
     """Create all database tables"""
     engine = get_database_engine()
     Base.metadata.create_all(engine)
+    add_missing_columns(engine)
+    # Migrations merge duplicate students before the unique key is created
+    run_migrations(engine)
+    add_missing_indexes(engine)
     return engine
 
 def get_session():
-    """Get database session"""
-    engine = get_database_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
\ No newline at end of file
+    """Get a new database session from the shared session factory"""
+    get_database_engine()
+    return _engine_state['sessionmaker']()
+
+def get_scoped_session():
+    """
+    Get the session bound to the current thread
+    
+    Streamlit runs each script rerun in its own thread; every call made from
+    that thread gets the same session until remove_scoped_session() is called.
+    """
+    get_database_engine()
+    return _engine_state['scoped']()
+
+def remove_scoped_session():
+    """Close the current thread's scoped session and return its connection to the pool"""
+    if _engine_state['scoped'] is not None:
+        _engine_state['scoped'].remove()
@@ -7,8 +7,14 @@ from datetime import datetime, date
 import json
 import os
 import sys
-from utils.model_utils import load_model, make_prediction
-from utils.data_utils import save_prediction_data, load_student_data
+from utils.model_utils import (
+    get_model_manager, get_model_version, make_prediction, predict_batch, batch_prediction_records,
+    get_prediction_cache_stats
+)
+from utils.data_utils import (
+    save_prediction_data, save_prediction_batch, load_student_data_page,
+    get_risk_trends, get_performance_correlation, get_student_names, get_student_progress
+)
 
 st.set_page_config(
     page_title="Assessment Form - EduScan",
@@ -113,6 +119,13 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_model_resource():
+    """Share the process-wide model manager across sessions and warm it on first use"""
+    manager = get_model_manager()
+    manager.get_model()
+    return manager
+
 def validate_inputs(math_score, reading_score, writing_score, attendance, behavior, literacy):
     """Validate all input parameters"""
     errors = []
@@ -299,7 +312,18 @@ def main():
             st.markdown(f"• {feature}")
             
         # Performance note
+        model_stats = get_model_resource().get_stats()
         st.success("Model loaded successfully from your notebook specifications")
+        st.caption(
+            f"Load time: {model_stats['last_load_seconds'] * 1000:.0f} ms · "
+            f"Version: {model_stats['model_version']} · "
+            f"Reloads: {model_stats['loads']} · Cache hits: {model_stats['hits']}"
+        )
+        cache_stats = get_prediction_cache_stats()
+        st.caption(
+            f"Prediction cache: {cache_stats['size']}/{cache_stats['maxsize']} entries · "
+            f"Hit rate: {cache_stats['hit_rate']:.0%} · Evictions: {cache_stats['evictions']}"
+        )
         
         if prediction_type == "Batch Upload":
             st.markdown("#### Upload CSV File")
@@ -501,6 +525,7 @@ def main():
                             "prediction": prediction,
                             "probability": prediction_prob,
                             "risk_level": risk_level,
+                            "model_version": get_model_version(),
                             "notes": notes,
                             **student_data
                         }
@@ -528,36 +553,41 @@ def main():
                     st.markdown("### Data Preview")
                     st.dataframe(df.head())
                     
+                    save_batch = st.checkbox("Save results to prediction history")
+                    
                     if st.button("Process Batch Predictions"):
                         progress_bar = st.progress(0)
-                        results = []
+                        scored_chunks = []
+                        
+                        # Score in chunks so the progress bar moves on large uploads
+                        chunk_size = 1000
+                        for start in range(0, len(df), chunk_size):
+                            scored_chunks.append(predict_batch(df.iloc[start:start + chunk_size]))
+                            progress_bar.progress(min(start + chunk_size, len(df)) / len(df))
+                        
+                        scored = pd.concat(scored_chunks) if scored_chunks else predict_batch(df)
+                        failed = scored[scored['error'].notna()]
+                        for idx, error in failed['error'].head(10).items():
+                            st.error(f"Error processing student {idx + 1}: {error}")
+                        if len(failed) > 10:
+                            st.error(f"... and {len(failed) - 10} more rows with invalid data")
+                        
+                        scored = scored[scored['error'].isna()]
+                        results = pd.DataFrame({
+                            'Student_ID': scored.index + 1,
+                            'Risk_Level': scored['risk_level'],
+                            'Risk_Probability': scored['probability'].map(lambda p: f"{p:.1%}")
+                        }, index=scored.index)
+                        results = pd.concat([results, scored[required_columns]], axis=1)
                         
-                        for idx, row in df.iterrows():
-                            try:
-                                student_data = {col: row[col] for col in required_columns}
-                                prediction, prediction_prob = make_prediction(student_data)
-                                
-                                if prediction_prob < 0.3:
-                                    risk_level = "Low Risk"
-                                elif prediction_prob < 0.7:
-                                    risk_level = "Medium Risk"
-                                else:
-                                    risk_level = "High Risk"
-                                
-                                results.append({
-                                    'Student_ID': idx + 1,
-                                    'Risk_Level': risk_level,
-                                    'Risk_Probability': f"{prediction_prob:.1%}",
-                                    **student_data
-                                })
-                                
-                                progress_bar.progress((idx + 1) / len(df))
-                            
-                            except Exception as e:
-                                st.error(f"Error processing student {idx + 1}: {str(e)}")
+                        if save_batch and len(scored):
+                            # One bulk write instead of a database round trip per student
+                            batch_records = batch_prediction_records(scored, model_version=get_model_version())
+                            saved = save_prediction_batch(batch_records)
+                            st.success(f" Saved {saved} predictions to history")
                         
                         # Display results
-                        results_df = pd.DataFrame(results)
+                        results_df = results.reset_index(drop=True)
                         st.markdown("### Batch Prediction Results")
                         st.dataframe(results_df)
                         
@@ -583,49 +613,73 @@ def main():
     
     else:  # Historical Analysis
         st.markdown("###  Historical Analysis")
-        historical_data = load_student_data()
+        latest_predictions, _ = load_student_data_page(limit=1)
         
-        if historical_data:
-            df_historical = pd.DataFrame(historical_data)
-            
-            # Convert timestamp to datetime
-            df_historical['timestamp'] = pd.to_datetime(df_historical['timestamp'])
+        if latest_predictions:
             
             # Analysis options
             analysis_type = st.selectbox(
                 "Select analysis type:",
-                ["Risk Trends Over Time", "Performance Correlation", "Student Progress Tracking"]
+                ["Risk Trends Over Time", "Performance Correlation", "Student Progress Tracking", "Prediction Log"]
             )
             
+            # Every view is computed by the database (or pandas for the JSON
+            # store) and only transfers what it plots
             if analysis_type == "Risk Trends Over Time":
-                # Group by date and risk level
-                daily_risks = df_historical.groupby([df_historical['timestamp'].dt.date, 'risk_level']).size().unstack(fill_value=0)
+                granularity = st.selectbox("Group by:", ["day", "week", "month"], format_func=str.capitalize)
+                risk_trends = get_risk_trends(granularity)
                 
-                fig_trend = px.line(daily_risks, title="Risk Level Trends Over Time")
+                fig_trend = px.line(risk_trends, title="Risk Level Trends Over Time")
                 st.plotly_chart(fig_trend, use_container_width=True)
             
             elif analysis_type == "Performance Correlation":
                 # Correlation matrix
-                numeric_cols = ['math_score', 'reading_score', 'writing_score', 'attendance', 'behavior', 'literacy', 'probability']
-                if all(col in df_historical.columns for col in numeric_cols):
-                    corr_matrix = df_historical[numeric_cols].corr()
+                corr_matrix = get_performance_correlation()
+                if not corr_matrix.empty:
                     fig_heatmap = px.imshow(corr_matrix, text_auto=True, title="Performance Correlation Matrix")
                     st.plotly_chart(fig_heatmap, use_container_width=True)
             
             elif analysis_type == "Student Progress Tracking":
-                if 'student_name' in df_historical.columns:
-                    student_names = df_historical['student_name'].dropna().unique()
-                    selected_student = st.selectbox("Select student:", student_names)
+                student_names = get_student_names()
+                selected_student = st.selectbox("Select student:", student_names)
+                
+                if selected_student:
+                    student_progress = get_student_progress(selected_student)
                     
-                    if selected_student:
-                        student_progress = df_historical[df_historical['student_name'] == selected_student].sort_values('timestamp')
-                        
-                        if len(student_progress) > 1:
-                            fig_progress = px.line(student_progress, x='timestamp', y='probability', 
-                                                 title=f"Risk Probability Trend for {selected_student}")
-                            st.plotly_chart(fig_progress, use_container_width=True)
-                        else:
-                            st.info("Not enough data points for trend analysis")
+                    if len(student_progress) > 1:
+                        fig_progress = px.line(student_progress, x='timestamp', y='probability', 
+                                             title=f"Risk Probability Trend for {selected_student}")
+                        st.plotly_chart(fig_progress, use_container_width=True)
+                    else:
+                        st.info("Not enough data points for trend analysis")
+            
+            elif analysis_type == "Prediction Log":
+                page_size = st.selectbox("Predictions per page:", [25, 50, 100], index=1)
+                
+                # Cursors of the pages visited so far, so Previous can step back
+                if st.session_state.get('prediction_log_page_size') != page_size:
+                    st.session_state.prediction_log_page_size = page_size
+                    st.session_state.prediction_log_cursors = [None]
+                cursors = st.session_state.prediction_log_cursors
+                
+                records, next_cursor = load_student_data_page(limit=page_size, after=cursors[-1])
+                log_columns = ['timestamp', 'student_name', 'grade_level', 'risk_level', 'probability',
+                               'math_score', 'reading_score', 'writing_score', 'attendance', 'behavior',
+                               'literacy', 'model_version']
+                df_page = pd.DataFrame(records)
+                st.dataframe(df_page[[col for col in log_columns if col in df_page.columns]], use_container_width=True)
+                
+                col_prev, col_page, col_next = st.columns([1, 2, 1])
+                with col_prev:
+                    if st.button("Previous", disabled=len(cursors) == 1):
+                        cursors.pop()
+                        st.rerun()
+                with col_page:
+                    st.markdown(f"Page {len(cursors)}")
+                with col_next:
+                    if st.button("Next", disabled=next_cursor is None):
+                        cursors.append(next_cursor)
+                        st.rerun()
         else:
             st.info("No historical data available. Make some predictions first!")
 
@@ -5,7 +5,7 @@ import plotly.express as px
 from datetime import datetime, date, timedelta
 import json
 import os
-from utils.data_utils import save_parent_observation, load_parent_observations
+from utils.data_utils import save_parent_observation, get_child_observations
 
 st.set_page_config(
     page_title="Parent Tracker",
@@ -425,10 +425,7 @@ def main():
         st.markdown(f"Analyzing progress for **{child_name}** from {start_date} to {end_date}")
         
         # Load observations for the child
-        all_observations = load_parent_observations()
-        child_observations = [obs for obs in all_observations 
-                            if obs.get('child_name') == child_name 
-                            and start_date <= date.fromisoformat(obs['date']) <= end_date]
+        child_observations = get_child_observations(child_name, start_date, end_date)
         
         if not child_observations:
             st.warning("Chart No observations found for the selected date range. Start by adding daily observations!")
@@ -552,10 +549,7 @@ def main():
         st.markdown(f"Weekly analysis for **{child_name}**")
         
         # Load observations
-        all_observations = load_parent_observations()
-        child_observations = [obs for obs in all_observations 
-                            if obs.get('child_name') == child_name 
-                            and start_date <= date.fromisoformat(obs['date']) <= end_date]
+        child_observations = get_child_observations(child_name, start_date, end_date)
         
         if not child_observations:
             st.warning("Chart No observations found for the selected date range.")
@@ -614,15 +608,14 @@ def main():
         st.markdown(f"Complete observation history for **{child_name}**")
         
         # Load all observations for the child
-        all_observations = load_parent_observations()
-        child_observations = [obs for obs in all_observations if obs.get('child_name') == child_name]
+        child_observations = get_child_observations(child_name)
         
         if not child_observations:
             st.warning("Note No observations recorded yet. Start by adding daily observations!")
             return
         
         # Sort by date (newest first)
-        child_observations.sort(key=lambda x: x['date'], reverse=True)
+        child_observations.reverse()
         
         # Filter options
         col1, col2 = st.columns(2)
@@ -0,0 +1,16 @@
+import pytest
+
+from utils import data_utils
+from utils.repository import FileRepository, clear_data_cache
+
+
+@pytest.fixture
+def sqlite_over_file_store(tmp_path, monkeypatch):
+    """data_utils on a fresh SQLite database, with the file store in tmp_path"""
+    file_repository = FileRepository(str(tmp_path), 'jsonl')
+    monkeypatch.setenv('EDUSCAN_SQLITE_PATH', str(tmp_path / 'eduscan.db'))
+    monkeypatch.setattr(data_utils, '_file_repository', file_repository)
+    monkeypatch.setattr(data_utils, 'DATABASE_AVAILABLE', True)
+    clear_data_cache()
+    yield file_repository
+    clear_data_cache()
@@ -0,0 +1,143 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from utils import data_utils
+from utils.repository import open_repository
+
+
+def _prediction(name, days_ago):
+    return {
+        'student_name': name, 'grade_level': '3', 'math_score': 60, 'reading_score': 55,
+        'writing_score': 50, 'attendance': 85, 'behavior': 3, 'literacy': 5, 'prediction': 1,
+        'probability': 0.7, 'risk_level': 'High Risk', 'notes': '',
+        'timestamp': (datetime.now() - timedelta(days=days_ago)).isoformat()
+    }
+
+
+def _observation(name, days_ago):
+    timestamp = datetime.now() - timedelta(days=days_ago)
+    return {
+        'child_name': name, 'date': timestamp.date().isoformat(), 'homework_completion': 80,
+        'reading_time': 20, 'focus_level': 'Good', 'subjects_struggled': ['Math'], 'behavior_rating': 4,
+        'mood_rating': 4, 'sleep_hours': 9, 'timestamp': timestamp.isoformat()
+    }
+
+
+def test_clean_old_data_counts_imported_records_once(sqlite_over_file_store, monkeypatch):
+    # Records the file store held before the SQLite database existed
+    sqlite_over_file_store.save_predictions(
+        [_prediction(f'Student {i}', 200) for i in range(7)] + [_prediction('Recent', 1)]
+    )
+    for i in range(4):
+        sqlite_over_file_store.save_observation(_observation(f'Child {i}', 200))
+    sqlite_over_file_store.save_observation(_observation('Recent', 1))
+
+    # The first connection imports the file store into the new database
+    repository = open_repository('sqlite')
+    monkeypatch.setattr(data_utils, '_repository', repository)
+    assert len(repository.load_predictions()) == 8
+    assert sqlite_over_file_store.load_predictions() == []
+
+    result = data_utils.clean_old_data(days_old=90)
+
+    assert result['removed_predictions'] == 7
+    assert result['removed_observations'] == 4
+    assert result['remaining_predictions'] == 1
+    assert result['remaining_observations'] == 1
+
+
+def test_import_leaves_unparseable_timestamps_in_the_file_store(sqlite_over_file_store, monkeypatch):
+    sqlite_over_file_store.save_predictions([_prediction('Amina', 1), dict(_prediction('Farah', 1), timestamp='yesterday')])
+
+    repository = open_repository('sqlite')
+    monkeypatch.setattr(data_utils, '_repository', repository)
+
+    assert [record['student_name'] for record in repository.load_predictions()] == ['Amina']
+    assert [record['student_name'] for record in sqlite_over_file_store.load_predictions()] == ['Farah']
+    assert data_utils.save_prediction_data(_prediction('Hodan', 0)) is True
+    assert len(repository.load_predictions()) == 2
+
+
+def test_saves_go_to_the_file_store_without_a_connection(sqlite_over_file_store, monkeypatch, tmp_path):
+    # A directory cannot be opened as a database, so every connection attempt fails
+    monkeypatch.setenv('EDUSCAN_SQLITE_PATH', str(tmp_path))
+    monkeypatch.setattr(data_utils, '_repository', open_repository('sqlite'))
+
+    assert data_utils.save_prediction_data(_prediction('Amina', 1)) is True
+    assert data_utils.save_prediction_batch([_prediction('Farah', 1)]) == 1
+    assert data_utils.save_parent_observation(_observation('Amina', 1)) is True
+
+    assert len(sqlite_over_file_store.load_predictions()) == 2
+    assert len(sqlite_over_file_store.load_observations()) == 1
+
+
+def test_sqlite_keeps_fields_without_a_column(sqlite_over_file_store, monkeypatch):
+    monkeypatch.setattr(data_utils, '_repository', open_repository('sqlite'))
+    record = _prediction('Amina', 1)
+    record['recommendations'] = ['Daily reading practice', 'Weekly check-in']
+    record['school'] = 'Hodan Primary'
+
+    data_utils.save_prediction_data(record)
+    data_utils.save_prediction_batch([dict(record, student_name='Farah', unscored=float('nan'))])
+
+    saved = {saved['student_name']: saved for saved in data_utils.iter_student_data()}
+    assert saved['Amina']['recommendations'] == record['recommendations']
+    assert saved['Amina']['school'] == 'Hodan Primary'
+    assert saved['Farah']['recommendations'] == record['recommendations']
+    assert saved['Farah']['unscored'] is None
+    assert 'extra' not in saved['Amina']
+
+
+def test_child_observations_are_queried_from_the_database(sqlite_over_file_store, monkeypatch):
+    repository = open_repository('sqlite')
+    monkeypatch.setattr(data_utils, '_repository', repository)
+    for days_ago in (40, 10, 5):
+        data_utils.save_parent_observation(_observation('Amina', days_ago))
+    data_utils.save_parent_observation(_observation('Farah', 5))
+
+    def load_everything():
+        raise AssertionError("loaded every observation")
+    monkeypatch.setattr(repository, 'load_observations', load_everything)
+
+    observations = data_utils.get_child_observations('Amina', date.today() - timedelta(days=30), date.today())
+
+    assert [obs['date'] for obs in observations] == [
+        (date.today() - timedelta(days=days_ago)).isoformat() for days_ago in (10, 5)
+    ]
+
+
+def test_child_observations_fall_back_to_the_file_store(sqlite_over_file_store, monkeypatch):
+    repository = open_repository('sqlite')
+    monkeypatch.setattr(data_utils, '_repository', repository)
+    sqlite_over_file_store.save_observation(_observation('Amina', 3))
+
+    def unreachable(*args):
+        raise ConnectionError("database down")
+    monkeypatch.setattr(repository, 'child_observations', unreachable)
+
+    assert [obs['child_name'] for obs in data_utils.get_child_observations('Amina')] == ['Amina']
+
+
+def test_stream_reads_the_file_store_when_the_database_is_down(sqlite_over_file_store, monkeypatch, tmp_path):
+    sqlite_over_file_store.save_predictions([_prediction('Amina', 2), _prediction('Farah', 1)])
+    monkeypatch.setenv('EDUSCAN_SQLITE_PATH', str(tmp_path))
+    monkeypatch.setattr(data_utils, '_repository', open_repository('sqlite'))
+
+    assert [record['student_name'] for record in data_utils.iter_student_data()] == ['Farah', 'Amina']
+
+
+def test_stream_failing_midway_is_raised(sqlite_over_file_store, monkeypatch):
+    repository = open_repository('sqlite')
+    monkeypatch.setattr(data_utils, '_repository', repository)
+    sqlite_over_file_store.save_prediction(_prediction('Amina', 1))
+
+    def failing(batch_size, student_name):
+        yield _prediction('Farah', 1)
+        raise ConnectionError("connection lost")
+    monkeypatch.setattr(repository, 'iter_predictions', failing)
+
+    stream = data_utils.iter_student_data()
+    assert next(stream)['student_name'] == 'Farah'
+    with pytest.raises(ConnectionError):
+        next(stream)
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from database import database_utils
+from database.models import InterventionRecord, Student, get_session
+
+
+def test_bound_to_postgres_whatever_the_data_utils_backend():
+    assert database_utils.get_repository().name == 'postgres'
+
+
+@pytest.mark.skipif(not os.environ.get('DATABASE_URL'), reason="needs a PostgreSQL server (DATABASE_URL)")
+def test_predictions_and_interventions_share_the_database():
+    name = 'eduscan-benchmark-intervention'
+    repository = database_utils.get_repository()
+    repository.delete_benchmark_records()
+    session = get_session()
+    try:
+        assert database_utils.save_prediction_to_db({
+            'student_name': name, 'grade_level': '3', 'math_score': 40, 'reading_score': 45,
+            'writing_score': 50, 'attendance': 70, 'behavior': 2, 'literacy': 3, 'prediction': 1,
+            'probability': 0.8, 'risk_level': 'High Risk', 'timestamp': '1900-03-01T10:00:00'
+        })
+        assert database_utils.save_intervention_record({
+            'student_name': name, 'intervention_type': 'Reading support', 'baseline_score': 45
+        })
+
+        # The intervention is filed under the student the prediction created
+        students = session.query(Student).filter(Student.name == name).all()
+        assert len(students) == 1
+        interventions = session.query(InterventionRecord).filter(InterventionRecord.student_id == students[0].id)
+        assert interventions.count() == 1
+    finally:
+        session.query(InterventionRecord).filter(
+            InterventionRecord.student_id.in_(session.query(Student.id).filter(Student.name == name))
+        ).delete(synchronize_session=False)
+        session.commit()
+        session.close()
+        repository.delete_benchmark_records()
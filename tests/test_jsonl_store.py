@@ -0,0 +1,76 @@
+from datetime import datetime
+
+from utils.jsonl_store import JsonlStore, PartitionedJsonlStore, stress_test
+
+
+def test_append_and_load(tmp_path):
+    store = JsonlStore(str(tmp_path / 'records.jsonl'), fsync_policy='never')
+    store.append({'seq': 1})
+    store.extend([{'seq': 2}, {'seq': 3}])
+
+    assert [record['seq'] for record in store.load()] == [1, 2, 3]
+
+
+def test_append_after_torn_line_keeps_new_record(tmp_path):
+    path = tmp_path / 'records.jsonl'
+    store = JsonlStore(str(path), fsync_policy='never')
+    store.extend([{'seq': 1}, {'seq': 2}])
+    path.write_bytes(path.read_bytes()[:-4])
+
+    store.append({'seq': 3})
+    store.extend([{'seq': 4}])
+
+    assert [record['seq'] for record in store.load()] == [1, 3, 4]
+
+
+def test_concurrent_writers_and_compaction_lose_nothing():
+    result = stress_test(processes=4, records_per_process=200)
+
+    assert result['writer_failures'] == 0
+    assert result['stored'] == result['expected']
+    assert result['missing'] == 0
+    assert result['duplicates'] == 0
+    assert result['passed']
+
+
+def test_concurrent_writers_on_legacy_json_array_lose_nothing():
+    result = stress_test(processes=4, records_per_process=50, legacy=True)
+
+    assert result['missing'] == 0
+    assert result['duplicates'] == 0
+    assert result['passed']
+
+
+def _dated(month, day, seq):
+    return {'timestamp': f'2025-{month:02d}-{day:02d}T12:00:00', 'seq': seq}
+
+
+def test_drop_before_keeps_lock_files(tmp_path):
+    store = PartitionedJsonlStore(str(tmp_path), fsync_policy='never')
+    store.extend([_dated(1, 10, 1), _dated(2, 10, 2), _dated(3, 10, 3)])
+
+    result = store.drop_before(datetime(2025, 3, 1), lambda records: records)
+
+    assert result['dropped_partitions'] == ['2025-01', '2025-02']
+    assert result['removed'] == 2
+    assert (tmp_path / '2025-01.jsonl.lock').exists()
+    assert not (tmp_path / '2025-01.jsonl').exists()
+
+
+def test_drop_before_only_rewrites_the_cutoff_month_when_records_go(tmp_path):
+    store = PartitionedJsonlStore(str(tmp_path), fsync_policy='never')
+    store.extend([_dated(3, 5, 1), _dated(3, 20, 2)])
+    path = tmp_path / '2025-03.jsonl'
+    inode = path.stat().st_ino
+    cutoff = datetime(2025, 3, 1)
+
+    def keep(records):
+        return [record for record in records if datetime.fromisoformat(record['timestamp']) >= cutoff]
+
+    assert store.drop_before(cutoff, keep)['removed'] == 0
+    assert path.stat().st_ino == inode
+
+    cutoff = datetime(2025, 3, 10)
+    assert store.drop_before(cutoff, keep)['removed'] == 1
+    assert path.stat().st_ino != inode
+    assert [record['seq'] for record in store.load()] == [2]
@@ -0,0 +1,76 @@
+import os
+import sqlite3
+
+import pytest
+
+from utils.migrations import LATEST_VERSION, MIGRATIONS, check_query_plans, get_applied_versions, migrate
+from utils.sqlite_utils import SCHEMA
+
+
+@pytest.fixture
+def sqlite_conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'eduscan.db'))
+    conn.executescript(SCHEMA)
+    yield conn
+    conn.close()
+
+
+def test_migrate_applies_every_version_once(sqlite_conn):
+    assert migrate(sqlite_conn, 'sqlite') == [version for version, _, _ in MIGRATIONS]
+    assert max(get_applied_versions(sqlite_conn)) == LATEST_VERSION
+    assert migrate(sqlite_conn, 'sqlite') == []
+
+
+def test_migrate_stops_at_target(sqlite_conn):
+    assert migrate(sqlite_conn, 'sqlite', target=2) == [1, 2]
+    assert migrate(sqlite_conn, 'sqlite') == [version for version, _, _ in MIGRATIONS if version > 2]
+
+
+def test_sqlite_hot_queries_use_their_indexes(sqlite_conn):
+    migrate(sqlite_conn, 'sqlite')
+
+    failed = [(result['name'], result['plan']) for result in check_query_plans(sqlite_conn, 'sqlite') if not result['ok']]
+
+    assert failed == []
+
+
+def _seed_benchmark_rows(conn, students=200, rows=5000):
+    """Rows for benchmark students, so the planner compares the indexes on realistic statistics"""
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO students (name, grade_level)
+        SELECT 'eduscan-benchmark-' || g, '3' FROM generate_series(0, %s - 1) g
+    """, (students,))
+    cur.execute("""
+        INSERT INTO parent_observations (student_id, child_name, date, timestamp)
+        SELECT s.id, s.name, DATE '1900-01-01' + (g %% 365), TIMESTAMP '1900-01-01' + g * INTERVAL '1 hour'
+        FROM generate_series(0, %s - 1) g
+        JOIN students s ON s.name = 'eduscan-benchmark-' || (g %% %s)
+    """, (rows, students))
+    cur.execute("""
+        INSERT INTO predictions (student_id, probability, timestamp)
+        SELECT s.id, 0.5, TIMESTAMP '1900-01-01' + g * INTERVAL '1 hour'
+        FROM generate_series(0, %s - 1) g
+        JOIN students s ON s.name = 'eduscan-benchmark-' || (g %% %s)
+    """, (rows, students))
+    conn.commit()
+    for table in ('students', 'predictions', 'parent_observations'):
+        cur.execute(f"ANALYZE {table}")
+    conn.commit()
+
+
+@pytest.mark.skipif(not os.environ.get('DATABASE_URL'), reason="needs a PostgreSQL server (DATABASE_URL)")
+def test_postgres_hot_queries_use_their_indexes():
+    from utils.db_utils import db_connection, delete_benchmark_students
+
+    # On empty tables every index is equally cheap and the planner's pick is arbitrary
+    delete_benchmark_students()
+    try:
+        with db_connection() as conn:
+            assert conn is not None
+            _seed_benchmark_rows(conn)
+            results = check_query_plans(conn, 'postgresql')
+    finally:
+        delete_benchmark_students()
+
+    assert [(result['name'], result['plan']) for result in results if not result['ok']] == []
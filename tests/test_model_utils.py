@@ -0,0 +1,61 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.model_artifact import export_artifact, load_artifact
+from utils.model_utils import (
+    batch_prediction_records, get_cached_model, get_model_manager, predict_batch, verify_fused_model
+)
+
+
+def _fused_model():
+    return get_model_manager().get_compiled(get_cached_model(), fused=True)
+
+
+@pytest.mark.skipif(_fused_model() is None, reason="model cannot be compiled into a fused forest")
+def test_fused_model_matches_sklearn_pipeline():
+    result = verify_fused_model(n_random=2000, seed=0)
+
+    assert result['rows_checked'] > 2000
+    assert result['mismatches'] == 0
+    assert result['identical']
+
+
+@pytest.mark.skipif(_fused_model() is None, reason="model cannot be compiled into a fused forest")
+def test_fused_model_matches_on_other_inputs():
+    result = verify_fused_model(n_random=500, seed=42)
+
+    assert result['mismatches'] == 0
+
+
+def test_batch_records_treat_missing_names_as_missing():
+    upload = pd.read_csv(io.StringIO(
+        "student_name,grade_level,math_score,reading_score,writing_score,attendance,behavior,literacy\n"
+        "Amina,3,80,75,70,95,4,7\n"
+        ",,55,50,45,70,2,4\n"
+        "  ,4,60,60,60,80,3,5\n"
+    ))
+
+    records = batch_prediction_records(predict_batch(upload), model_version='v1', timestamp='2025-01-01T00:00:00')
+
+    assert [record['student_name'] for record in records] == ['Amina', 'Student 2', 'Student 3']
+    assert [record['grade_level'] for record in records] == ['3', 'Unknown', '4']
+    assert records[0]['model_version'] == 'v1'
+    assert records[1]['math_score'] == 55.0
+
+
+def test_reexport_leaves_mapped_arrays_intact(tmp_path):
+    directory = str(tmp_path / 'artifact')
+    export_artifact(get_cached_model(), directory)
+    mapped = load_artifact(directory)['model']
+    threshold = np.array(mapped.threshold)
+    inode = os.stat(os.path.join(directory, 'threshold.npy')).st_ino
+
+    export_artifact(get_cached_model(), directory)
+
+    assert os.stat(os.path.join(directory, 'threshold.npy')).st_ino != inode
+    assert np.array_equal(mapped.threshold, threshold)
+    assert not [name for name in os.listdir(directory) if name.endswith('.tmp')]
@@ -0,0 +1,274 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.repository import (
+    BENCHMARK_PREFIX, BENCHMARK_START, TREND_GRANULARITIES, FileRepository, Repository, open_repository
+)
+
+ROWS = 60
+
+
+def _predictions(rows, students=5):
+    """Benchmark predictions, oldest first and one hour apart, so they are safe on a live database"""
+    records = []
+    for i in range(rows):
+        math_score = (i * 37) % 100
+        reading_score = (i * 53) % 100
+        records.append({
+            'timestamp': (BENCHMARK_START + timedelta(hours=i)).isoformat(),
+            'student_name': f'{BENCHMARK_PREFIX}{i % students}',
+            'grade_level': '3',
+            'math_score': math_score,
+            'reading_score': reading_score,
+            'writing_score': (math_score + reading_score) / 2,
+            'attendance': 50 + (i * 11) % 50,
+            'behavior': 1 + i % 5,
+            'literacy': 1 + i % 10,
+            'prediction': int(math_score < 40),
+            'probability': 1 - math_score / 100,
+            'risk_level': 'High Risk' if math_score < 30 else 'Medium Risk' if math_score < 60 else 'Low Risk',
+            'model_version': 'benchmark',
+            'notes': ''
+        })
+    return records
+
+
+def _observations(rows, children=3):
+    return [
+        {
+            'child_name': f'{BENCHMARK_PREFIX}child-{i % children}',
+            'date': (BENCHMARK_START + timedelta(days=i)).date().isoformat(),
+            'homework_completion': (i * 7) % 100,
+            'reading_time': 10 + i % 30,
+            'focus_level': 'Good',
+            'subjects_struggled': ['Math', 'Reading'][:i % 3],
+            'behavior_rating': 1 + i % 5,
+            'mood_rating': 1 + (i * 3) % 5,
+            'sleep_hours': 8 + i % 3,
+            'energy_level': 'Normal',
+            'social_interactions': '',
+            'learning_wins': '',
+            'challenges_faced': '',
+            'strategies_used': '',
+            'screen_time': i % 4,
+            'physical_activity': 30,
+            'medication_taken': i % 2 == 0,
+            'special_events': '',
+            'timestamp': (BENCHMARK_START + timedelta(days=i, hours=20)).isoformat()
+        }
+        for i in range(rows)
+    ]
+
+
+def _comparable(field, value):
+    if field in ('date', 'timestamp') and isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _benchmark_only(records, field):
+    return [record for record in records if str(record.get(field, '')).startswith(BENCHMARK_PREFIX)]
+
+
+def _assert_same_records(actual, expected, key='timestamp'):
+    loaded = {_comparable(key, record.get(key)): record for record in actual}
+    assert len(loaded) == len(expected)
+    for record in expected:
+        match = loaded[_comparable(key, record[key])]
+        for field, value in record.items():
+            assert _comparable(field, match.get(field)) == _comparable(field, value), field
+
+
+def _timestamps(records):
+    return [_comparable('timestamp', record['timestamp']) for record in records]
+
+
+def _newest_first(records):
+    return sorted(records, key=lambda record: record['timestamp'], reverse=True)
+
+
+@pytest.fixture(params=['jsonl', 'json', 'sqlite', 'postgres'])
+def repository(request, tmp_path, sqlite_over_file_store):
+    """Each backend, empty of benchmark records; PostgreSQL only with DATABASE_URL"""
+    if request.param == 'jsonl':
+        repository = sqlite_over_file_store
+    elif request.param == 'json':
+        (tmp_path / 'json').mkdir()
+        repository = FileRepository(str(tmp_path / 'json'), 'json')
+    elif request.param == 'sqlite':
+        repository = open_repository('sqlite')
+    else:
+        if not os.environ.get('DATABASE_URL'):
+            pytest.skip("needs a PostgreSQL server (DATABASE_URL)")
+        repository = open_repository('postgres')
+
+    repository.delete_benchmark_records()
+    yield repository
+    repository.delete_benchmark_records()
+
+
+@pytest.fixture
+def stored(repository):
+    """The repository with ROWS benchmark predictions and half as many observations saved"""
+    predictions = _predictions(ROWS)
+    observations = _observations(ROWS // 2)
+    assert repository.save_prediction(predictions[0]) is True
+    assert repository.save_predictions(predictions[1:]) == ROWS - 1
+    assert all(repository.save_observation(record) is True for record in observations)
+    return repository, predictions, observations
+
+
+def test_saving_changes_the_signature(repository):
+    signature = repository.signature('predictions')
+
+    repository.save_prediction(_predictions(1)[0])
+
+    assert repository.signature('predictions') != signature
+
+
+def test_load_returns_what_was_saved(stored):
+    repository, predictions, observations = stored
+
+    _assert_same_records(_benchmark_only(repository.load_predictions(), 'student_name'), predictions)
+    _assert_same_records(_benchmark_only(repository.load_observations(), 'child_name'), observations)
+
+
+def test_pages_and_stream_return_one_student_newest_first(stored):
+    repository, predictions, _ = stored
+    student = predictions[0]['student_name']
+    expected = _timestamps(_newest_first(record for record in predictions if record['student_name'] == student))
+
+    paged, cursor = [], None
+    for _ in range(len(expected) + 1):
+        page, cursor = repository.load_predictions_page(limit=4, after=cursor, student_name=student)
+        paged += page
+        if cursor is None:
+            break
+
+    assert _timestamps(paged) == expected
+    assert cursor is None
+    assert _timestamps(repository.iter_predictions(batch_size=4, student_name=student)) == expected
+
+
+def test_child_observations_match_the_in_memory_reference(stored):
+    repository, _, observations = stored
+    child = observations[0]['child_name']
+    start, end = observations[3]['date'], observations[21]['date']
+
+    for bounds in ((None, None), (start, None), (None, end), (start, end)):
+        actual = repository.child_observations(child, *bounds)
+        reference = Repository.child_observations(repository, child, *bounds)
+        assert _timestamps(actual) == _timestamps(reference)
+        assert actual and all(record['child_name'] == child for record in actual)
+    assert repository.child_observations(f'{BENCHMARK_PREFIX}nobody') == []
+
+
+def test_student_names_are_sorted(stored):
+    repository, predictions, _ = stored
+
+    names = repository.student_names()
+
+    assert names == sorted(names)
+    assert _benchmark_only([{'name': name} for name in names], 'name') == [
+        {'name': name} for name in sorted({record['student_name'] for record in predictions})
+    ]
+
+
+@pytest.mark.parametrize('granularity', TREND_GRANULARITIES)
+def test_risk_trends_match_the_in_memory_reference(stored, granularity):
+    repository, _, _ = stored
+
+    assert sorted(repository.risk_trend_counts(granularity)) == sorted(
+        Repository.risk_trend_counts(repository, granularity))
+
+
+def test_score_correlations_match_the_in_memory_reference(stored):
+    repository, _, _ = stored
+
+    actual = repository.score_correlations()
+    reference = Repository.score_correlations(repository)
+
+    assert actual.keys() == reference.keys()
+    for pair, value in reference.items():
+        if value is None:
+            assert actual[pair] is None
+        else:
+            assert actual[pair] == pytest.approx(value, abs=1e-6)
+
+
+def test_stats_count_the_saved_records(repository):
+    repository.clear_caches()
+    before = repository.get_stats()
+    repository.save_predictions(_predictions(ROWS))
+    for record in _observations(3):
+        repository.save_observation(record)
+
+    repository.clear_caches()
+    stats = repository.get_stats()
+
+    assert stats['total_predictions'] - before['total_predictions'] == ROWS
+    assert stats['total_observations'] - before['total_observations'] == 3
+
+
+def test_unknown_user_is_not_authenticated(repository):
+    assert repository.authenticate(f'{BENCHMARK_PREFIX}user', 'wrong') is None
+
+
+def test_delete_before_keeps_records_at_the_cutoff(stored):
+    repository, predictions, _ = stored
+    cutoff = datetime.fromisoformat(predictions[ROWS // 2]['timestamp'])
+
+    result = repository.delete_before('predictions', cutoff)
+
+    assert result['removed'] == ROWS // 2
+    _assert_same_records(_benchmark_only(repository.load_predictions(), 'student_name'), predictions[ROWS // 2:])
+
+
+def _pages(repository, limit, after=None):
+    pages = []
+    while True:
+        page, after = repository.load_predictions_page(limit=limit, after=after)
+        pages.append([record['timestamp'] for record in page])
+        if after is None:
+            return pages
+
+
+def test_pages_cover_every_prediction_once(sqlite_over_file_store):
+    records = _predictions(11)
+    newest_first = sorted((record['timestamp'] for record in records), reverse=True)
+    sqlite = open_repository('sqlite')
+    sqlite.save_predictions(records)
+    sqlite_over_file_store.save_predictions(records)
+
+    for repository in (sqlite, sqlite_over_file_store):
+        pages = _pages(repository, limit=4)
+        assert [len(page) for page in pages] == [4, 4, 3]
+        assert sum(pages, []) == newest_first
+
+
+def test_paging_continues_after_switching_stores(sqlite_over_file_store, tmp_path):
+    # The same records in both stores, as when the database fails mid-pagination
+    records = _predictions(10)
+    newest_first = sorted((record['timestamp'] for record in records), reverse=True)
+    sqlite = open_repository('sqlite')
+    sqlite.save_predictions(records)
+    sqlite_over_file_store.save_predictions(records)
+    (tmp_path / 'json').mkdir()
+    json_store = FileRepository(str(tmp_path / 'json'), 'json')
+    json_store.save_predictions(records)
+
+    first, cursor = sqlite.load_predictions_page(limit=3)
+    second, cursor = sqlite_over_file_store.load_predictions_page(limit=3, after=cursor)
+    third, cursor = json_store.load_predictions_page(limit=3, after=cursor)
+    fourth, cursor = sqlite.load_predictions_page(limit=3, after=cursor)
+
+    paged = [record['timestamp'] for record in first + second + third + fourth]
+    assert paged == newest_first
+    assert cursor is None
@@ -1,19 +1,20 @@
-import json
 import os
 import sys
+import threading
+import time
 from datetime import datetime
 import pandas as pd
+from utils.observation_index import ObservationIndex
+from utils.repository import ANALYTICS_COLUMNS, FileRepository, clear_data_cache, get_data_cache_stats, open_repository
 
-# Import database functions
-try:
-    from utils.db_utils import (
-        save_prediction_to_db, save_parent_observation_to_db,
-        load_student_predictions, load_parent_observations, authenticate_user_db,
-        get_database_stats
-    )
-    DATABASE_AVAILABLE = True
-except ImportError:
-    DATABASE_AVAILABLE = False
+# File format of the fallback store: 'jsonl' (append-only files partitioned
+# by month, default) or the legacy 'json' arrays
+FILE_STORAGE_FORMAT = os.environ.get('EDUSCAN_FILE_STORAGE', 'jsonl')
+
+# Database backend: 'postgres' (utils/db_utils, needs DATABASE_URL), 'sqlite'
+# (embedded file database, the default without DATABASE_URL) or 'files' to
+# use only the JSON/JSONL store
+DATABASE_BACKEND = os.environ.get('EDUSCAN_DB_BACKEND') or ('postgres' if os.environ.get('DATABASE_URL') else 'sqlite')
 
 def get_data_directory():
     """Get the correct path for the data directory"""
@@ -28,253 +29,236 @@ def get_data_directory():
     os.makedirs(data_dir, exist_ok=True)
     return data_dir
 
-def save_prediction_data(prediction_record):
-    """Save prediction data to database or JSON file as fallback"""
-    # Try database first if available
+# Every read and write goes through a repository (utils/repository). The file
+# store is also where records go while the database fails
+_file_repository = FileRepository(get_data_directory(), FILE_STORAGE_FORMAT)
+
+try:
+    _repository = _file_repository if DATABASE_BACKEND == 'files' else open_repository(DATABASE_BACKEND)
+except (ImportError, ValueError):
+    _repository = _file_repository
+
+DATABASE_AVAILABLE = _repository is not _file_repository
+
+def get_repository():
+    """Get the repository of the configured backend (the file store without a database)"""
+    return _repository
+
+def get_record_store(name):
+    """
+    Get the month-partitioned store for 'student_data' or 'parent_observations'
+    
+    Records live in data/<name>/<YYYY-MM>.jsonl. Older single-file stores
+    (data/<name>.json or data/<name>.jsonl) are migrated on first use.
+    """
+    return _file_repository.get_store(name)
+
+# A database save that returns False (or 0) wrote nothing, e.g. because no
+# connection could be opened, so the records go to the file store instead
+_SAVE_OPERATIONS = ('save_prediction', 'save_predictions', 'save_observation')
+
+def _with_fallback(operation, *args):
+    """Run a repository operation on the database, or on the file store when there is none or it fails"""
     if DATABASE_AVAILABLE:
         try:
-            return save_prediction_to_db(prediction_record)
+            result = getattr(_repository, operation)(*args)
+            if result or operation not in _SAVE_OPERATIONS:
+                return result
+            print("Database did not save the record, falling back to JSON")
         except Exception as e:
             print(f"Database error, falling back to JSON: {e}")
     
-    # Fallback to JSON file storage
-    try:
-        data_dir = get_data_directory()
-        file_path = os.path.join(data_dir, 'student_data.json')
-        
-        # Load existing data
-        existing_data = []
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r') as f:
-                    existing_data = json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                existing_data = []
-        
-        # Add new record
-        existing_data.append(prediction_record)
-        
-        # Save updated data
-        with open(file_path, 'w') as f:
-            json.dump(existing_data, f, indent=2)
-        
-        return True
+    return getattr(_file_repository, operation)(*args)
+
+def save_prediction_data(prediction_record):
+    """Save prediction data to database or JSON file as fallback"""
+    return _with_fallback('save_prediction', prediction_record)
+
+def save_prediction_batch(prediction_records):
+    """
+    Save many prediction records at once (e.g. a scored batch upload)
     
-    except Exception as e:
-        print(f"Error saving prediction data: {e}")
-        return False
+    Returns:
+        int: number of records saved
+    """
+    if not prediction_records:
+        return 0
+    
+    return _with_fallback('save_predictions', prediction_records)
 
 def load_student_data():
-    """Load student prediction data from database or JSON file as fallback"""
-    # Try database first if available
-    if DATABASE_AVAILABLE:
-        try:
-            return load_student_predictions()
-        except Exception as e:
-            print(f"Database error, falling back to JSON: {e}")
+    """Load student prediction data, cached until the database or file changes"""
+    # A new list each call, so callers can sort or filter it in place
+    return list(_with_fallback('load_predictions'))
+
+def load_student_dataframe():
+    """Load student prediction data as a DataFrame, cached like load_student_data"""
+    return _with_fallback('load_dataframe', 'predictions').copy(deep=False)
+
+def load_student_data_page(limit=50, after=None, student_name=None):
+    """
+    Load one page of prediction records, newest first
     
-    # Fallback to JSON file storage
-    try:
-        data_dir = get_data_directory()
-        file_path = os.path.join(data_dir, 'student_data.json')
-        
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-            return data
-        else:
-            return []
+    The database is paged with a keyset query, so only the page is read.
+    Pass the returned cursor back as `after` for the next page; it is None
+    after the last page.
     
-    except Exception as e:
-        print(f"Error loading student data: {e}")
-        return []
+    Returns:
+        tuple: (records, next cursor)
+    """
+    return _with_fallback('load_predictions_page', limit, after, student_name)
 
-def save_parent_observation(observation_data):
-    """Save parent observation data to database or JSON file as fallback"""
-    # Try database first if available
+def iter_student_data(batch_size=1000, student_name=None):
+    """
+    Iterate over prediction records, newest first, without loading them all
+    
+    From the database the rows are streamed in batches through a server-side
+    cursor. When the database fails before the first record the file store
+    is read instead; a failure later is raised rather than ending the
+    iteration early.
+    """
     if DATABASE_AVAILABLE:
+        streamed = False
         try:
-            return save_parent_observation_to_db(observation_data)
+            for record in _repository.iter_predictions(batch_size, student_name):
+                streamed = True
+                yield record
+            return
         except Exception as e:
+            # Switching stores mid-stream would repeat or skip records
+            if streamed:
+                raise
             print(f"Database error, falling back to JSON: {e}")
     
-    # Fallback to JSON file storage
-    try:
-        data_dir = get_data_directory()
-        file_path = os.path.join(data_dir, 'parent_observations.json')
-        
-        # Load existing data
-        existing_data = []
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r') as f:
-                    existing_data = json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                existing_data = []
-        
-        # Add new observation
-        existing_data.append(observation_data)
-        
-        # Save updated data
-        with open(file_path, 'w') as f:
-            json.dump(existing_data, f, indent=2)
-        
-        return True
+    yield from _file_repository.iter_predictions(batch_size, student_name)
+
+def get_risk_trends(granularity='day'):
+    """
+    Count predictions per period (rows) and risk level (columns)
     
-    except Exception as e:
-        print(f"Error saving parent observation: {e}")
-        return False
+    With a database the counts are aggregated in SQL, so only one row per
+    period and risk level is transferred; the file store counts in pandas.
+    
+    Args:
+        granularity (str): 'day', 'week' (starting Monday) or 'month'
+    """
+    if granularity not in ('day', 'week', 'month'):
+        raise ValueError(f"Unknown granularity: {granularity}")
+    
+    counts = pd.DataFrame(_with_fallback('risk_trend_counts', granularity), columns=['period', 'risk_level', 'count'])
+    if counts.empty:
+        return pd.DataFrame()
+    return counts.pivot_table(index='period', columns='risk_level', values='count', aggfunc='sum', fill_value=0)
+
+def get_performance_correlation(columns=ANALYTICS_COLUMNS):
+    """
+    Correlation matrix of the score columns
+    
+    Computed by the database in a single aggregate query when there is one;
+    the file store falls back to pandas.
+    """
+    columns = list(columns)
+    unknown = [column for column in columns if column not in ANALYTICS_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    
+    correlations = _with_fallback('score_correlations', columns)
+    if not correlations:
+        return pd.DataFrame()
+    return pd.DataFrame(
+        [[correlations.get((a, b)) for b in columns] for a in columns],
+        index=columns, columns=columns, dtype=float
+    )
+
+def get_student_names():
+    """Names of students with saved predictions, sorted"""
+    return _with_fallback('student_names')
+
+def get_student_progress(student_name):
+    """One student's predictions as a DataFrame, oldest first (an indexed lookup with a database)"""
+    df = pd.DataFrame(list(iter_student_data(student_name=student_name)))
+    if df.empty:
+        return df
+    df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
+    return df.sort_values('timestamp').reset_index(drop=True)
+
+def save_parent_observation(observation_data):
+    """Save parent observation data to database or JSON file as fallback"""
+    return _with_fallback('save_observation', observation_data)
 
 def load_parent_observations():
-    """Load parent observation data from database or JSON file as fallback"""
-    # Try database first if available
-    if DATABASE_AVAILABLE:
-        try:
-            from utils.db_utils import load_parent_observations as db_load_observations
-            return db_load_observations()
-        except Exception as e:
-            print(f"Database error, falling back to JSON: {e}")
+    """Load parent observation data, cached until the database or file changes"""
+    return list(_with_fallback('load_observations'))
+
+def load_parent_observations_dataframe():
+    """Load parent observation data as a DataFrame, cached like load_parent_observations"""
+    return _with_fallback('load_dataframe', 'parent_observations').copy(deep=False)
+
+_observation_index = {'signature': None, 'index': None, 'positions': None}
+_observation_index_lock = threading.Lock()
+
+def _get_observation_index():
+    """
+    Get the per-child index of the file store's observations, updated for new ones
     
-    # Fallback to JSON file storage
-    try:
-        data_dir = get_data_directory()
-        file_path = os.path.join(data_dir, 'parent_observations.json')
-        
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                if content:
-                    data = json.loads(content)
-                    # Ensure data is a list
-                    if isinstance(data, list):
-                        return data
-                    else:
-                        return []
-                else:
-                    return []
+    With the JSONL store only lines appended since the last call are read
+    and inserted; a rewritten or dropped partition, or a changed JSON file,
+    rebuilds it. Databases query their (child_name, date) index instead.
+    """
+    signature = _file_repository.signature('parent_observations')
+    
+    with _observation_index_lock:
+        state = _observation_index
+        if signature is not None and signature == state['signature']:
+            return state['index']
+        
+        if signature is not None and signature[0] == 'jsonl':
+            store = get_record_store('parent_observations')
+            positions = state['positions'] if state['index'] is not None else None
+            records, state['positions'], complete = store.read_since(positions)
+            if complete:
+                state['index'] = ObservationIndex(records)
+            else:
+                for obs in records:
+                    state['index'].add(obs)
         else:
-            # Create empty file if it doesn't exist
-            with open(file_path, 'w') as f:
-                json.dump([], f)
-            return []
+            state['index'] = ObservationIndex(_file_repository.load_observations())
+            state['positions'] = None
+        
+        state['signature'] = signature
+        return state['index']
+
+def get_child_observations(child_name, start_date=None, end_date=None):
+    """
+    Get one child's observations between two dates (inclusive), oldest first
     
-    except (json.JSONDecodeError, UnicodeDecodeError, TypeError) as e:
-        print(f"JSON parsing error, creating new file: {e}")
-        # Create fresh file if corrupted
-        try:
-            data_dir = get_data_directory()
-            file_path = os.path.join(data_dir, 'parent_observations.json')
-            with open(file_path, 'w') as f:
-                json.dump([], f)
-        except:
-            pass
-        return []
+    Args:
+        child_name (str): child as entered in the Parent Tracker
+        start_date (date): first day, or None for no lower bound
+        end_date (date): last day, or None for no upper bound
+    """
+    try:
+        if DATABASE_AVAILABLE:
+            try:
+                return _repository.child_observations(child_name, start_date, end_date)
+            except Exception as e:
+                print(f"Database error, falling back to JSON: {e}")
+        return list(_get_observation_index().query(child_name, start_date, end_date))
     except Exception as e:
-        print(f"Error loading parent observations: {e}")
+        print(f"Error reading observation index: {e}")
         return []
 
 def save_user_data(user_data):
     """Save user authentication data"""
-    try:
-        data_dir = get_data_directory()
-        file_path = os.path.join(data_dir, 'users.json')
-        
-        # Load existing users
-        existing_users = []
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r') as f:
-                    existing_users = json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                existing_users = []
-        
-        # Check if user already exists
-        user_exists = False
-        for i, user in enumerate(existing_users):
-            if user['username'] == user_data['username']:
-                existing_users[i] = user_data
-                user_exists = True
-                break
-        
-        if not user_exists:
-            existing_users.append(user_data)
-        
-        # Save updated users
-        with open(file_path, 'w') as f:
-            json.dump(existing_users, f, indent=2)
-        
-        return True
-    
-    except Exception as e:
-        print(f"Error saving user data: {e}")
-        return False
+    return _file_repository.save_user(user_data)
 
 def load_user_data():
-    """Load user authentication data"""
-    try:
-        data_dir = get_data_directory()
-        file_path = os.path.join(data_dir, 'users.json')
-        
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-            return data
-        else:
-            # Create default admin user
-            default_users = [
-                {
-                    "username": "admin",
-                    "password": "admin123",
-                    "user_type": "teacher",
-                    "full_name": "Administrator",
-                    "email": "admin@school.edu",
-                    "created_date": datetime.now().isoformat()
-                },
-                {
-                    "username": "teacher1",
-                    "password": "teacher123",
-                    "user_type": "teacher", 
-                    "full_name": "Demo Teacher",
-                    "email": "teacher@school.edu",
-                    "created_date": datetime.now().isoformat()
-                },
-                {
-                    "username": "parent1",
-                    "password": "parent123",
-                    "user_type": "parent",
-                    "full_name": "Demo Parent",
-                    "email": "parent@email.com",
-                    "created_date": datetime.now().isoformat()
-                }
-            ]
-            
-            # Save default users
-            with open(file_path, 'w') as f:
-                json.dump(default_users, f, indent=2)
-            
-            return default_users
-    
-    except Exception as e:
-        print(f"Error loading user data: {e}")
-        return []
+    """Load user authentication data, creating the default users on first use"""
+    return _file_repository.load_users()
 
 def authenticate_user(username, password):
     """Authenticate user credentials using database or JSON fallback"""
-    # Try database first if available
-    if DATABASE_AVAILABLE:
-        try:
-            return authenticate_user_db(username, password)
-        except Exception as e:
-            print(f"Database error, falling back to JSON: {e}")
-    
-    # Fallback to JSON file authentication
-    users = load_user_data()
-    
-    for user in users:
-        if user['username'] == username and user['password'] == password:
-            return user
-    
-    return None
+    return _with_fallback('authenticate', username, password)
 
 def export_data_to_csv(data_type='predictions'):
     """Export data to CSV format"""
@@ -302,90 +286,61 @@ def export_data_to_csv(data_type='predictions'):
         return None, f"Error exporting data: {e}"
 
 def get_data_summary():
-    """Get summary statistics of stored data"""
-    try:
-        predictions = load_student_data()
-        observations = load_parent_observations()
-        users = load_user_data()
-        
-        summary = {
-            'total_predictions': len(predictions),
-            'total_observations': len(observations),
-            'total_users': len(users),
-            'last_prediction_date': None,
-            'last_observation_date': None
-        }
-        
-        if predictions:
-            latest_prediction = max(predictions, key=lambda x: x.get('timestamp', ''))
-            summary['last_prediction_date'] = latest_prediction.get('timestamp')
-        
-        if observations:
-            latest_observation = max(observations, key=lambda x: x.get('timestamp', ''))
-            summary['last_observation_date'] = latest_observation.get('timestamp')
-        
-        return summary
+    """
+    Get summary statistics of stored data
     
-    except Exception as e:
-        print(f"Error getting data summary: {e}")
-        return {
-            'total_predictions': 0,
-            'total_observations': 0,
-            'total_users': 0,
-            'last_prediction_date': None,
-            'last_observation_date': None
-        }
+    With a database these come from its row counters (cached for a few
+    seconds); the file store has to be loaded and counted.
+    """
+    return _with_fallback('get_stats')
 
 def clean_old_data(days_old=90):
-    """Clean data older than specified days"""
+    """
+    Remove predictions and observations older than days_old
+    
+    The database (when in use) is cleaned with batched DELETEs and the file
+    store by dropping whole month partitions; neither is rewritten from the
+    other. Records without a valid timestamp are kept.
+    """
     try:
         from datetime import datetime, timedelta
         cutoff_date = datetime.now() - timedelta(days=days_old)
+        start = time.perf_counter()
+        
+        result = {
+            'removed_predictions': 0,
+            'removed_observations': 0,
+            'remaining_predictions': 0,
+            'remaining_observations': 0,
+            'dropped_partitions': []
+        }
+        tables = (('predictions', 'predictions'), ('parent_observations', 'observations'))
         
-        # Clean predictions
-        predictions = load_student_data()
-        filtered_predictions = []
-        
-        for pred in predictions:
-            try:
-                pred_date = datetime.fromisoformat(pred.get('timestamp', ''))
-                if pred_date > cutoff_date:
-                    filtered_predictions.append(pred)
-            except ValueError:
-                # Keep records without valid timestamps
-                filtered_predictions.append(pred)
-        
-        # Clean observations
-        observations = load_parent_observations()
-        filtered_observations = []
-        
-        for obs in observations:
+        # Database: delete in place
+        database_cleaned = False
+        if DATABASE_AVAILABLE:
             try:
-                obs_date = datetime.fromisoformat(obs.get('timestamp', ''))
-                if obs_date > cutoff_date:
-                    filtered_observations.append(obs)
-            except ValueError:
-                # Keep records without valid timestamps
-                filtered_observations.append(obs)
-        
-        # Save cleaned data
-        data_dir = get_data_directory()
-        
-        with open(os.path.join(data_dir, 'student_data.json'), 'w') as f:
-            json.dump(filtered_predictions, f, indent=2)
-        
-        with open(os.path.join(data_dir, 'parent_observations.json'), 'w') as f:
-            json.dump(filtered_observations, f, indent=2)
-        
-        removed_predictions = len(predictions) - len(filtered_predictions)
-        removed_observations = len(observations) - len(filtered_observations)
-        
-        return {
-            'removed_predictions': removed_predictions,
-            'removed_observations': removed_observations,
-            'remaining_predictions': len(filtered_predictions),
-            'remaining_observations': len(filtered_observations)
-        }
+                cleaned = {table: _repository.delete_before(table, cutoff_date) for table, _ in tables}
+                if None not in cleaned.values():
+                    for table, kind in tables:
+                        result[f'removed_{kind}'] += cleaned[table]['removed']
+                        result[f'remaining_{kind}'] = cleaned[table]['remaining']
+                    database_cleaned = True
+            except Exception as e:
+                print(f"Database error while cleaning old data: {e}")
+        
+        # File store: records saved while the database was unavailable
+        for table, kind in tables:
+            store_result = _file_repository.delete_before(table, cutoff_date)
+            name = FileRepository.STORES[table]
+            result[f'removed_{kind}'] += store_result['removed']
+            result['dropped_partitions'] += [f"{name}/{partition}" for partition in store_result['dropped_partitions']]
+            if not database_cleaned:
+                result[f'remaining_{kind}'] = store_result['remaining']
+        
+        clear_data_cache()
+        result['seconds'] = time.perf_counter() - start
+        return result
     
     except Exception as e:
         print(f"Error cleaning old data: {e}")
@@ -4,342 +4,850 @@ Direct database operations without SQLAlchemy complexity
 """
 
 import os
+import threading
+import time
+from contextlib import contextmanager
 import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+from psycopg2.extras import execute_values
 import json
 from datetime import datetime, date
 import logging
+from utils.migrations import ROW_COUNTERS_VERSION, get_applied_versions, migrate, normalize_subjects
+from utils.repository import (
+    ANALYTICS_COLUMNS, OBSERVATION_FIELDS, PREDICTION_SELECT, TREND_GRANULARITIES, prediction_extra,
+    prediction_from_row, record_from_row
+)
+from utils.student_identity import StudentIdCache
+from utils.table_counters import (
+    COUNTED_TABLES, SELECT_COUNTERS, STATS_ESTIMATE, StatsCache, combined_stats_query, empty_stats,
+    stats_from_counters, stats_from_row
+)
 
 logger = logging.getLogger(__name__)
 
-def get_db_connection():
-    """Get PostgreSQL database connection"""
+# Connection pool settings. MIN connections are opened up front and kept
+# open while idle; up to MAX are opened under load (psycopg2 closes the ones
+# above MIN when they are returned)
+POOL_MIN_SIZE = int(os.environ.get('EDUSCAN_DB_POOL_MIN', 2))
+POOL_MAX_SIZE = int(os.environ.get('EDUSCAN_DB_POOL_MAX', 10))
+# Seconds to wait for a free connection before giving up
+POOL_TIMEOUT = float(os.environ.get('EDUSCAN_DB_POOL_TIMEOUT', 10))
+# Connections idle longer than this are pinged before being handed out
+POOL_CHECK_IDLE = float(os.environ.get('EDUSCAN_DB_POOL_CHECK_IDLE', 30))
+STATEMENT_TIMEOUT_MS = int(os.environ.get('EDUSCAN_DB_STATEMENT_TIMEOUT_MS', 30000))
+CONNECT_TIMEOUT = int(os.environ.get('EDUSCAN_DB_CONNECT_TIMEOUT', 10))
+
+_schema_checked = False
+
+# Counted tables that exist, and whether their trigger-maintained counters can be read
+_counted_tables = list(COUNTED_TABLES)
+_counters_available = False
+
+def _ensure_schema(conn):
+    """Apply pending schema migrations (once per process)"""
+    global _schema_checked, _counted_tables, _counters_available
+    if _schema_checked:
+        return
+    
     try:
-        conn = psycopg2.connect(os.environ['DATABASE_URL'])
-        return conn
+        applied = migrate(conn, 'postgresql')
+        if applied:
+            logger.info(f"Applied schema migrations {applied}")
+        _schema_checked = True
     except Exception as e:
-        logger.error(f"Database connection error: {e}")
-        return None
-
-def save_prediction_to_db(prediction_data):
-    """Save prediction data to PostgreSQL database"""
-    conn = get_db_connection()
-    if not conn:
-        return False
+        logger.warning(f"Could not upgrade database schema: {e}")
     
+    # Without counters (e.g. the database user may not create triggers) the
+    # statistics and watermarks count rows instead
     try:
+        _counters_available = ROW_COUNTERS_VERSION in get_applied_versions(conn)
         cur = conn.cursor()
-        
-        # Get or create student
-        student_name = prediction_data.get('student_name', 'Unknown Student')
-        grade_level = prediction_data.get('grade_level', 'Unknown')
-        
         cur.execute(
-            "SELECT id FROM students WHERE name = %s",
-            (student_name,)
+            "SELECT tablename FROM pg_tables WHERE schemaname = current_schema() AND tablename = ANY(%s)",
+            (list(COUNTED_TABLES),)
         )
-        student_record = cur.fetchone()
-        
-        if student_record:
-            student_id = student_record[0]
-        else:
-            cur.execute(
-                "INSERT INTO students (name, grade_level) VALUES (%s, %s) RETURNING id",
-                (student_name, grade_level)
-            )
-            student_id = cur.fetchone()[0]
-        
-        # Insert prediction
-        cur.execute("""
-            INSERT INTO predictions (
-                student_id, math_score, reading_score, writing_score, 
-                attendance, behavior, literacy, prediction, probability, 
-                risk_level, notes, timestamp
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            student_id,
-            prediction_data.get('math_score'),
-            prediction_data.get('reading_score'),
-            prediction_data.get('writing_score'),
-            prediction_data.get('attendance'),
-            prediction_data.get('behavior'),
-            prediction_data.get('literacy'),
-            prediction_data.get('prediction'),
-            prediction_data.get('probability'),
-            prediction_data.get('risk_level'),
-            prediction_data.get('notes', ''),
-            datetime.fromisoformat(prediction_data.get('timestamp', datetime.now().isoformat()))
-        ))
-        
+        existing = {row[0] for row in cur.fetchall()}
+        _counted_tables = [table for table in COUNTED_TABLES if table in existing]
         conn.commit()
-        logger.info(f"Prediction saved for student: {student_name}")
-        return True
-        
     except Exception as e:
         conn.rollback()
-        logger.error(f"Error saving prediction: {e}")
-        return False
-    finally:
-        conn.close()
+        logger.warning(f"Could not read schema state: {e}")
 
-def save_parent_observation_to_db(observation_data):
-    """Save parent observation to PostgreSQL database"""
-    conn = get_db_connection()
-    if not conn:
-        return False
+class PoolTimeout(Exception):
+    """No connection became free within POOL_TIMEOUT seconds"""
+
+class ConnectionPool:
+    """
+    Thread-safe PostgreSQL connection pool
     
-    try:
-        cur = conn.cursor()
+    Wraps psycopg2's ThreadedConnectionPool, which fails immediately when
+    all connections are in use, with a semaphore so callers wait up to
+    `timeout` seconds instead. Connections idle longer than `check_idle`
+    seconds are health-checked on checkout and replaced if broken.
+    """
+    
+    def __init__(self, dsn, minconn=POOL_MIN_SIZE, maxconn=POOL_MAX_SIZE, timeout=POOL_TIMEOUT,
+                 check_idle=POOL_CHECK_IDLE, statement_timeout_ms=STATEMENT_TIMEOUT_MS):
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.check_idle = check_idle
+        self._pool = psycopg2.pool.ThreadedConnectionPool(
+            minconn, maxconn, dsn,
+            connect_timeout=CONNECT_TIMEOUT,
+            options=f'-c statement_timeout={statement_timeout_ms}'
+        )
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._returned_at = {}
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._timeouts = 0
+        self._health_check_failures = 0
+        self._peak_in_use = 0
+    
+    def getconn(self):
+        """Check out a healthy connection, waiting while the pool is exhausted"""
+        start = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._waits += 1
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._lock:
+                    self._timeouts += 1
+                raise PoolTimeout(f"No database connection free after {self.timeout}s")
+        waited = time.monotonic() - start
         
-        # Get or create student
-        child_name = observation_data.get('child_name', 'Unknown Child')
+        try:
+            # Discard dead idle connections (e.g. after a server restart) until
+            # a healthy one, or a freshly opened one, turns up
+            conn = self._pool.getconn()
+            for _ in range(self.maxconn):
+                if self._is_healthy(conn):
+                    break
+                with self._lock:
+                    self._health_check_failures += 1
+                    self._returned_at.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
         
-        cur.execute(
-            "SELECT id FROM students WHERE name = %s",
-            (child_name,)
-        )
-        student_record = cur.fetchone()
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+            self._wait_seconds += waited
+            self._max_wait_seconds = max(self._max_wait_seconds, waited)
+        return conn
+    
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        idle = time.monotonic() - self._returned_at.get(id(conn), 0.0)
+        if idle < self.check_idle:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+    
+    def putconn(self, conn):
+        """Return a connection, rolling back anything left open"""
+        close = bool(conn.closed)
+        if not close and conn.status != psycopg2.extensions.STATUS_READY:
+            try:
+                conn.rollback()
+            except Exception:
+                close = True
         
+        try:
+            self._pool.putconn(conn, close=close)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                if close:
+                    self._returned_at.pop(id(conn), None)
+                else:
+                    self._returned_at[id(conn)] = time.monotonic()
+            self._slots.release()
+    
+    def closeall(self):
+        """Close every pooled connection"""
+        self._pool.closeall()
+    
+    def get_stats(self):
+        """Get pool size and checkout/wait counters"""
+        with self._lock:
+            return {
+                'max_size': self.maxconn,
+                'open': len(self._pool._pool) + len(self._pool._used),
+                'in_use': self._in_use,
+                'peak_in_use': self._peak_in_use,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'avg_wait_ms': self._wait_seconds / self._checkouts * 1000 if self._checkouts else 0.0,
+                'max_wait_ms': self._max_wait_seconds * 1000,
+                'health_check_failures': self._health_check_failures
+            }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Get the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = ConnectionPool(os.environ['DATABASE_URL'])
+                conn = pool.getconn()
+                try:
+                    _ensure_schema(conn)
+                finally:
+                    pool.putconn(conn)
+                _pool = pool
+    return _pool
+
+def get_pool_stats():
+    """Get connection pool metrics, or None before the pool was created"""
+    return _pool.get_stats() if _pool is not None else None
+
+@contextmanager
+def db_connection():
+    """
+    Borrow a pooled connection for the duration of a with block
+    
+    Yields None when the database is unreachable, so callers can fall back.
+    The connection is returned to the pool afterwards, rolled back if a
+    transaction was left open.
+    """
+    try:
+        pool = get_pool()
+        conn = pool.getconn()
+    except Exception as e:
+        logger.error(f"Database connection error: {e}")
+        yield None
+        return
+    
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+_student_ids = StudentIdCache()
+
+def _resolve_student(cur, name, grade_level):
+    """
+    Get a student's id, creating the student if needed
+    
+    grade_level None (parent observations, which do not know the grade)
+    matches the student's oldest row with any grade and creates a missing
+    student as 'Unknown'. The caller caches the id once it has committed.
+    """
+    student_id = _student_ids.get((name, grade_level))
+    if student_id is not None:
+        return student_id
+    
+    if grade_level is None:
+        cur.execute("SELECT id FROM students WHERE name = %s ORDER BY id LIMIT 1", (name,))
+        student_record = cur.fetchone()
         if student_record:
-            student_id = student_record[0]
-        else:
-            cur.execute(
-                "INSERT INTO students (name, grade_level) VALUES (%s, %s) RETURNING id",
-                (child_name, 'Unknown')
-            )
-            student_id = cur.fetchone()[0]
-        
-        # Convert subjects_struggled list to JSON string
-        subjects_struggled = observation_data.get('subjects_struggled', [])
-        if isinstance(subjects_struggled, list):
-            subjects_struggled = json.dumps(subjects_struggled)
+            return student_record[0]
+    
+    key = (name, grade_level or 'Unknown')
+    cur.execute(
+        "INSERT INTO students (name, grade_level) VALUES (%s, %s) "
+        "ON CONFLICT (name, grade_level) DO NOTHING RETURNING id",
+        key
+    )
+    student_record = cur.fetchone()
+    if student_record is None:
+        # Already there, possibly committed by a concurrent save just now
+        cur.execute("SELECT id FROM students WHERE name = %s AND grade_level = %s", key)
+        student_record = cur.fetchone()
+    return student_record[0]
+
+PREDICTION_COLUMNS = """
+    student_id, math_score, reading_score, writing_score,
+    attendance, behavior, literacy, prediction, probability,
+    risk_level, model_version, notes, timestamp, extra
+"""
+
+def _prediction_row(student_id, prediction_data):
+    """Values for PREDICTION_COLUMNS from a prediction record"""
+    return (
+        student_id,
+        prediction_data.get('math_score'),
+        prediction_data.get('reading_score'),
+        prediction_data.get('writing_score'),
+        prediction_data.get('attendance'),
+        prediction_data.get('behavior'),
+        prediction_data.get('literacy'),
+        prediction_data.get('prediction'),
+        prediction_data.get('probability'),
+        prediction_data.get('risk_level'),
+        prediction_data.get('model_version'),
+        prediction_data.get('notes', ''),
+        datetime.fromisoformat(prediction_data.get('timestamp', datetime.now().isoformat())),
+        prediction_extra(prediction_data)
+    )
+
+def save_prediction_to_db(prediction_data):
+    """Save prediction data to PostgreSQL database"""
+    with db_connection() as conn:
+        if not conn:
+            return False
         
-        # Insert observation
-        cur.execute("""
-            INSERT INTO parent_observations (
-                student_id, child_name, date, homework_completion, reading_time,
-                focus_level, subjects_struggled, behavior_rating, mood_rating,
-                sleep_hours, energy_level, social_interactions, learning_wins,
-                challenges_faced, strategies_used, screen_time, physical_activity,
-                medication_taken, special_events, timestamp
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            student_id,
-            child_name,
-            datetime.fromisoformat(observation_data.get('date', date.today().isoformat())),
-            observation_data.get('homework_completion'),
-            observation_data.get('reading_time'),
-            observation_data.get('focus_level'),
-            subjects_struggled,
-            observation_data.get('behavior_rating'),
-            observation_data.get('mood_rating'),
-            observation_data.get('sleep_hours'),
-            observation_data.get('energy_level'),
-            observation_data.get('social_interactions', ''),
-            observation_data.get('learning_wins', ''),
-            observation_data.get('challenges_faced', ''),
-            observation_data.get('strategies_used', ''),
-            observation_data.get('screen_time'),
-            observation_data.get('physical_activity'),
-            observation_data.get('medication_taken', False),
-            observation_data.get('special_events', ''),
-            datetime.fromisoformat(observation_data.get('timestamp', datetime.now().isoformat()))
-        ))
+        try:
+            cur = conn.cursor()
+            
+            # Get or create student
+            student_name = prediction_data.get('student_name', 'Unknown Student')
+            grade_level = prediction_data.get('grade_level') or 'Unknown'
+            student_id = _resolve_student(cur, student_name, grade_level)
+            
+            # Insert prediction
+            cur.execute(f"""
+                INSERT INTO predictions ({PREDICTION_COLUMNS})
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, _prediction_row(student_id, prediction_data))
+            
+            conn.commit()
+            _student_ids.put((student_name, grade_level), student_id)
+            logger.info(f"Prediction saved for student: {student_name}")
+            return True
+            
+        except Exception as e:
+            conn.rollback()
+            # A cached id may point at a student deleted behind our back
+            _student_ids.clear()
+            logger.error(f"Error saving prediction: {e}")
+            return False
+
+def save_predictions_bulk(records, page_size=1000):
+    """
+    Save many predictions (e.g. a scored batch upload) in one transaction
+    
+    Students missing from the id cache are upserted with a single
+    INSERT ... ON CONFLICT and looked up with one query; the predictions are
+    written with multi-row INSERTs of page_size rows, and everything is
+    committed once.
+    
+    Returns:
+        int: number of predictions saved (0 on error)
+    """
+    if not records:
+        return 0
+    
+    keys = [(record.get('student_name', 'Unknown Student'), record.get('grade_level') or 'Unknown') for record in records]
+    student_ids = {key: _student_ids.get(key) for key in dict.fromkeys(keys)}
+    missing = [key for key, student_id in student_ids.items() if student_id is None]
+    
+    with db_connection() as conn:
+        if not conn:
+            return 0
         
-        conn.commit()
-        logger.info(f"Parent observation saved for: {child_name}")
-        return True
+        try:
+            cur = conn.cursor()
+            if missing:
+                execute_values(cur, """
+                    INSERT INTO students (name, grade_level) VALUES %s
+                    ON CONFLICT (name, grade_level) DO NOTHING
+                """, missing, page_size=page_size)
+                
+                rows = execute_values(cur, """
+                    SELECT s.name, s.grade_level, s.id FROM students s
+                    JOIN (VALUES %s) AS v (name, grade_level)
+                    ON s.name = v.name AND s.grade_level = v.grade_level
+                """, missing, page_size=page_size, fetch=True)
+                student_ids.update(((name, grade_level), student_id) for name, grade_level, student_id in rows)
+            
+            execute_values(
+                cur,
+                f"INSERT INTO predictions ({PREDICTION_COLUMNS}) VALUES %s",
+                [_prediction_row(student_ids[key], record) for key, record in zip(keys, records)],
+                page_size=page_size
+            )
+            
+            conn.commit()
+            for key in missing:
+                _student_ids.put(key, student_ids[key])
+            logger.info(f"Saved {len(records)} predictions for {len(student_ids)} students")
+            return len(records)
+            
+        except Exception as e:
+            conn.rollback()
+            _student_ids.clear()
+            logger.error(f"Error saving predictions: {e}")
+            return 0
+
+def save_parent_observation_to_db(observation_data):
+    """Save parent observation to PostgreSQL database"""
+    with db_connection() as conn:
+        if not conn:
+            return False
         
-    except Exception as e:
-        conn.rollback()
-        logger.error(f"Error saving parent observation: {e}")
-        return False
-    finally:
-        conn.close()
+        try:
+            cur = conn.cursor()
+            
+            # Get or create student (the child's grade is not known here)
+            child_name = observation_data.get('child_name', 'Unknown Child')
+            student_id = _resolve_student(cur, child_name, None)
+            
+            # Stored as a JSON array (jsonb on PostgreSQL)
+            subjects_struggled = json.dumps(normalize_subjects(observation_data.get('subjects_struggled')))
+            
+            # Insert observation
+            cur.execute("""
+                INSERT INTO parent_observations (
+                    student_id, child_name, date, homework_completion, reading_time,
+                    focus_level, subjects_struggled, behavior_rating, mood_rating,
+                    sleep_hours, energy_level, social_interactions, learning_wins,
+                    challenges_faced, strategies_used, screen_time, physical_activity,
+                    medication_taken, special_events, timestamp
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (
+                student_id,
+                child_name,
+                datetime.fromisoformat(observation_data.get('date', date.today().isoformat())),
+                observation_data.get('homework_completion'),
+                observation_data.get('reading_time'),
+                observation_data.get('focus_level'),
+                subjects_struggled,
+                observation_data.get('behavior_rating'),
+                observation_data.get('mood_rating'),
+                observation_data.get('sleep_hours'),
+                observation_data.get('energy_level'),
+                observation_data.get('social_interactions', ''),
+                observation_data.get('learning_wins', ''),
+                observation_data.get('challenges_faced', ''),
+                observation_data.get('strategies_used', ''),
+                observation_data.get('screen_time'),
+                observation_data.get('physical_activity'),
+                observation_data.get('medication_taken', False),
+                observation_data.get('special_events', ''),
+                datetime.fromisoformat(observation_data.get('timestamp', datetime.now().isoformat()))
+            ))
+            
+            conn.commit()
+            _student_ids.put((child_name, None), student_id)
+            logger.info(f"Parent observation saved for: {child_name}")
+            return True
+            
+        except Exception as e:
+            conn.rollback()
+            _student_ids.clear()
+            logger.error(f"Error saving parent observation: {e}")
+            return False
+
+def _prediction_dict(row):
+    """Convert a PREDICTION_SELECT row to a prediction record"""
+    return prediction_from_row(row)
 
 def load_student_predictions():
     """Load all student prediction data from database"""
-    conn = get_db_connection()
-    if not conn:
-        return []
-    
-    try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT p.*, s.name, s.grade_level 
-            FROM predictions p 
-            JOIN students s ON p.student_id = s.id 
-            ORDER BY p.timestamp DESC
-        """)
+    with db_connection() as conn:
+        if not conn:
+            return []
         
-        predictions = []
-        for row in cur.fetchall():
-            prediction_dict = {
-                'id': row[0],
-                'math_score': row[2],
-                'reading_score': row[3],
-                'writing_score': row[4],
-                'attendance': row[5],
-                'behavior': row[6],
-                'literacy': row[7],
-                'prediction': row[8],
-                'probability': row[9],
-                'risk_level': row[10],
-                'notes': row[11],
-                'timestamp': row[12].isoformat(),
-                'student_name': row[13],
-                'grade_level': row[14]
-            }
-            predictions.append(prediction_dict)
+        try:
+            cur = conn.cursor()
+            cur.execute(PREDICTION_SELECT + "ORDER BY p.timestamp DESC")
+            return [_prediction_dict(row) for row in cur.fetchall()]
+            
+        except Exception as e:
+            logger.error(f"Error loading predictions: {e}")
+            return []
+
+def load_predictions_page(limit=50, after=None, student_name=None):
+    """
+    Load one page of predictions, newest first
+    
+    Pages are keyset-based on (timestamp, id), so every page is an index
+    range scan no matter how deep the caller has paged.
+    
+    Args:
+        limit (int): page size
+        after (tuple): cursor returned with the previous page; None for the first page
+        student_name (str): only this student's predictions
+    
+    Returns:
+        tuple: (records, cursor for the next page or None after the last page)
+    """
+    conditions, params = [], []
+    if student_name is not None:
+        conditions.append("s.name = %s")
+        params.append(student_name)
+    if after is not None:
+        conditions.append("(p.timestamp, p.id) < (%s, %s)")
+        params.extend([datetime.fromisoformat(after[0]), after[1]])
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    
+    with db_connection() as conn:
+        if not conn:
+            return [], None
         
-        return predictions
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                PREDICTION_SELECT + where + "ORDER BY p.timestamp DESC, p.id DESC LIMIT %s",
+                params + [limit + 1]
+            )
+            records = [_prediction_dict(row) for row in cur.fetchall()]
+            
+        except Exception as e:
+            logger.error(f"Error loading predictions: {e}")
+            return [], None
+    
+    if len(records) <= limit:
+        return records, None
+    records = records[:limit]
+    return records, (records[-1]['timestamp'], records[-1]['id'])
+
+def iter_student_predictions(batch_size=1000, student_name=None):
+    """
+    Stream predictions, newest first, through a named server-side cursor
+    
+    Rows arrive from the server batch_size at a time, so memory stays flat
+    however many predictions there are. The pooled connection is held until
+    the iterator is exhausted or closed. Errors are raised, not swallowed.
+    """
+    where, params = "", []
+    if student_name is not None:
+        where, params = "WHERE s.name = %s ", [student_name]
+    
+    with db_connection() as conn:
+        if not conn:
+            raise ConnectionError("Cannot connect to the database")
         
-    except Exception as e:
-        logger.error(f"Error loading predictions: {e}")
-        return []
-    finally:
-        conn.close()
+        # Named cursors are per connection, and the connection is ours alone
+        cur = conn.cursor(name='predictions_stream')
+        cur.itersize = batch_size
+        try:
+            cur.execute(PREDICTION_SELECT + where + "ORDER BY p.timestamp DESC, p.id DESC", params)
+            for row in cur:
+                yield _prediction_dict(row)
+        except Exception as e:
+            # Raise rather than end early, so an export is never silently cut short
+            logger.error(f"Error streaming predictions: {e}")
+            raise
+        finally:
+            try:
+                cur.close()
+            except Exception:
+                pass
+            conn.rollback()
+
+def _observation_dict(row):
+    observation = record_from_row(OBSERVATION_FIELDS, row)
+    # jsonb (list) since migration 5, JSON text before
+    observation['subjects_struggled'] = normalize_subjects(observation['subjects_struggled'])
+    return observation
 
 def load_parent_observations():
     """Load all parent observation data from database"""
-    conn = get_db_connection()
-    if not conn:
-        return []
-    
-    try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT po.*, s.name 
-            FROM parent_observations po 
-            JOIN students s ON po.student_id = s.id 
-            ORDER BY po.timestamp DESC
-        """)
+    with db_connection() as conn:
+        if not conn:
+            return []
         
-        observations = []
-        for row in cur.fetchall():
-            # Parse subjects_struggled back to list
-            subjects_struggled = row[8] or '[]'
-            try:
-                subjects_struggled = json.loads(subjects_struggled)
-            except json.JSONDecodeError:
-                subjects_struggled = []
+        try:
+            cur = conn.cursor()
+            # Explicit columns: po.* depends on the order columns were added in
+            cur.execute(
+                f"SELECT {', '.join('po.' + field for field in OBSERVATION_FIELDS)} "
+                "FROM parent_observations po JOIN students s ON po.student_id = s.id "
+                "ORDER BY po.timestamp DESC"
+            )
             
-            observation_dict = {
-                'id': row[0],
-                'child_name': row[2],
-                'date': row[3].isoformat(),
-                'homework_completion': row[4],
-                'reading_time': row[5],
-                'focus_level': row[6],
-                'subjects_struggled': subjects_struggled,
-                'behavior_rating': row[9],
-                'mood_rating': row[10],
-                'sleep_hours': row[11],
-                'energy_level': row[12],
-                'social_interactions': row[13],
-                'learning_wins': row[14],
-                'challenges_faced': row[15],
-                'strategies_used': row[16],
-                'screen_time': row[17],
-                'physical_activity': row[18],
-                'medication_taken': row[19],
-                'special_events': row[20],
-                'timestamp': row[21].isoformat()
-            }
-            observations.append(observation_dict)
-        
-        return observations
-        
-    except Exception as e:
-        logger.error(f"Error loading observations: {e}")
-        return []
-    finally:
-        conn.close()
+            return [_observation_dict(row) for row in cur.fetchall()]
+            
+        except Exception as e:
+            logger.error(f"Error loading observations: {e}")
+            return []
 
-def authenticate_user_db(username, password):
-    """Authenticate user against database"""
-    conn = get_db_connection()
-    if not conn:
-        return None
+def load_child_observations(child_name, first_day=None, after_last_day=None):
+    """
+    Load one child's observations with first_day <= date < after_last_day, oldest first
     
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT id, username, user_type, full_name, email, created_date FROM users WHERE username = %s AND password = %s",
-            (username, password)
-        )
-        user_record = cur.fetchone()
-        
-        if user_record:
-            return {
-                'id': user_record[0],
-                'username': user_record[1],
-                'user_type': user_record[2],
-                'full_name': user_record[3],
-                'email': user_record[4],
-                'created_date': user_record[5].isoformat()
-            }
-        return None
-        
-    except Exception as e:
-        logger.error(f"Error authenticating user: {e}")
-        return None
-    finally:
-        conn.close()
-
-def get_database_stats():
-    """Get database statistics"""
-    conn = get_db_connection()
-    if not conn:
-        return {
-            'total_students': 0,
-            'total_predictions': 0,
-            'total_observations': 0,
-            'total_users': 0,
-            'last_prediction_date': None,
-            'last_observation_date': None
-        }
+    Uses the (child_name, date) index. Returns None when the database is
+    unreachable; query errors are raised.
+    """
+    conditions, params = ["child_name = %s"], [child_name]
+    if first_day is not None:
+        conditions.append("date >= %s")
+        params.append(first_day)
+    if after_last_day is not None:
+        conditions.append("date < %s")
+        params.append(after_last_day)
     
-    try:
-        cur = conn.cursor()
+    with db_connection() as conn:
+        if not conn:
+            return None
         
-        # Get counts
-        cur.execute("SELECT COUNT(*) FROM students")
-        total_students = cur.fetchone()[0]
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                f"SELECT {', '.join(OBSERVATION_FIELDS)} FROM parent_observations "
+                f"WHERE {' AND '.join(conditions)} ORDER BY date, timestamp, id",
+                params
+            )
+            return [_observation_dict(row) for row in cur.fetchall()]
+            
+        except Exception as e:
+            logger.error(f"Error loading observations for {child_name}: {e}")
+            raise
+
+def get_risk_trend_counts(granularity='day'):
+    """
+    Count predictions per period and risk level, aggregated in the database
+    
+    Returns:
+        list: (period start as datetime, risk_level, count) tuples, oldest first
+    """
+    if granularity not in TREND_GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    
+    with db_connection() as conn:
+        if not conn:
+            return []
         
-        cur.execute("SELECT COUNT(*) FROM predictions")
-        total_predictions = cur.fetchone()[0]
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT date_trunc(%s, timestamp) AS period, risk_level, COUNT(*)
+                FROM predictions
+                WHERE timestamp IS NOT NULL
+                GROUP BY 1, 2
+                ORDER BY 1, 2
+            """, (granularity,))
+            return cur.fetchall()
+            
+        except Exception as e:
+            logger.error(f"Error computing risk trends: {e}")
+            return []
+
+def get_score_correlations(columns=ANALYTICS_COLUMNS):
+    """
+    Pearson correlation of every pair of columns, computed with corr() in one scan
+    
+    Like pandas, each pair uses the rows where both values are present.
+    
+    Returns:
+        dict: {(column_a, column_b): correlation or None}, for both orders of each pair
+    """
+    unknown = [column for column in columns if column not in ANALYTICS_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    
+    pairs = [(a, b) for i, a in enumerate(columns) for b in columns[i:]]
+    with db_connection() as conn:
+        if not conn:
+            return {}
         
-        cur.execute("SELECT COUNT(*) FROM parent_observations")
-        total_observations = cur.fetchone()[0]
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT " + ", ".join(f"corr({a}, {b})" for a, b in pairs) + " FROM predictions"
+            )
+            values = cur.fetchone()
+            
+        except Exception as e:
+            logger.error(f"Error computing correlations: {e}")
+            return {}
+    
+    correlations = {}
+    for (a, b), value in zip(pairs, values):
+        correlations[(a, b)] = correlations[(b, a)] = value
+    return correlations
+
+def get_student_names():
+    """Names of students with at least one prediction, sorted"""
+    with db_connection() as conn:
+        if not conn:
+            return []
         
-        cur.execute("SELECT COUNT(*) FROM users")
-        total_users = cur.fetchone()[0]
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT DISTINCT s.name FROM students s
+                WHERE EXISTS (SELECT 1 FROM predictions p WHERE p.student_id = s.id)
+                ORDER BY s.name
+            """)
+            return [row[0] for row in cur.fetchall()]
+            
+        except Exception as e:
+            logger.error(f"Error loading student names: {e}")
+            return []
+
+def get_table_watermark(table):
+    """
+    Get a cheap change marker for a table: (row count, max id, max timestamp)
+    
+    Used by the in-memory data cache to decide whether a full reload is
+    needed. The count comes from the row counters, so this is two index
+    lookups rather than a table scan. Returns None when the database is
+    unreachable.
+    """
+    if table not in ('predictions', 'parent_observations'):
+        raise ValueError(f"Unsupported table: {table}")
+    
+    with db_connection() as conn:
+        if not conn:
+            return None
         
-        # Get latest dates
-        cur.execute("SELECT MAX(timestamp) FROM predictions")
-        latest_prediction = cur.fetchone()[0]
+        try:
+            cur = conn.cursor()
+            row = None
+            if _counters_available:
+                cur.execute(
+                    f"SELECT row_count, (SELECT COALESCE(MAX(id), 0) FROM {table}), last_timestamp "
+                    "FROM table_counters WHERE table_name = %s",
+                    (table,)
+                )
+                row = cur.fetchone()
+            if row is None:
+                cur.execute(f"SELECT COUNT(*), COALESCE(MAX(id), 0), MAX(timestamp) FROM {table}")
+                row = cur.fetchone()
+            count, max_id, max_timestamp = row
+            return (count, max_id, max_timestamp.isoformat() if max_timestamp else None)
+            
+        except Exception as e:
+            logger.error(f"Error reading watermark for {table}: {e}")
+            return None
+
+def delete_records_before(table, cutoff, batch_size=5000):
+    """
+    Delete rows older than cutoff in batches
+    
+    Each batch is its own short transaction, so retention on a large table
+    never holds locks on millions of rows or builds one huge WAL burst.
+    
+    Returns:
+        int: number of deleted rows, or None when the database is unreachable
+    """
+    if table not in ('predictions', 'parent_observations'):
+        raise ValueError(f"Unsupported table: {table}")
+    
+    with db_connection() as conn:
+        if not conn:
+            return None
         
-        cur.execute("SELECT MAX(timestamp) FROM parent_observations")
-        latest_observation = cur.fetchone()[0]
+        deleted = 0
+        try:
+            cur = conn.cursor()
+            while True:
+                cur.execute(
+                    f"""
+                    DELETE FROM {table} WHERE id IN (
+                        SELECT id FROM {table} WHERE timestamp < %s LIMIT %s
+                    )
+                    """,
+                    (cutoff, batch_size)
+                )
+                conn.commit()
+                deleted += cur.rowcount
+                if cur.rowcount < batch_size:
+                    break
+            
+            return deleted
+            
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error deleting old rows from {table}: {e}")
+            raise
+
+def authenticate_user_db(username, password):
+    """Authenticate user against database"""
+    with db_connection() as conn:
+        if not conn:
+            return None
         
-        return {
-            'total_students': total_students,
-            'total_predictions': total_predictions,
-            'total_observations': total_observations,
-            'total_users': total_users,
-            'last_prediction_date': latest_prediction.isoformat() if latest_prediction else None,
-            'last_observation_date': latest_observation.isoformat() if latest_observation else None
-        }
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT id, username, user_type, full_name, email, created_date FROM users WHERE username = %s AND password = %s",
+                (username, password)
+            )
+            user_record = cur.fetchone()
+            
+            if user_record:
+                return {
+                    'id': user_record[0],
+                    'username': user_record[1],
+                    'user_type': user_record[2],
+                    'full_name': user_record[3],
+                    'email': user_record[4],
+                    'created_date': user_record[5].isoformat()
+                }
+            return None
+            
+        except Exception as e:
+            logger.error(f"Error authenticating user: {e}")
+            return None
+
+_stats_cache = StatsCache()
+
+def _query_database_stats(estimate):
+    """Read the statistics in one query, or None when the database is unreachable"""
+    with db_connection() as conn:
+        if not conn:
+            return None
         
-    except Exception as e:
-        logger.error(f"Error getting database stats: {e}")
-        return {
-            'total_students': 0,
-            'total_predictions': 0,
-            'total_observations': 0,
-            'total_users': 0,
-            'last_prediction_date': None,
-            'last_observation_date': None
-        }
-    finally:
-        conn.close()
\ No newline at end of file
+        try:
+            cur = conn.cursor()
+            if _counters_available:
+                cur.execute(SELECT_COUNTERS)
+                return stats_from_counters(cur.fetchall())
+            
+            cur.execute(combined_stats_query(_counted_tables, estimate))
+            return stats_from_row(_counted_tables, cur.fetchone())
+            
+        except Exception as e:
+            logger.error(f"Error getting database stats: {e}")
+            return None
+
+def get_database_stats(estimate=STATS_ESTIMATE):
+    """
+    Get database statistics
+    
+    Row counts and the newest prediction/observation timestamps come from the
+    trigger-maintained counters in a single query. Without counters all
+    tables are counted in one combined query instead, using planner estimates
+    when `estimate` is set. Results are reused for EDUSCAN_DB_STATS_TTL seconds.
+    """
+    return _stats_cache.get(estimate, lambda: _query_database_stats(estimate)) or empty_stats()
+
+def get_stats_cache_stats():
+    """Get hit counters of the database statistics cache"""
+    return _stats_cache.get_stats()
+
+def clear_caches():
+    """Forget cached student ids and statistics, e.g. after rows were deleted behind them"""
+    _student_ids.clear()
+    _stats_cache.clear()
+
+def delete_benchmark_students():
+    """Delete the benchmark students ('eduscan-benchmark-*') with their predictions and observations"""
+    with db_connection() as conn:
+        if not conn:
+            return
+        cur = conn.cursor()
+        for table in ('predictions', 'parent_observations'):
+            cur.execute(f"""
+                DELETE FROM {table} WHERE student_id IN (
+                    SELECT id FROM students WHERE name LIKE 'eduscan-benchmark-%%'
+                )
+            """)
+        cur.execute("DELETE FROM students WHERE name LIKE 'eduscan-benchmark-%%'")
+        conn.commit()
+        _student_ids.clear()
@@ -0,0 +1,600 @@
+"""
+Append-only JSON Lines record store
+Each record is one line of JSON, so saving is a single append (no
+read-modify-write of the whole history) and loading streams the file line
+by line. Used by utils/data_utils.py as the file fallback when no database
+is available.
+
+Writers in several processes (Streamlit sessions, workers) are coordinated
+with an advisory lock on a sidecar .lock file; inside a process all appends
+go through one writer thread, which also lets concurrent saves share a
+single fsync.
+"""
+
+import json
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: only the in-process lock applies
+    fcntl = None
+
+# When appended records are forced to disk:
+# 'always' after every save, 'interval' at most every FSYNC_INTERVAL seconds,
+# 'never' leaves it to the operating system
+FSYNC_POLICY = os.environ.get('EDUSCAN_JSONL_FSYNC', 'always')
+FSYNC_INTERVAL = float(os.environ.get('EDUSCAN_JSONL_FSYNC_INTERVAL', 1.0))
+
+
+# Most appends one writer thread combines into a single write and fsync
+WRITE_BATCH_SIZE = 256
+
+
+@contextmanager
+def file_lock(path, shared=False):
+    """
+    Hold an advisory lock on path + '.lock'
+
+    The lock lives in a sidecar file so it survives the data file being
+    replaced by an atomic rename.
+    """
+    fd = os.open(path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+
+def _write_atomic(path, text):
+    """Write text to a temp file in the same directory, fsync it and rename it over path"""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def quarantine_file(path):
+    """Move an unreadable data file aside instead of overwriting it; returns the new path"""
+    corrupt_path = f"{path}.corrupt-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    os.replace(path, corrupt_path)
+    print(f"Moved unreadable {path} to {corrupt_path}")
+    return corrupt_path
+
+
+class JsonlStore:
+    """Append-only store of JSON records in a .jsonl file"""
+
+    def __init__(self, path, fsync_policy=FSYNC_POLICY, fsync_interval=FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self._last_fsync = 0.0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    def append(self, record):
+        """Append one record as a single line, returning once it is written"""
+        # Serialize first so a bad record never leaves a partial line behind
+        line = (json.dumps(record) + '\n').encode('utf-8')
+
+        request = {'line': line, 'done': threading.Event(), 'error': None}
+        self._ensure_writer()
+        self._queue.put(request)
+        request['done'].wait()
+        if request['error'] is not None:
+            raise request['error']
+
+    def extend(self, records):
+        """Append many records with a single write"""
+        data = ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+        if data:
+            self._write_lines(data)
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run_writer, name='jsonl-writer', daemon=True)
+                self._writer.start()
+
+    def _run_writer(self):
+        """Single writer: drain queued appends and write them as one batch"""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            error = None
+            try:
+                self._write_lines(b''.join(request['line'] for request in batch))
+            except Exception as e:
+                error = e
+            for request in batch:
+                request['error'] = error
+                request['done'].set()
+
+    def _write_lines(self, data):
+        with self._lock, file_lock(self.path):
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                # A writer that crashed mid-append leaves a line without its
+                # newline; end it so the new records do not join onto it
+                size = os.fstat(fd).st_size
+                if size:
+                    os.lseek(fd, size - 1, os.SEEK_SET)
+                    if os.read(fd, 1) != b'\n':
+                        data = b'\n' + data
+                # One write() on an O_APPEND descriptor under the file lock,
+                # so writers in other processes never interleave inside a line
+                os.write(fd, data)
+                if self._should_fsync():
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def _should_fsync(self):
+        if self.fsync_policy == 'always':
+            return True
+        if self.fsync_policy == 'interval':
+            now = time.monotonic()
+            if now - self._last_fsync >= self.fsync_interval:
+                self._last_fsync = now
+                return True
+        return False
+
+    def iter_records(self):
+        """Yield records one at a time, skipping blank or torn lines"""
+        if not os.path.exists(self.path):
+            return
+        skipped = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-append can leave one incomplete line
+                    skipped += 1
+        if skipped:
+            print(f"Skipped {skipped} unreadable lines in {self.path}")
+
+    def load(self):
+        """Load all records into a list"""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return _parse_lines(f.read(), self.path)
+
+    def read_from(self, offset=0):
+        """
+        Read the complete lines after a byte offset
+
+        Returns (records, end_offset); a trailing line that is still being
+        written is left for the next call. Lets readers follow the file
+        incrementally instead of re-reading it.
+        """
+        if not os.path.exists(self.path):
+            return [], 0
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        return _parse_lines(data[:end].decode('utf-8')), offset + end
+
+    def count(self):
+        """Count stored records without parsing them"""
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'rb') as f:
+            return sum(1 for line in f if line.strip())
+
+    def rewrite(self, records):
+        """Atomically replace the whole file, e.g. after removing old records"""
+        with self._lock, file_lock(self.path):
+            _write_atomic(self.path, ''.join(json.dumps(record) + '\n' for record in records))
+
+    def update(self, mutate):
+        """
+        Read, transform and atomically rewrite all records under the file lock
+
+        Appends from other processes wait for the lock, so none are lost
+        between the read and the rename. Returns what mutate returned.
+        """
+        with self._lock, file_lock(self.path):
+            records = mutate(self.load())
+            _write_atomic(self.path, ''.join(json.dumps(record) + '\n' for record in records))
+            return records
+
+    def retain(self, keep):
+        """
+        Keep only the records keep(records) returns, under the file lock
+
+        The file is only rewritten when records were actually removed.
+        Returns the number of removed records.
+        """
+        with self._lock, file_lock(self.path):
+            records = self.load()
+            kept = keep(records)
+            if len(kept) < len(records):
+                _write_atomic(self.path, ''.join(json.dumps(record) + '\n' for record in kept))
+            return len(records) - len(kept)
+
+
+# Partition for records without a usable timestamp; never dropped by retention
+UNDATED_PARTITION = 'undated'
+
+_MONTH_PATTERN = re.compile(r'\d{4}-\d{2}$')
+
+
+def partition_for(record, field='timestamp'):
+    """Month partition ('YYYY-MM') of a record, from its ISO timestamp"""
+    value = record.get(field)
+    month = str(value)[:7] if value else ''
+    return month if _MONTH_PATTERN.match(month) else UNDATED_PARTITION
+
+
+class PartitionedJsonlStore:
+    """
+    JSONL records split into one file per month: <directory>/<YYYY-MM>.jsonl
+
+    Appends go to the partition of the record's timestamp, so retention can
+    delete whole files instead of parsing and rewriting the full history.
+    """
+
+    def __init__(self, directory, fsync_policy=FSYNC_POLICY, fsync_interval=FSYNC_INTERVAL, field='timestamp'):
+        self.directory = directory
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.field = field
+        self._stores = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _store(self, partition):
+        with self._lock:
+            if partition not in self._stores:
+                self._stores[partition] = JsonlStore(
+                    os.path.join(self.directory, f'{partition}.jsonl'), self.fsync_policy, self.fsync_interval
+                )
+            return self._stores[partition]
+
+    def partitions(self):
+        """Existing partitions: undated first, then months in order"""
+        names = [name[:-len('.jsonl')] for name in os.listdir(self.directory) if name.endswith('.jsonl')]
+        months = sorted(name for name in names if _MONTH_PATTERN.match(name))
+        return ([UNDATED_PARTITION] if UNDATED_PARTITION in names else []) + months
+
+    def append(self, record):
+        """Append one record to its month's partition"""
+        self._store(partition_for(record, self.field)).append(record)
+
+    def extend(self, records):
+        """Append many records, one write per partition"""
+        grouped = {}
+        for record in records:
+            grouped.setdefault(partition_for(record, self.field), []).append(record)
+        for partition, partition_records in grouped.items():
+            self._store(partition).extend(partition_records)
+
+    def load(self):
+        """Load all records, oldest partition first"""
+        records = []
+        for partition in self.partitions():
+            records.extend(self._store(partition).load())
+        return records
+
+    def count(self):
+        """Count stored records without parsing them"""
+        return sum(self._store(partition).count() for partition in self.partitions())
+
+    def rewrite(self, records):
+        """Replace the whole store with records, e.g. when migrating a single file"""
+        grouped = {}
+        for record in records:
+            grouped.setdefault(partition_for(record, self.field), []).append(record)
+        for partition in self.partitions():
+            if partition not in grouped:
+                self._drop(partition)
+        for partition, partition_records in grouped.items():
+            self._store(partition).rewrite(partition_records)
+
+    def _drop(self, partition):
+        store = self._store(partition)
+        with store._lock, file_lock(store.path):
+            if os.path.exists(store.path):
+                os.remove(store.path)
+        # The .lock sidecar stays: removing it while another process waits on
+        # it would let that process and a new one both hold the lock
+
+    def drop_before(self, cutoff, keep):
+        """
+        Remove records older than cutoff (a datetime)
+
+        Months entirely before the cutoff month are deleted as whole files;
+        only the cutoff month itself is filtered, with keep(records) deciding
+        which of its records stay. Undated records are never removed.
+
+        Returns:
+            dict: removed records, dropped partitions, remaining records
+        """
+        cutoff_month = cutoff.strftime('%Y-%m')
+        removed = 0
+        dropped = []
+        for partition in self.partitions():
+            if partition == UNDATED_PARTITION or partition > cutoff_month:
+                continue
+            store = self._store(partition)
+            if partition < cutoff_month:
+                removed += store.count()
+                self._drop(partition)
+                dropped.append(partition)
+            else:
+                removed += store.retain(keep)
+
+        return {'removed': removed, 'dropped_partitions': dropped, 'remaining': self.count()}
+
+    def hand_off(self, consume):
+        """
+        Pass every partition's records to consume(records), then move it out of the store
+
+        Used when another backend takes the records over, so they are not
+        read (or cleaned up) twice. Each partition is renamed to
+        <partition>.jsonl.imported-<time> only after consume returned, and
+        stays locked in between so no append is lost. consume may return
+        the records it could not take; those stay in the partition. Returns
+        the number of handed-off records.
+        """
+        total = 0
+        stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        for partition in self.partitions():
+            store = self._store(partition)
+            with store._lock, file_lock(store.path):
+                records = store.load()
+                kept = consume(records) or []
+                if os.path.exists(store.path):
+                    os.replace(store.path, f"{store.path}.imported-{stamp}")
+                if kept:
+                    _write_atomic(store.path, ''.join(json.dumps(record) + '\n' for record in kept))
+            total += len(records) - len(kept)
+        return total
+
+    def signature(self):
+        """Stat of every partition, for change detection"""
+        signature = []
+        for partition in self.partitions():
+            try:
+                stat = os.stat(os.path.join(self.directory, f'{partition}.jsonl'))
+                signature.append((partition, stat.st_mtime_ns, stat.st_size, stat.st_ino))
+            except OSError:
+                continue
+        return tuple(signature)
+
+    def read_since(self, positions=None):
+        """
+        Read records added since a previous call
+
+        Args:
+            positions (dict): partition -> (inode, offset) from the previous call
+
+        Returns:
+            tuple: (records, positions, complete). complete is True when a
+                partition was removed or rewritten since the last call, in
+                which case records holds the whole store.
+        """
+        positions = positions or {}
+        current = {partition: os.stat(self._store(partition).path) for partition in self.partitions()}
+        complete = not positions or any(
+            partition not in current or current[partition].st_ino != inode or current[partition].st_size < offset
+            for partition, (inode, offset) in positions.items()
+        )
+        if complete:
+            positions = {}
+
+        records = []
+        new_positions = {}
+        for partition, stat in current.items():
+            inode, offset = positions.get(partition, (stat.st_ino, 0))
+            partition_records, end = self._store(partition).read_from(offset)
+            records.extend(partition_records)
+            new_positions[partition] = (inode, end)
+        return records, new_positions, complete
+
+
+def migrate_to_partitions(source_path, store):
+    """
+    One-time migration of a single JSON array or JSONL file into a partitioned store
+
+    The source is renamed to *.migrated afterwards. Returns the number of
+    migrated records, or None if there was nothing to migrate.
+    """
+    if not os.path.exists(source_path):
+        return None
+
+    with file_lock(source_path):
+        if not os.path.exists(source_path):
+            return None
+        try:
+            if source_path.endswith('.jsonl'):
+                records = JsonlStore(source_path).load()
+            else:
+                with open(source_path, 'r', encoding='utf-8') as f:
+                    content = f.read().strip()
+                records = json.loads(content) if content else []
+                if not isinstance(records, list):
+                    records = []
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            print(f"Could not migrate {source_path}: {e}")
+            return None
+
+        store.extend(records)
+        os.replace(source_path, source_path + '.migrated')
+
+    print(f"Migrated {len(records)} records from {source_path} to {store.directory}")
+    return len(records)
+
+
+def _parse_lines(text, path=None):
+    """Parse JSONL text, skipping blank and unreadable lines"""
+    lines = [line for line in text.splitlines() if line.strip()]
+    try:
+        # One decoder call for the whole block is several times faster
+        # than one json.loads per line
+        return json.loads('[' + ','.join(lines) + ']')
+    except json.JSONDecodeError:
+        pass
+
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    if path is not None and len(records) < len(lines):
+        print(f"Skipped {len(lines) - len(records)} unreadable lines in {path}")
+    return records
+
+
+def update_json_array(path, mutate):
+    """
+    Locked read-modify-write of a legacy JSON array file
+
+    A corrupted file is moved aside rather than silently replaced, and the
+    new content is written to a temp file and renamed into place.
+    """
+    with file_lock(path):
+        records = []
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    content = f.read().strip()
+                records = json.loads(content) if content else []
+                if not isinstance(records, list):
+                    raise TypeError("expected a JSON array")
+            except (json.JSONDecodeError, UnicodeDecodeError, TypeError) as e:
+                print(f"JSON parsing error in {path}: {e}")
+                quarantine_file(path)
+                records = []
+
+        records = mutate(records)
+        _write_atomic(path, json.dumps(records, indent=2))
+        return records
+
+
+def _stress_writer(path, legacy, worker, count):
+    """Stress test process: save count records tagged with the worker id"""
+    store = JsonlStore(path, fsync_policy='never')
+
+    def save(seq):
+        record = {'worker': worker, 'seq': seq, 'timestamp': datetime.now().isoformat()}
+        if legacy:
+            update_json_array(path, lambda records: records + [record])
+        else:
+            store.append(record)
+
+    # Several threads per process, like concurrent Streamlit sessions
+    threads = [
+        threading.Thread(target=lambda offset=offset: [save(seq) for seq in range(offset, count, 4)])
+        for offset in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def _stress_compactor(path, stop):
+    """Stress test process: keep rewriting the store while writers append"""
+    store = JsonlStore(path, fsync_policy='never')
+    while not stop.is_set():
+        store.update(lambda records: records)
+
+
+def stress_test(processes=8, records_per_process=500, legacy=False):
+    """
+    Hammer one store from many processes and check that no record is lost
+
+    With legacy=False the JSONL store is used and a further process keeps
+    rewriting the file (as clean_old_data does) during the run; with
+    legacy=True every save is a locked read-modify-write of a JSON array.
+
+    Returns:
+        dict: expected and stored record counts, missing and duplicated
+            records, and whether the check passed
+    """
+    ctx = multiprocessing.get_context('spawn')
+    directory = tempfile.mkdtemp(prefix='eduscan_store_stress_')
+    path = os.path.join(directory, 'records.json' if legacy else 'records.jsonl')
+    try:
+        stop = ctx.Event()
+        compactor = None
+        if not legacy:
+            compactor = ctx.Process(target=_stress_compactor, args=(path, stop))
+            compactor.start()
+
+        start = time.perf_counter()
+        writers = [
+            ctx.Process(target=_stress_writer, args=(path, legacy, worker, records_per_process))
+            for worker in range(processes)
+        ]
+        for process in writers:
+            process.start()
+        for process in writers:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        if compactor is not None:
+            stop.set()
+            compactor.join()
+
+        if legacy:
+            with open(path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        else:
+            records = JsonlStore(path).load()
+
+        seen = [(record['worker'], record['seq']) for record in records]
+        expected = {(worker, seq) for worker in range(processes) for seq in range(records_per_process)}
+        missing = expected - set(seen)
+        duplicates = len(seen) - len(set(seen))
+
+        return {
+            'expected': len(expected),
+            'stored': len(records),
+            'missing': len(missing),
+            'duplicates': duplicates,
+            'seconds': elapsed,
+            'writer_failures': sum(1 for process in writers if process.exitcode != 0),
+            'passed': not missing and not duplicates and all(process.exitcode == 0 for process in writers)
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,337 @@
+"""
+Versioned schema migrations for the PostgreSQL and SQLite backends
+Each migration runs once per database in its own transaction and is recorded
+in schema_migrations, so startup only reads the applied versions. The steps
+are idempotent as well, because databases created by create_all or upgraded
+by earlier releases may already have parts of them.
+
+Usage:
+    python -m utils.migrations            # migrate the configured backend
+    python -m utils.migrations --check    # and verify the hot queries use their indexes
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from utils.student_identity import (
+    CREATE_STUDENT_KEY_INDEX, STUDENT_KEY_INDEX, STUDENT_REFERENCES, merge_duplicate_students_statements
+)
+from utils.table_counters import COUNTED_TABLES, CREATE_COUNTERS_TABLE, install_counters_statements
+
+CREATE_MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        applied_at TIMESTAMP NOT NULL
+    )
+"""
+
+# pg_advisory_xact_lock key serializing migrations across processes
+_ADVISORY_LOCK = 8_410_224
+
+
+def _sql(dialect, query):
+    """Write queries with ? placeholders; psycopg2 wants %s"""
+    return query.replace('?', '%s') if dialect == 'postgresql' else query
+
+
+def _existing_tables(cur, dialect, tables):
+    if dialect == 'postgresql':
+        cur.execute("SELECT tablename FROM pg_tables WHERE schemaname = current_schema() AND tablename = ANY(%s)",
+                    (list(tables),))
+    else:
+        cur.execute(f"SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ({', '.join('?' * len(tables))})",
+                    list(tables))
+    existing = {row[0] for row in cur.fetchall()}
+    return [table for table in tables if table in existing]
+
+
+def _column_type(cur, dialect, table, column):
+    """Declared type of a column (lower case), or None when it does not exist"""
+    if dialect == 'postgresql':
+        cur.execute("SELECT data_type FROM information_schema.columns "
+                    "WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s", (table, column))
+        row = cur.fetchone()
+        return row[0].lower() if row else None
+    cur.execute(f"PRAGMA table_info({table})")
+    types = {row[1]: row[2].lower() for row in cur.fetchall()}
+    return types.get(column)
+
+
+def _has_index(cur, dialect, name):
+    if dialect == 'postgresql':
+        cur.execute("SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() AND indexname = %s", (name,))
+    else:
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,))
+    return cur.fetchone() is not None
+
+
+def _prediction_indexes(cur, dialect):
+    if _column_type(cur, dialect, 'predictions', 'model_version') is None:
+        cur.execute("ALTER TABLE predictions ADD COLUMN model_version VARCHAR(64)")
+    # Keyset pagination over all predictions and per student, and retention
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_predictions_timestamp ON predictions (timestamp, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_predictions_student_timestamp ON predictions (student_id, timestamp)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_parent_observations_timestamp ON parent_observations (timestamp)")
+
+
+def _student_key(cur, dialect):
+    if not _has_index(cur, dialect, STUDENT_KEY_INDEX):
+        if dialect == 'postgresql':
+            # Keep other processes from inserting students while duplicates are merged
+            cur.execute("LOCK TABLE students IN SHARE ROW EXCLUSIVE MODE")
+        for statement in merge_duplicate_students_statements(_existing_tables(cur, dialect, STUDENT_REFERENCES)):
+            cur.execute(statement)
+        cur.execute(CREATE_STUDENT_KEY_INDEX)
+    # Lookups by name alone use the key's leading column
+    cur.execute("DROP INDEX IF EXISTS ix_students_name")
+
+
+def _observation_indexes(cur, dialect):
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_parent_observations_student_date ON parent_observations (student_id, date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_parent_observations_child_date ON parent_observations (child_name, date)")
+
+
+def _row_counters(cur, dialect):
+    cur.execute(CREATE_COUNTERS_TABLE)
+    cur.execute("SELECT table_name FROM table_counters")
+    counted = {row[0] for row in cur.fetchall()}
+    missing = [table for table in _existing_tables(cur, dialect, list(COUNTED_TABLES)) if table not in counted]
+    for statement in install_counters_statements(dialect, missing):
+        cur.execute(statement)
+
+
+def _prediction_extra(cur, dialect):
+    # Record fields without a column of their own, such as recommendations
+    if _column_type(cur, dialect, 'predictions', 'extra') is None:
+        column_type = 'JSONB' if dialect == 'postgresql' else 'TEXT'
+        cur.execute(f"ALTER TABLE predictions ADD COLUMN extra {column_type}")
+
+
+def normalize_subjects(value):
+    """
+    subjects_struggled as a list, whatever form it was stored in
+
+    Accepts lists (JSON columns), JSON text, and the comma separated text
+    some older records hold.
+    """
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return [part.strip() for part in value.split(',') if part.strip()]
+    if isinstance(value, list):
+        return [str(subject) for subject in value]
+    return [str(value)]
+
+
+def _subjects_json(cur, dialect):
+    # Rewrite every stored value as a JSON array first, so the conversion
+    # below cannot fail on legacy text
+    cur.execute("SELECT id, subjects_struggled FROM parent_observations WHERE subjects_struggled IS NOT NULL")
+    rows = cur.fetchall()
+    updates = []
+    for row_id, value in rows:
+        normalized = json.dumps(normalize_subjects(value))
+        if value != normalized and not isinstance(value, list):
+            updates.append((normalized, row_id))
+    if updates:
+        cur.executemany(_sql(dialect, "UPDATE parent_observations SET subjects_struggled = ? WHERE id = ?"), updates)
+
+    # SQLite has no JSON column type (the JSON1 functions read the text);
+    # PostgreSQL gets jsonb
+    if dialect == 'postgresql' and _column_type(cur, dialect, 'parent_observations', 'subjects_struggled') != 'jsonb':
+        cur.execute("""
+            ALTER TABLE parent_observations ALTER COLUMN subjects_struggled TYPE JSONB
+            USING subjects_struggled::jsonb
+        """)
+
+
+# (version, name, step functions); append new migrations, never edit applied ones
+MIGRATIONS = [
+    (1, 'prediction indexes', [_prediction_indexes]),
+    (2, 'unique student key', [_student_key]),
+    (3, 'observation indexes', [_observation_indexes]),
+    (4, 'row counters', [_row_counters]),
+    (5, 'subjects_struggled as JSON', [_subjects_json]),
+    (6, 'prediction extra fields', [_prediction_extra])
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Version that installs the table_counters triggers
+ROW_COUNTERS_VERSION = 4
+
+
+def get_applied_versions(conn):
+    """Versions recorded in schema_migrations (empty before the first migration)"""
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT version FROM schema_migrations")
+        versions = {row[0] for row in cur.fetchall()}
+        conn.commit()
+        return versions
+    except Exception:
+        conn.rollback()
+        return set()
+
+
+def migrate(conn, dialect, target=None):
+    """
+    Apply pending migrations in order, each in its own transaction
+
+    Concurrent processes wait for each other (an advisory lock on
+    PostgreSQL, BEGIN IMMEDIATE on SQLite) and skip versions another one
+    applied meanwhile. A failing migration is rolled back and raised; later
+    ones are not attempted.
+
+    Args:
+        conn: psycopg2 or sqlite3 connection (or a SQLAlchemy raw connection)
+        dialect (str): 'postgresql' or 'sqlite'
+        target (int): stop after this version; defaults to the latest
+
+    Returns:
+        list: versions applied by this call
+    """
+    if dialect not in ('postgresql', 'sqlite'):
+        raise ValueError(f"Unsupported dialect: {dialect}")
+
+    applied = get_applied_versions(conn)
+    pending = [m for m in MIGRATIONS if m[0] not in applied and (target is None or m[0] <= target)]
+    if not pending:
+        return []
+
+    cur = conn.cursor()
+    cur.execute(CREATE_MIGRATIONS_TABLE)
+    conn.commit()
+
+    done = []
+    for version, name, steps in pending:
+        try:
+            if dialect == 'postgresql':
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (_ADVISORY_LOCK,))
+            else:
+                cur.execute("BEGIN IMMEDIATE")
+            cur.execute(_sql(dialect, "SELECT 1 FROM schema_migrations WHERE version = ?"), (version,))
+            if cur.fetchone() is not None:
+                conn.rollback()
+                continue
+
+            for step in steps:
+                step(cur, dialect)
+            cur.execute(_sql(dialect, "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)"),
+                        (version, name, datetime.now()))
+            conn.commit()
+            done.append(version)
+        except Exception:
+            conn.rollback()
+            raise
+    return done
+
+
+# Hot queries and the index each must be able to use:
+# (name, query with ? placeholders, parameters, index)
+QUERY_PLAN_CHECKS = [
+    ('prediction page', "SELECT id FROM predictions ORDER BY timestamp DESC, id DESC LIMIT 50",
+     (), 'ix_predictions_timestamp'),
+    ('prediction page after cursor',
+     "SELECT id FROM predictions WHERE (timestamp, id) < (?, ?) ORDER BY timestamp DESC, id DESC LIMIT 50",
+     ('2024-01-01 00:00:00', 1), 'ix_predictions_timestamp'),
+    ('prediction retention', "SELECT id FROM predictions WHERE timestamp < ? LIMIT 5000",
+     ('2024-01-01 00:00:00',), 'ix_predictions_timestamp'),
+    ('student predictions', "SELECT id FROM predictions WHERE student_id = ?",
+     (1,), 'ix_predictions_student_timestamp'),
+    ('student by key', "SELECT id FROM students WHERE name = ? AND grade_level = ?",
+     ('name', '3'), STUDENT_KEY_INDEX),
+    ('student by name', "SELECT id FROM students WHERE name = ? ORDER BY id LIMIT 1",
+     ('name',), STUDENT_KEY_INDEX),
+    ('student observations', "SELECT id FROM parent_observations WHERE student_id = ? AND date >= ?",
+     (1, '2024-01-01 00:00:00'), 'ix_parent_observations_student_date'),
+    ('child observations',
+     "SELECT id FROM parent_observations WHERE child_name = ? AND date >= ? AND date < ? ORDER BY date, timestamp, id",
+     ('name', '2024-01-01', '2024-02-01'), 'ix_parent_observations_child_date'),
+    ('observation retention', "SELECT id FROM parent_observations WHERE timestamp < ? LIMIT 5000",
+     ('2024-01-01 00:00:00',), 'ix_parent_observations_timestamp'),
+    ('newest observation', "SELECT MAX(timestamp) FROM parent_observations",
+     (), 'ix_parent_observations_timestamp')
+]
+
+
+def explain(conn, dialect, query, params=()):
+    """The query plan as text (EXPLAIN on PostgreSQL, EXPLAIN QUERY PLAN on SQLite)"""
+    cur = conn.cursor()
+    try:
+        if dialect == 'postgresql':
+            # Tiny test tables make sequential scans cheapest; the question
+            # here is whether an index is usable at all
+            cur.execute("SET LOCAL enable_seqscan = off")
+            cur.execute("EXPLAIN " + _sql(dialect, query), params)
+            return '\n'.join(row[0] for row in cur.fetchall())
+        cur.execute("EXPLAIN QUERY PLAN " + query, params)
+        return '\n'.join(row[-1] for row in cur.fetchall())
+    finally:
+        conn.rollback()
+
+
+def check_query_plans(conn, dialect):
+    """
+    EXPLAIN every QUERY_PLAN_CHECKS query and report which index it used
+
+    On PostgreSQL the tables need some (analyzed) rows: on empty ones every
+    index costs the same and the planner may pick any of them.
+
+    Returns:
+        list: one dict per check with name, index, ok and the plan
+    """
+    results = []
+    for name, query, params, index in QUERY_PLAN_CHECKS:
+        plan = explain(conn, dialect, query, params)
+        results.append({'name': name, 'index': index, 'ok': index in plan, 'plan': plan})
+    return results
+
+
+def _report(conn, dialect, check):
+    if conn is None:
+        print("Error: database unavailable")
+        return 1
+
+    applied = sorted(get_applied_versions(conn))
+    print(f"Schema version {max(applied, default=0)} of {LATEST_VERSION}")
+    if applied != [version for version, _, _ in MIGRATIONS]:
+        return 1
+    if not check:
+        return 0
+
+    failed = 0
+    for result in check_query_plans(conn, dialect):
+        print(f"{'ok  ' if result['ok'] else 'FAIL'} {result['name']} ({result['index']})")
+        if not result['ok']:
+            failed += 1
+            print('    ' + result['plan'].replace('\n', '\n    '))
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate the EduScan database schema")
+    parser.add_argument('--backend', choices=['postgres', 'sqlite'],
+                        default=os.environ.get('EDUSCAN_DB_BACKEND') or ('postgres' if os.environ.get('DATABASE_URL') else 'sqlite'))
+    parser.add_argument('--check', action='store_true', help="Verify the hot queries can use their indexes")
+    args = parser.parse_args(argv)
+
+    # Connecting through the backend creates the tables and runs migrate()
+    if args.backend == 'postgres':
+        from utils.db_utils import db_connection
+        with db_connection() as conn:
+            return _report(conn, 'postgresql', args.check)
+
+    from utils.sqlite_utils import get_db_connection
+    return _report(get_db_connection(), 'sqlite', args.check)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Pickle-free model artifact format
+A model package is stored as a directory of flat .npy arrays (the compiled
+forest and the scaler parameters) plus a JSON manifest. Loading memory-maps
+the arrays, so every worker process shares the same pages via the OS cache
+and no Python object graph has to be unpickled
+"""
+
+import hashlib
+import json
+import os
+import time
+import numpy as np
+
+from utils.tree_engine import CompiledForest, compile_forest
+
+MANIFEST_NAME = 'manifest.json'
+ARTIFACT_FORMAT_VERSION = 1
+
+_FOREST_ARRAYS = ['feature', 'threshold', 'left', 'right', 'value', 'roots', 'classes']
+
+
+class ArrayScaler:
+    """Minimal StandardScaler replacement backed by mean/scale arrays"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        """Standardize features with the same float64 operations as StandardScaler"""
+        X = np.array(X, dtype=np.float64)
+        if self.mean_ is not None:
+            X -= self.mean_
+        if self.scale_ is not None:
+            X /= self.scale_
+        return X
+
+
+def _sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def export_artifact(model_package, directory, source_hash=None):
+    """
+    Write a model package as a memory-mappable artifact directory
+
+    Args:
+        model_package (dict): package as returned by load_model
+        directory (str): target directory, created if needed
+        source_hash (str): hash of the pickle the package came from
+
+    Returns:
+        dict: the written manifest
+    """
+    model = model_package['model']
+    forest = model if isinstance(model, CompiledForest) else compile_forest(model)
+    scaler = model_package.get('scaler')
+
+    arrays = {name: getattr(forest, 'classes_' if name == 'classes' else name) for name in _FOREST_ARRAYS}
+    if getattr(model, 'feature_importances_', None) is not None:
+        arrays['feature_importances'] = np.asarray(model.feature_importances_, dtype=np.float64)
+    if getattr(scaler, 'mean_', None) is not None:
+        arrays['scaler_mean'] = np.asarray(scaler.mean_, dtype=np.float64)
+    if getattr(scaler, 'scale_', None) is not None:
+        arrays['scaler_scale'] = np.asarray(scaler.scale_, dtype=np.float64)
+
+    os.makedirs(directory, exist_ok=True)
+
+    # The manifest is written last, so a directory without one is incomplete
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    # Other workers may have the current arrays memory-mapped: each array is
+    # written beside them and renamed over, so their mappings keep the old file
+    files = {}
+    for name, array in arrays.items():
+        path = os.path.join(directory, f"{name}.npy")
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, np.ascontiguousarray(array))
+        os.replace(path + '.tmp', path)
+        files[name] = {'file': f"{name}.npy", 'sha256': _sha256(path)}
+
+    manifest = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'model_type': model_package.get('model_type', type(model).__name__),
+        'version': model_package.get('version'),
+        'trained_on': model_package.get('trained_on'),
+        'feature_names': list(model_package.get('feature_names') or []),
+        'feature_order': list(model_package.get('feature_order') or []),
+        'has_scaler': scaler is not None,
+        'max_depth': forest.max_depth,
+        'n_trees': forest.n_trees,
+        'n_nodes': forest.n_nodes,
+        'source_hash': source_hash,
+        'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'arrays': files
+    }
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    return manifest
+
+
+def load_artifact(directory, mmap_mode='r'):
+    """
+    Load an artifact directory into a model package dict
+
+    The package has the same keys as the pickle format; 'model' is a
+    CompiledForest and 'scaler' an ArrayScaler, both backed by memory maps.
+    """
+    with open(os.path.join(directory, MANIFEST_NAME), 'r') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format: {manifest.get('format_version')}")
+
+    arrays = {
+        name: np.load(os.path.join(directory, entry['file']), mmap_mode=mmap_mode)
+        for name, entry in manifest['arrays'].items()
+    }
+
+    forest = CompiledForest(
+        feature=arrays['feature'],
+        threshold=arrays['threshold'],
+        left=arrays['left'],
+        right=arrays['right'],
+        value=arrays['value'],
+        roots=arrays['roots'],
+        classes=np.asarray(arrays['classes']),
+        max_depth=manifest['max_depth']
+    )
+    if 'feature_importances' in arrays:
+        forest.feature_importances_ = arrays['feature_importances']
+
+    scaler = None
+    if manifest['has_scaler']:
+        scaler = ArrayScaler(arrays.get('scaler_mean'), arrays.get('scaler_scale'))
+
+    return {
+        'model': forest,
+        'scaler': scaler,
+        'feature_names': manifest['feature_names'],
+        'feature_order': manifest['feature_order'],
+        'model_type': manifest['model_type'],
+        'version': manifest['version'],
+        'trained_on': manifest['trained_on']
+    }
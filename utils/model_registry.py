@@ -0,0 +1,265 @@
+"""
+Versioned model registry
+Model packages are stored under data/models/<version>/ together with their
+metadata. The active version is recorded in data/models/active.json, which is
+replaced atomically on promote/rollback; running workers notice the change
+on their next prediction and load the new model without a restart.
+
+Usage:
+    python -m utils.model_registry list
+    python -m utils.model_registry register data/learning_difficulty_detector.pkl --promote
+    python -m utils.model_registry promote v2
+    python -m utils.model_registry rollback
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+import shutil
+import sys
+import threading
+from datetime import datetime
+
+MODEL_FILE = 'model.pkl'
+METADATA_FILE = 'metadata.json'
+ACTIVE_FILE = 'active.json'
+
+_active_cache = {'signature': None, 'state': None}
+_active_lock = threading.Lock()
+
+
+def get_registry_directory():
+    """Get the correct path for the model registry directory"""
+    if getattr(sys, 'frozen', False):
+        # Running as compiled executable
+        base_path = sys._MEIPASS
+    else:
+        # Running as script
+        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    return os.path.join(base_path, 'data', 'models')
+
+
+def _write_json_atomic(path, data):
+    """Write JSON to a temp file and rename it over the target"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _version_number(version):
+    match = re.fullmatch(r'v(\d+)', version)
+    return int(match.group(1)) if match else 0
+
+
+def list_models():
+    """List registered model versions with their metadata, oldest first"""
+    registry_dir = get_registry_directory()
+    if not os.path.isdir(registry_dir):
+        return []
+
+    models = []
+    for version in os.listdir(registry_dir):
+        metadata_path = os.path.join(registry_dir, version, METADATA_FILE)
+        if os.path.exists(metadata_path):
+            with open(metadata_path, 'r') as f:
+                models.append(json.load(f))
+    return sorted(models, key=lambda m: _version_number(m['version']))
+
+
+def get_model_metadata(version):
+    """Get the metadata of a registered version"""
+    metadata_path = os.path.join(get_registry_directory(), version, METADATA_FILE)
+    if not os.path.exists(metadata_path):
+        raise ValueError(f"Unknown model version: {version}")
+    with open(metadata_path, 'r') as f:
+        return json.load(f)
+
+
+def register_model(source_path, metrics=None, trained_at=None, notes='', version=None):
+    """
+    Copy a pickled model package into the registry as a new version
+
+    Args:
+        source_path (str): pickle file with a model package (or bare model)
+        metrics (dict): evaluation metrics to store with the model
+        trained_at (str): ISO training date; defaults to the file's mtime
+        notes (str): free-form description
+        version (str): explicit version label; defaults to the next vN
+
+    Returns:
+        dict: metadata of the registered version
+    """
+    with open(source_path, 'rb') as f:
+        package = pickle.load(f)
+    is_package = isinstance(package, dict) and 'model' in package
+
+    registry_dir = get_registry_directory()
+    os.makedirs(registry_dir, exist_ok=True)
+    if version is None:
+        existing = [_version_number(m['version']) for m in list_models()]
+        version = f"v{max(existing, default=0) + 1}"
+
+    version_dir = os.path.join(registry_dir, version)
+    if os.path.exists(os.path.join(version_dir, METADATA_FILE)):
+        raise ValueError(f"Model version already exists: {version}")
+    os.makedirs(version_dir, exist_ok=True)
+
+    model_path = os.path.join(version_dir, MODEL_FILE)
+    shutil.copyfile(source_path, model_path)
+
+    metadata = {
+        'version': version,
+        'registered_at': datetime.now().isoformat(),
+        'trained_at': trained_at or datetime.fromtimestamp(os.path.getmtime(source_path)).isoformat(),
+        'model_type': package.get('model_type') if is_package else type(package).__name__,
+        'feature_order': package.get('feature_order') if is_package else None,
+        'metrics': metrics or (package.get('metrics') if is_package else None) or {},
+        'sha256': _hash_file(model_path),
+        'source': os.path.abspath(source_path),
+        'notes': notes
+    }
+    _write_json_atomic(os.path.join(version_dir, METADATA_FILE), metadata)
+    return metadata
+
+
+def _read_active():
+    """Read the active pointer, re-reading the file only when it changed"""
+    path = os.path.join(get_registry_directory(), ACTIVE_FILE)
+    try:
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    except OSError:
+        return None
+
+    with _active_lock:
+        if signature != _active_cache['signature']:
+            with open(path, 'r') as f:
+                _active_cache['state'] = json.load(f)
+            _active_cache['signature'] = signature
+        return _active_cache['state']
+
+
+def get_active_version():
+    """Get the version label of the promoted model, or None if nothing was promoted"""
+    state = _read_active()
+    return state['version'] if state else None
+
+
+def get_active_model_path():
+    """Get the model file of the promoted version, or None if nothing was promoted"""
+    version = get_active_version()
+    if version is None:
+        return None
+    return os.path.join(get_registry_directory(), version, MODEL_FILE)
+
+
+def get_version_for_path(path):
+    """Return the registry version a model file belongs to, or None for files outside the registry"""
+    registry_dir = os.path.abspath(get_registry_directory())
+    parent = os.path.dirname(os.path.abspath(path))
+    if os.path.dirname(parent) == registry_dir:
+        return os.path.basename(parent)
+    if os.path.dirname(os.path.dirname(parent)) == registry_dir:
+        # Artifact directory inside a version directory
+        return os.path.basename(os.path.dirname(parent))
+    return None
+
+
+def promote(version):
+    """Atomically make a registered version the active model"""
+    get_model_metadata(version)
+
+    state = _read_active() or {'version': None, 'history': []}
+    history = list(state.get('history', []))
+    if state.get('version') and state['version'] != version:
+        history.append(state['version'])
+
+    new_state = {
+        'version': version,
+        'promoted_at': datetime.now().isoformat(),
+        'history': history
+    }
+    _write_json_atomic(os.path.join(get_registry_directory(), ACTIVE_FILE), new_state)
+    return new_state
+
+
+def rollback():
+    """Re-activate the previously promoted version"""
+    state = _read_active()
+    if not state or not state.get('history'):
+        raise ValueError("No previous model version to roll back to")
+
+    history = list(state['history'])
+    version = history.pop()
+    new_state = {
+        'version': version,
+        'promoted_at': datetime.now().isoformat(),
+        'history': history
+    }
+    _write_json_atomic(os.path.join(get_registry_directory(), ACTIVE_FILE), new_state)
+    return new_state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage versioned EduScan models")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help="List registered versions")
+
+    register_parser = commands.add_parser('register', help="Register a pickled model package")
+    register_parser.add_argument('path')
+    register_parser.add_argument('--metrics', help="Metrics as a JSON object")
+    register_parser.add_argument('--trained-at')
+    register_parser.add_argument('--notes', default='')
+    register_parser.add_argument('--promote', action='store_true')
+
+    promote_parser = commands.add_parser('promote', help="Make a version the active model")
+    promote_parser.add_argument('version')
+
+    commands.add_parser('rollback', help="Re-activate the previous version")
+
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'list':
+            active = get_active_version()
+            for metadata in list_models():
+                marker = '*' if metadata['version'] == active else ' '
+                print(f"{marker} {metadata['version']:6} trained {metadata['trained_at']}  "
+                      f"sha256 {metadata['sha256'][:12]}  metrics {json.dumps(metadata['metrics'])}")
+        elif args.command == 'register':
+            metrics = json.loads(args.metrics) if args.metrics else None
+            metadata = register_model(args.path, metrics=metrics, trained_at=args.trained_at, notes=args.notes)
+            print(f"Registered {metadata['version']}")
+            if args.promote:
+                promote(metadata['version'])
+                print(f"Promoted {metadata['version']}")
+        elif args.command == 'promote':
+            promote(args.version)
+            print(f"Promoted {args.version}")
+        elif args.command == 'rollback':
+            state = rollback()
+            print(f"Rolled back to {state['version']}")
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
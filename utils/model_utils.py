@@ -1,15 +1,54 @@
 import pickle
+import hashlib
+from collections import OrderedDict
+import threading
+import time
 import numpy as np
+import pandas as pd
 import os
 import sys
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
+from datetime import datetime
+from utils.tree_engine import CompiledForest, compile_forest, fuse_scaler
+from utils.model_artifact import MANIFEST_NAME, export_artifact, load_artifact
+from utils.model_registry import get_active_model_path, get_version_for_path
+from utils.shadow_scoring import get_shadow_scorer
+from utils.risk_table import RiskTable, build_table, make_grid
 import warnings
 warnings.filterwarnings('ignore')
 
-def get_model_path():
-    """Get the correct path for the model file"""
+# Inference backend: 'sklearn' (default), 'compiled' for the NumPy tree engine,
+# or 'fused' for the NumPy engine with the scaler folded into its thresholds
+INFERENCE_BACKEND = os.environ.get('EDUSCAN_INFERENCE_BACKEND', 'sklearn')
+
+# Size (0 disables) and time-to-live in seconds of the exact-input prediction cache
+PREDICTION_CACHE_SIZE = int(os.environ.get('EDUSCAN_PREDICTION_CACHE_SIZE', 4096))
+PREDICTION_CACHE_TTL = float(os.environ.get('EDUSCAN_PREDICTION_CACHE_TTL', 3600))
+
+# Serve grid-aligned inputs from the precomputed risk table (see build_risk_table)
+USE_RISK_TABLE = os.environ.get('EDUSCAN_RISK_TABLE', '0') == '1'
+
+# Model file format: 'pickle' (default) or 'artifact' for the memory-mapped
+# array directory written by export_model_artifact
+MODEL_FORMAT = os.environ.get('EDUSCAN_MODEL_FORMAT', 'pickle')
+
+# Model input columns in the order the model was trained on
+FEATURE_COLUMNS = ['math_score', 'reading_score', 'writing_score', 'attendance', 'behavior', 'literacy']
+
+# Valid (min, max) range and error message for each input column
+FEATURE_RANGES = {
+    'math_score': (0, 100, "Math score must be between 0 and 100"),
+    'reading_score': (0, 100, "Reading score must be between 0 and 100"),
+    'writing_score': (0, 100, "Writing score must be between 0 and 100"),
+    'attendance': (0, 100, "Attendance must be between 0 and 100"),
+    'behavior': (1, 5, "Behavior rating must be between 1 and 5"),
+    'literacy': (1, 10, "Literacy level must be between 1 and 10")
+}
+
+def get_model_directory():
+    """Get the correct path for the directory holding the model files"""
     if getattr(sys, 'frozen', False):
         # Running as compiled executable
         base_path = sys._MEIPASS
@@ -17,9 +56,37 @@ def get_model_path():
         # Running as script
         base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     
+    return os.path.join(base_path, 'data')
+
+def get_artifact_directory():
+    """Get the directory of the memory-mapped model artifact"""
+    registry_path = get_active_model_path()
+    if registry_path:
+        return os.path.join(os.path.dirname(registry_path), 'artifact')
+    return os.path.join(get_model_directory(), 'learning_difficulty_detector')
+
+def _pickle_source_path():
+    """Get the pickle the active model comes from: the promoted registry version, if any"""
+    registry_path = get_active_model_path()
+    if registry_path:
+        return registry_path
+    return os.path.join(get_model_directory(), 'learning_difficulty_detector.pkl')
+
+def get_model_path():
+    """Get the correct path for the model file"""
+    # Prefer the exported array artifact when it is the configured format
+    artifact_manifest = os.path.join(get_artifact_directory(), MANIFEST_NAME)
+    if MODEL_FORMAT == 'artifact' and os.path.exists(artifact_manifest):
+        return artifact_manifest
+    
+    # A promoted registry version takes precedence over the files in data/
+    registry_path = get_active_model_path()
+    if registry_path:
+        return registry_path
+    
     # Check for user's trained model first, then fall back to sample model
-    user_model_path = os.path.join(base_path, 'data', 'learning_difficulty_detector.pkl')
-    sample_model_path = os.path.join(base_path, 'data', 'sample_model.pkl')
+    user_model_path = os.path.join(get_model_directory(), 'learning_difficulty_detector.pkl')
+    sample_model_path = os.path.join(get_model_directory(), 'sample_model.pkl')
     
     if os.path.exists(user_model_path) and os.path.getsize(user_model_path) > 100:
         return user_model_path
@@ -78,6 +145,11 @@ def load_model():
     model_path = get_model_path()
     
     try:
+        if os.path.basename(model_path) == MANIFEST_NAME:
+            model_package = load_artifact(os.path.dirname(model_path))
+            print(f"Model artifact memory-mapped from {os.path.dirname(model_path)}")
+            return model_package
+        
         if os.path.exists(model_path):
             with open(model_path, 'rb') as f:
                 model_package = pickle.load(f)
@@ -124,7 +196,383 @@ def load_model():
             'feature_order': ['math_score', 'reading_score', 'writing_score', 'attendance', 'behavior', 'literacy']
         }
 
-def make_prediction(student_data):
+def _hash_file(path, chunk_size=1024 * 1024):
+    """Compute the SHA-256 digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _file_signature(path):
+    """Return a cheap (path, mtime, size) signature, or None if the file is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+def _describe_version(path, file_hash):
+    """Registry version of a model file, or a hash-based label for files outside the registry"""
+    version = get_version_for_path(path)
+    if version:
+        return version
+    return f"sha-{file_hash[:12]}" if file_hash else 'sample'
+
+class ModelManager:
+    """
+    Process-wide holder for the loaded model package.
+    
+    The package is unpickled once and kept in memory. Every access does a
+    cheap stat() of the model file; when mtime or size change the file is
+    hashed and the package is only reloaded if the content really changed.
+    """
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._package = None
+        self._compiled = {}
+        self._compiled_source = None
+        self._signature = None
+        self._hash = None
+        self._version = None
+        self._loaded_at = None
+        self._loads = 0
+        self._hits = 0
+        self._last_load_seconds = 0.0
+        self._total_load_seconds = 0.0
+    
+    def get_model(self):
+        """Return the cached model package, reloading it if the model file changed"""
+        model_path = get_model_path()
+        signature = _file_signature(model_path)
+        
+        with self._lock:
+            if self._package is not None:
+                if signature == self._signature:
+                    self._hits += 1
+                    return self._package
+                
+                # mtime/size changed - only reload if the content changed too
+                if signature is not None and _hash_file(model_path) == self._hash:
+                    self._signature = signature
+                    self._version = _describe_version(model_path, self._hash)
+                    self._hits += 1
+                    return self._package
+            
+            start = time.perf_counter()
+            package = load_model()
+            elapsed = time.perf_counter() - start
+            
+            # load_model may have created the file, so stat it again
+            self._signature = _file_signature(model_path)
+            self._hash = _hash_file(model_path) if self._signature else None
+            self._version = _describe_version(model_path, self._hash)
+            self._package = package
+            self._loaded_at = datetime.now().isoformat()
+            self._loads += 1
+            self._last_load_seconds = elapsed
+            self._total_load_seconds += elapsed
+            print(f"Model loaded in {elapsed * 1000:.1f} ms (load #{self._loads})")
+            
+            # Build the NumPy engine at load time when it is the configured backend
+            if INFERENCE_BACKEND in ('compiled', 'fused'):
+                self.get_compiled(package, fused=INFERENCE_BACKEND == 'fused')
+            return package
+    
+    def get_compiled(self, package, fused=False):
+        """
+        Return the compiled tree engine for a package, or None if it cannot be compiled.
+        
+        With fused=True the package's scaler is folded into the split
+        thresholds, so the engine takes raw (unscaled) features.
+        """
+        with self._lock:
+            if self._compiled_source is not package:
+                self._compiled = {}
+                self._compiled_source = package
+            
+            if fused not in self._compiled:
+                try:
+                    model = package['model']
+                    forest = self._compiled.get(False)
+                    if forest is None:
+                        forest = model if isinstance(model, CompiledForest) else compile_forest(model)
+                    self._compiled[False] = forest
+                    if fused:
+                        scaler = package.get('scaler')
+                        forest = fuse_scaler(
+                            forest,
+                            getattr(scaler, 'mean_', None),
+                            getattr(scaler, 'scale_', None)
+                        )
+                    self._compiled[fused] = forest
+                except Exception as e:
+                    print(f"Compiled backend unavailable, using sklearn: {e}")
+                    self._compiled[fused] = None
+            return self._compiled[fused]
+    
+    @property
+    def model_hash(self):
+        """SHA-256 of the model file backing the cached package"""
+        return self._hash
+    
+    @property
+    def model_version(self):
+        """Registry version of the cached package, or a hash-based label outside the registry"""
+        return self._version
+    
+    def invalidate(self):
+        """Drop the cached package so the next access reloads it"""
+        with self._lock:
+            self._package = None
+            self._compiled = {}
+            self._compiled_source = None
+            self._signature = None
+            self._hash = None
+            self._version = None
+    
+    def get_stats(self):
+        """Get load time and cache-hit counters"""
+        with self._lock:
+            return {
+                'model_path': self._signature[0] if self._signature else None,
+                'model_hash': self._hash,
+                'model_version': self._version,
+                'loaded_at': self._loaded_at,
+                'loads': self._loads,
+                'hits': self._hits,
+                'last_load_seconds': self._last_load_seconds,
+                'total_load_seconds': self._total_load_seconds
+            }
+
+_model_manager = ModelManager()
+
+def get_model_manager():
+    """Get the process-wide model manager"""
+    return _model_manager
+
+def get_cached_model():
+    """Get the model package from the process-wide cache"""
+    return _model_manager.get_model()
+
+def get_model_version():
+    """Get the version label of the model that currently serves predictions"""
+    get_cached_model()
+    return _model_manager.model_version
+
+def get_model_stats():
+    """Get load time and cache-hit statistics of the process-wide model cache"""
+    return _model_manager.get_stats()
+
+class PredictionCache:
+    """
+    Bounded LRU cache with a time-to-live for exact-input predictions.
+    
+    Entries are keyed on the model version plus the normalized feature
+    tuple. When a different model version is seen the whole cache is
+    dropped, so results never outlive the model that produced them.
+    """
+    
+    def __init__(self, maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._model_version = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+    
+    def _check_version(self, model_version):
+        """Clear the cache when the model version changes (caller holds the lock)"""
+        if model_version != self._model_version:
+            if self._entries:
+                self._invalidations += 1
+            self._entries.clear()
+            self._model_version = model_version
+    
+    def get(self, model_version, key):
+        """Return the cached value for key, or None on a miss"""
+        if self.maxsize <= 0:
+            return None
+        
+        with self._lock:
+            self._check_version(model_version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            
+            value, stored_at = entry
+            if self.ttl > 0 and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+    
+    def put(self, model_version, key, value):
+        """Store a value, evicting the least recently used entries when full"""
+        if self.maxsize <= 0:
+            return
+        
+        with self._lock:
+            self._check_version(model_version)
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+    
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self):
+        """Get hit, miss and eviction counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations,
+                'model_version': self._model_version
+            }
+
+_prediction_cache = PredictionCache()
+
+def get_prediction_cache_stats():
+    """Get statistics of the exact-input prediction cache"""
+    return _prediction_cache.get_stats()
+
+def clear_prediction_cache():
+    """Drop all cached predictions"""
+    _prediction_cache.clear()
+
+_risk_table = None
+_risk_table_signature = None
+_risk_table_lock = threading.Lock()
+
+def _risk_table_directory():
+    """The risk table lives next to the model file"""
+    return get_model_directory()
+
+def get_risk_table(model_hash):
+    """Return the risk table if one was built from the model with this hash, otherwise None"""
+    global _risk_table, _risk_table_signature
+    
+    signature = _file_signature(os.path.join(_risk_table_directory(), 'risk_table.json'))
+    with _risk_table_lock:
+        if signature != _risk_table_signature:
+            try:
+                _risk_table = RiskTable.load(_risk_table_directory()) if signature else None
+            except Exception as e:
+                print(f"Error loading risk table: {e}")
+                _risk_table = None
+            _risk_table_signature = signature
+        
+        if _risk_table is None or _risk_table.model_hash != model_hash:
+            return None
+        return _risk_table
+
+def build_risk_table(score_step=10, backend=None):
+    """
+    Precompute risk probabilities for every point of the input grid
+    
+    Args:
+        score_step (int): grid step for the 0-100 features; behavior and
+            literacy always use every integer value
+        backend (str): inference backend used to score the grid; defaults to INFERENCE_BACKEND
+    
+    Returns:
+        dict: table manifest with build time, entry count and on-disk size
+    """
+    model_package = get_cached_model()
+    manifest = build_table(
+        lambda features: _score_features(model_package, features, backend),
+        _risk_table_directory(),
+        make_grid(FEATURE_RANGES, FEATURE_COLUMNS, score_step),
+        _model_manager.model_hash
+    )
+    print(f"Risk table built: {manifest['entries']} entries, "
+          f"{manifest['size_bytes'] / 1e6:.1f} MB in {manifest['build_seconds']:.1f} s")
+    return manifest
+
+def export_model_artifact(directory=None):
+    """
+    Export the pickled model package as a memory-mappable array artifact
+    
+    The promoted registry version is exported into its version directory;
+    without a registry the legacy pickle in data/ is exported.
+    
+    Args:
+        directory (str): target directory; defaults to get_artifact_directory()
+    
+    Returns:
+        dict: the artifact manifest
+    """
+    pickle_path = _pickle_source_path()
+    directory = directory or get_artifact_directory()
+    
+    with open(pickle_path, 'rb') as f:
+        model_package = pickle.load(f)
+    if not (isinstance(model_package, dict) and 'model' in model_package):
+        model_package = {'model': model_package, 'scaler': None,
+                         'feature_names': FEATURE_COLUMNS, 'feature_order': FEATURE_COLUMNS}
+    
+    manifest = export_artifact(model_package, directory, source_hash=_hash_file(pickle_path))
+    print(f"Model artifact exported to {directory}")
+    return manifest
+
+def _score_features(model_package, features, backend=None):
+    """
+    Score a 2-D array of raw features with the model package
+    
+    Returns:
+        tuple: (predictions, risk_probabilities) as NumPy arrays
+    """
+    backend = backend or INFERENCE_BACKEND
+    model = model_package['model']
+    scaler = model_package.get('scaler')
+    
+    fused = _model_manager.get_compiled(model_package, fused=True) if backend == 'fused' else None
+    if fused is not None:
+        # Scaling is folded into the thresholds, raw features go straight in
+        model = fused
+    else:
+        # Apply scaling if the model uses StandardScaler (from user's notebook)
+        if scaler is not None:
+            features = scaler.transform(features)
+        
+        if backend in ('compiled', 'fused'):
+            model = _model_manager.get_compiled(model_package) or model
+    
+    prediction_proba = model.predict_proba(features)
+    predictions = model.classes_.take(np.argmax(prediction_proba, axis=1))
+    
+    # Get probability of positive class (learning difficulty risk)
+    risk_probabilities = prediction_proba[:, 1] if prediction_proba.shape[1] > 1 else prediction_proba[:, 0]
+    
+    return predictions, risk_probabilities
+
+def _score_shadow(model_package, features):
+    """Score a candidate package for shadow comparison with plain sklearn/NumPy inference"""
+    return _score_features(model_package, features, backend='sklearn')
+
+def make_prediction(student_data, backend=None):
     """
     Make a prediction for a student based on their data
     
@@ -136,37 +584,51 @@ def make_prediction(student_data):
             - attendance: Attendance percentage (0-100)
             - behavior: Behavior rating (1-5)
             - literacy: Literacy level (1-10)
+        backend (str): 'sklearn', 'compiled' or 'fused'; defaults to INFERENCE_BACKEND
     
     Returns:
         tuple: (prediction, probability) where prediction is 0/1 and probability is float
     """
     try:
-        model_package = load_model()
-        model = model_package['model']
-        scaler = model_package.get('scaler')
-        
-        # Prepare input features in the correct order
-        features = np.array([[
-            student_data['math_score'],
-            student_data['reading_score'],
-            student_data['writing_score'],
-            student_data['attendance'],
-            student_data['behavior'],
-            student_data['literacy']
-        ]])
+        start = time.perf_counter()
+        model_package = get_cached_model()
         
-        # Apply scaling if the model uses StandardScaler (from user's notebook)
-        if scaler is not None:
-            features = scaler.transform(features)
+        # Identical inputs against the same model are served from the cache
+        model_hash = _model_manager.model_hash
+        cache_key = (backend or INFERENCE_BACKEND, tuple(float(student_data[col]) for col in FEATURE_COLUMNS))
+        result = _prediction_cache.get(model_hash, cache_key)
         
-        # Make prediction
-        prediction = model.predict(features)[0]
-        prediction_proba = model.predict_proba(features)[0]
+        # Grid-aligned inputs can be answered from the precomputed table
+        if result is None and USE_RISK_TABLE:
+            table = get_risk_table(model_hash)
+            result = table.lookup(cache_key[1]) if table is not None else None
+            if result is not None:
+                _prediction_cache.put(model_hash, cache_key, result)
         
-        # Get probability of positive class (learning difficulty risk)
-        risk_probability = prediction_proba[1] if len(prediction_proba) > 1 else prediction_proba[0]
+        if result is None:
+            # Prepare input features in the correct order
+            features = np.array([[
+                student_data['math_score'],
+                student_data['reading_score'],
+                student_data['writing_score'],
+                student_data['attendance'],
+                student_data['behavior'],
+                student_data['literacy']
+            ]])
+            
+            # Make prediction
+            predictions, risk_probabilities = _score_features(model_package, features, backend)
+            
+            result = (int(predictions[0]), float(risk_probabilities[0]))
+            _prediction_cache.put(model_hash, cache_key, result)
+        
+        # Hand a sample of live traffic to the candidate model, off the request path
+        shadow = get_shadow_scorer()
+        if shadow is not None:
+            shadow.submit(cache_key[1], result[0], result[1], time.perf_counter() - start,
+                          _model_manager.model_version, _score_shadow)
         
-        return int(prediction), float(risk_probability)
+        return result
     
     except Exception as e:
         print(f"Error making prediction: {e}")
@@ -190,10 +652,123 @@ def make_prediction(student_data):
         
         return prediction, risk_probability
 
+def assign_risk_levels(probabilities):
+    """Map an array of risk probabilities to Low/Medium/High risk labels"""
+    probabilities = np.asarray(probabilities, dtype=float)
+    return np.select(
+        [probabilities < 0.3, probabilities < 0.7],
+        ['Low Risk', 'Medium Risk'],
+        default='High Risk'
+    )
+
+def _validate_feature_matrix(features):
+    """Return an array with the first validation error of each row, or None for valid rows"""
+    errors = np.full(len(features), None, dtype=object)
+    
+    # Walk the fields backwards so the first failing field of a row wins,
+    # matching the order validate_student_data reports errors in
+    for col in reversed(range(len(FEATURE_COLUMNS))):
+        field = FEATURE_COLUMNS[col]
+        low, high, message = FEATURE_RANGES[field]
+        values = features[:, col]
+        errors[~((values >= low) & (values <= high))] = message
+        errors[np.isnan(values)] = f"Missing required field: {field}"
+    
+    return errors
+
+def _rule_based_batch(features):
+    """Vectorized version of the rule-based fallback used by make_prediction"""
+    academic_avg = features[:, :3].mean(axis=1)
+    risk_factors = (
+        (academic_avg < 70) * 2 +
+        (features[:, 3] < 80) +
+        (features[:, 4] < 3) +
+        (features[:, 5] < 5)
+    )
+    probabilities = np.minimum(risk_factors / 5.0, 1.0)
+    return (probabilities > 0.5).astype(int), probabilities
+
+def predict_batch(df, backend=None):
+    """
+    Score a whole DataFrame of students with a single model call
+    
+    Args:
+        df (pd.DataFrame): Student data containing the FEATURE_COLUMNS
+        backend (str): 'sklearn', 'compiled' or 'fused'; defaults to INFERENCE_BACKEND
+    
+    Returns:
+        pd.DataFrame: Copy of df with prediction, probability, risk_level and
+            error columns. Rows failing validation keep an error message and
+            are not scored.
+    """
+    missing_columns = [col for col in FEATURE_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+    
+    features = df[FEATURE_COLUMNS].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    errors = _validate_feature_matrix(features)
+    valid = np.array([error is None for error in errors], dtype=bool)
+    
+    predictions = np.zeros(len(df), dtype=int)
+    probabilities = np.full(len(df), np.nan)
+    
+    if valid.any():
+        valid_features = features[valid]
+        try:
+            predictions[valid], probabilities[valid] = _score_features(get_cached_model(), valid_features, backend)
+        
+        except Exception as e:
+            print(f"Error making batch prediction: {e}")
+            predictions[valid], probabilities[valid] = _rule_based_batch(valid_features)
+    
+    result = df.copy()
+    result['prediction'] = pd.array(predictions, dtype='Int64')
+    result.loc[~valid, 'prediction'] = pd.NA
+    result['probability'] = probabilities
+    result['risk_level'] = np.where(valid, assign_risk_levels(probabilities), None)
+    result['error'] = errors
+    return result
+
+def _cell_text(value, default):
+    """Text of an uploaded CSV cell, or default when it is empty (pandas reads those as NaN)"""
+    if value is None or pd.isna(value):
+        return default
+    if isinstance(value, float) and value.is_integer():
+        # A column with empty cells is read as floats: grade 3 arrives as 3.0
+        value = int(value)
+    text = str(value).strip()
+    return text if text else default
+
+def batch_prediction_records(scored, model_version=None, timestamp=None, notes="Batch upload"):
+    """
+    Build the prediction records to save for rows scored by predict_batch
+    
+    Rows without a student name are saved as "Student <row number>" and
+    rows without a grade level as 'Unknown', never as "nan".
+    
+    Returns:
+        list: one prediction record per row of scored
+    """
+    timestamp = timestamp or datetime.now().isoformat()
+    return [
+        {
+            "timestamp": timestamp,
+            "student_name": _cell_text(row.get('student_name'), f"Student {idx + 1}"),
+            "grade_level": _cell_text(row.get('grade_level'), 'Unknown'),
+            "prediction": int(row['prediction']),
+            "probability": float(row['probability']),
+            "risk_level": row['risk_level'],
+            "model_version": model_version,
+            "notes": notes,
+            **{col: float(row[col]) for col in FEATURE_COLUMNS}
+        }
+        for idx, row in scored.iterrows()
+    ]
+
 def get_feature_importance():
     """Get feature importance from the model"""
     try:
-        model_package = load_model()
+        model_package = get_cached_model()
         model = model_package['model']
         
         if hasattr(model, 'feature_importances_'):
@@ -222,27 +797,64 @@ def get_feature_importance():
             'Literacy': 0.10
         }
 
+def verify_fused_model(n_random=20000, seed=0):
+    """
+    Check that the fused backend reproduces the scaled sklearn pipeline.
+    
+    Scores random inputs across the validate_student_data ranges, every
+    integer input value, and the float values on both sides of each fused
+    split threshold, with both pipelines.
+    
+    Returns:
+        dict: number of rows checked, mismatching rows and whether they are identical
+    """
+    model_package = get_cached_model()
+    fused = _model_manager.get_compiled(model_package, fused=True)
+    if fused is None:
+        raise ValueError("Model cannot be compiled into a fused forest")
+    
+    rng = np.random.default_rng(seed)
+    low = np.array([FEATURE_RANGES[col][0] for col in FEATURE_COLUMNS], dtype=float)
+    high = np.array([FEATURE_RANGES[col][1] for col in FEATURE_COLUMNS], dtype=float)
+    random_rows = rng.uniform(low, high, size=(n_random, len(FEATURE_COLUMNS)))
+    
+    # Put every boundary value (and its upper neighbour) and every integer
+    # value of each feature into otherwise random rows
+    probe_rows = []
+    is_split = fused.left != np.arange(fused.n_nodes)
+    for col in range(len(FEATURE_COLUMNS)):
+        thresholds = fused.threshold[is_split & (fused.feature == col)]
+        values = np.concatenate([
+            thresholds,
+            np.nextafter(thresholds, np.inf),
+            np.arange(low[col], high[col] + 1)
+        ])
+        values = np.unique(values[(values >= low[col]) & (values <= high[col])])
+        rows = rng.uniform(low, high, size=(len(values), len(FEATURE_COLUMNS)))
+        rows[:, col] = values
+        probe_rows.append(rows)
+    
+    features = np.vstack([random_rows] + probe_rows)
+    expected = model_package['model'].predict_proba(model_package['scaler'].transform(features))
+    actual = fused.predict_proba(features)
+    mismatches = int(np.any(expected != actual, axis=1).sum())
+    
+    return {
+        'rows_checked': len(features),
+        'mismatches': mismatches,
+        'identical': mismatches == 0
+    }
+
 def validate_student_data(student_data):
     """Validate student data before making prediction"""
-    required_fields = ['math_score', 'reading_score', 'writing_score', 'attendance', 'behavior', 'literacy']
-    
     # Check if all required fields are present
-    for field in required_fields:
+    for field in FEATURE_COLUMNS:
         if field not in student_data:
             raise ValueError(f"Missing required field: {field}")
     
     # Validate ranges
-    if not (0 <= student_data['math_score'] <= 100):
-        raise ValueError("Math score must be between 0 and 100")
-    if not (0 <= student_data['reading_score'] <= 100):
-        raise ValueError("Reading score must be between 0 and 100")
-    if not (0 <= student_data['writing_score'] <= 100):
-        raise ValueError("Writing score must be between 0 and 100")
-    if not (0 <= student_data['attendance'] <= 100):
-        raise ValueError("Attendance must be between 0 and 100")
-    if not (1 <= student_data['behavior'] <= 5):
-        raise ValueError("Behavior rating must be between 1 and 5")
-    if not (1 <= student_data['literacy'] <= 10):
-        raise ValueError("Literacy level must be between 1 and 10")
+    for field, (low, high, message) in FEATURE_RANGES.items():
+        if not (low <= student_data[field] <= high):
+            raise ValueError(message)
     
     return True
@@ -0,0 +1,76 @@
+"""
+Secondary index over parent observations
+Observations are grouped by child and kept sorted by date, so the Parent
+Tracker can fetch one child's observations for a date range with two
+binary searches (O(log n + k)) instead of scanning and parsing every
+family's records on each rerun.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+
+def _date_key(value):
+    """Dates are compared as ISO strings, which sort like the dates themselves"""
+    if value is None:
+        return None
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)[:10]
+
+
+class ObservationIndex:
+    """Observations per child, sorted by date"""
+
+    def __init__(self, observations=()):
+        self._dates = {}
+        self._records = {}
+        self.size = 0
+        self.build(observations)
+
+    def build(self, observations):
+        """Rebuild the index from a list of observations"""
+        grouped = {}
+        for obs in observations:
+            key = _date_key(obs.get('date'))
+            if key is None or obs.get('child_name') is None:
+                continue
+            grouped.setdefault(obs['child_name'], []).append((key, obs))
+
+        self._dates = {}
+        self._records = {}
+        self.size = 0
+        for child_name, entries in grouped.items():
+            # Stable sort keeps same-day observations in save order
+            entries.sort(key=lambda entry: entry[0])
+            self._dates[child_name] = [key for key, _ in entries]
+            self._records[child_name] = [obs for _, obs in entries]
+            self.size += len(entries)
+
+    def add(self, obs):
+        """Insert one observation in date order"""
+        key = _date_key(obs.get('date'))
+        child_name = obs.get('child_name')
+        if key is None or child_name is None:
+            return
+
+        dates = self._dates.setdefault(child_name, [])
+        records = self._records.setdefault(child_name, [])
+        position = bisect_right(dates, key)
+        dates.insert(position, key)
+        records.insert(position, obs)
+        self.size += 1
+
+    def children(self):
+        """Names of all children with observations"""
+        return sorted(self._dates)
+
+    def query(self, child_name, start_date=None, end_date=None):
+        """Observations of one child between start_date and end_date (inclusive), oldest first"""
+        dates = self._dates.get(child_name)
+        if not dates:
+            return []
+
+        start = 0 if start_date is None else bisect_left(dates, _date_key(start_date))
+        end = len(dates) if end_date is None else bisect_right(dates, _date_key(end_date))
+        return self._records[child_name][start:end]
@@ -0,0 +1,784 @@
+"""
+One storage interface for every backend
+data_utils (and the legacy database/database_utils API) read and write
+through a Repository. There are three backends:
+- PostgreSQL, using the utils/db_utils pool
+- SQLite, using utils/sqlite_utils
+- the JSON/JSONL file store
+
+The base class implements each read on the loaded records. The file store
+uses those as is; the databases push them down to SQL. Every backend keeps
+its loaded records in one shared DataCache, keyed by the source's change
+marker.
+
+tests/test_repository.py checks every backend against the interface;
+benchmarks/repository.py times the common operations.
+"""
+
+import importlib
+import json
+import math
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from utils.jsonl_store import PartitionedJsonlStore, migrate_to_partitions, quarantine_file, update_json_array
+from utils.observation_index import ObservationIndex
+from utils.table_counters import STATS_ESTIMATE, empty_stats
+
+BACKENDS = ('postgres', 'sqlite', 'files')
+
+BACKEND_MODULES = {'postgres': 'utils.db_utils', 'sqlite': 'utils.sqlite_utils'}
+
+# Numeric prediction columns available to the correlation matrix
+ANALYTICS_COLUMNS = ['math_score', 'reading_score', 'writing_score', 'attendance', 'behavior', 'literacy', 'probability']
+
+TREND_GRANULARITIES = ('day', 'week', 'month')
+
+# Prediction record field -> column it is read from, shared by the SQL backends
+PREDICTION_FIELDS = {
+    'id': 'p.id',
+    'student_name': 's.name',
+    'grade_level': 's.grade_level',
+    'math_score': 'p.math_score',
+    'reading_score': 'p.reading_score',
+    'writing_score': 'p.writing_score',
+    'attendance': 'p.attendance',
+    'behavior': 'p.behavior',
+    'literacy': 'p.literacy',
+    'prediction': 'p.prediction',
+    'probability': 'p.probability',
+    'risk_level': 'p.risk_level',
+    'model_version': 'p.model_version',
+    'notes': 'p.notes',
+    'timestamp': 'p.timestamp',
+    # JSON object of the record's remaining fields (e.g. recommendations)
+    'extra': 'p.extra'
+}
+
+PREDICTION_SELECT = f"""
+    SELECT {', '.join(PREDICTION_FIELDS.values())}
+    FROM predictions p
+    JOIN students s ON p.student_id = s.id
+"""
+
+# Parent observation record fields, named like their parent_observations columns
+OBSERVATION_FIELDS = (
+    'id', 'child_name', 'date', 'homework_completion', 'reading_time', 'focus_level', 'subjects_struggled',
+    'behavior_rating', 'mood_rating', 'sleep_hours', 'energy_level', 'social_interactions', 'learning_wins',
+    'challenges_faced', 'strategies_used', 'screen_time', 'physical_activity', 'medication_taken',
+    'special_events', 'timestamp'
+)
+
+
+def record_from_row(fields, row):
+    """Map a row selected in `fields` order to a record, with dates as ISO strings"""
+    record = dict(zip(fields, row))
+    for field, value in record.items():
+        if isinstance(value, (datetime, date)):
+            record[field] = value.isoformat()
+    return record
+
+
+def day_range(start_date=None, end_date=None):
+    """
+    (first day, day after the last) of an inclusive date range, as dates
+
+    Stored observation dates may carry a time of day, so SQL selects the
+    range with date < the day after end_date. None leaves that side open.
+    """
+    def as_date(value):
+        return value if isinstance(value, date) and not isinstance(value, datetime) else date.fromisoformat(str(value)[:10])
+
+    first = None if start_date is None else as_date(start_date)
+    after_last = None if end_date is None else as_date(end_date) + timedelta(days=1)
+    return first, after_last
+
+
+def prediction_extra(record):
+    """JSON text for the extra column: the record's fields without a column of their own"""
+    extra = {}
+    for field, value in record.items():
+        if field in PREDICTION_FIELDS:
+            continue
+        # JSON (and jsonb) have no NaN
+        if isinstance(value, float) and not math.isfinite(value):
+            value = None
+        extra[field] = value
+    return json.dumps(extra, default=str) if extra else None
+
+
+def prediction_from_row(row):
+    """Map a PREDICTION_SELECT row to a prediction record, extra fields included"""
+    record = record_from_row(PREDICTION_FIELDS, row)
+    extra = record.pop('extra')
+    if isinstance(extra, str):
+        extra = json.loads(extra)
+    for field, value in (extra or {}).items():
+        record.setdefault(field, value)
+    return record
+
+
+class DataCache:
+    """
+    Per-process cache of loaded records, shared by all Streamlit sessions
+
+    Each entry is stored with the signature of its source (file stat or a
+    database high-water mark) and reloaded only when the signature changes.
+    A None signature means the source cannot be checked, so the loader
+    always runs.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key, signature, loader):
+        """Return the cached value for key, calling loader() when the signature changed"""
+        if signature is None:
+            return loader()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._hits += 1
+                return entry[1]
+
+            # Loading under the lock means concurrent reruns parse the
+            # source once instead of each doing a full load
+            self._misses += 1
+            value = loader()
+            self._entries[key] = (signature, value)
+            return value
+
+    def invalidate(self, prefix=None):
+        """Drop all entries, or those whose key starts with prefix"""
+        with self._lock:
+            if prefix is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key.startswith(prefix)]:
+                    del self._entries[key]
+
+    def get_stats(self):
+        """Get hit/miss counters"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self._hits, 'misses': self._misses}
+
+
+_data_cache = DataCache()
+
+
+def get_data_cache_stats():
+    """Get statistics of the loaded-records cache"""
+    return _data_cache.get_stats()
+
+
+def clear_data_cache():
+    """Drop all cached records"""
+    _data_cache.invalidate()
+
+
+class Repository:
+    """
+    Storage backend interface
+
+    Tables are named as in the database: 'predictions' and
+    'parent_observations'. Loaded records are shared between callers and
+    must not be modified in place.
+    """
+
+    name = None
+
+    @property
+    def location(self):
+        """Where the records live, to keep cache entries of two stores apart"""
+        return ''
+
+    def _key(self, name):
+        return f"{self.name}:{self.location}:{name}"
+
+    def signature(self, table):
+        """Cheap change marker of a table, or None when it cannot be read"""
+        raise NotImplementedError
+
+    def clear_caches(self):
+        """Forget cached records (and a database's cached ids and statistics)"""
+        _data_cache.invalidate(self._key(''))
+
+    def save_prediction(self, record):
+        """Save one prediction; returns True when saved"""
+        raise NotImplementedError
+
+    def save_predictions(self, records):
+        """Save many predictions at once; returns the number saved"""
+        raise NotImplementedError
+
+    def save_observation(self, record):
+        """Save one parent observation; returns True when saved"""
+        raise NotImplementedError
+
+    def _read_predictions(self):
+        raise NotImplementedError
+
+    def _read_observations(self):
+        raise NotImplementedError
+
+    def _records(self, table, signature):
+        loader = self._read_predictions if table == 'predictions' else self._read_observations
+        return _data_cache.get(self._key(table), signature, loader)
+
+    def load_predictions(self):
+        """All predictions, cached until the table changes"""
+        return self._records('predictions', self.signature('predictions'))
+
+    def load_observations(self):
+        """All parent observations, cached until the table changes"""
+        return self._records('parent_observations', self.signature('parent_observations'))
+
+    def load_dataframe(self, table):
+        """A table's records as a DataFrame, cached like the records"""
+        signature = self.signature(table)
+        return _data_cache.get(self._key(f'{table}:df'), signature,
+                               lambda: pd.DataFrame(self._records(table, signature)))
+
+    def _newest_first(self, student_name=None):
+        signature = self.signature('predictions')
+        records = _data_cache.get(
+            self._key('predictions:newest_first'), signature,
+            lambda: sorted(self._records('predictions', signature),
+                           key=lambda record: record.get('timestamp', ''), reverse=True)
+        )
+        if student_name is not None:
+            records = [record for record in records if record.get('student_name') == student_name]
+        return records
+
+    def _page_cursor(self, timestamp, position):
+        """
+        Opaque cursor for the next page: (store, timestamp, position)
+
+        The position (a row id or an offset) only means something to the
+        store that made the cursor, so the cursor names that store.
+        """
+        return (self._key('predictions'), timestamp, position)
+
+    def _cursor_position(self, after):
+        """
+        (timestamp, position) of a page cursor
+
+        position is None when another store made the cursor (e.g. the
+        database failed mid-pagination): paging then continues with the
+        records older than the cursor's timestamp.
+        """
+        if after is None:
+            return None, None
+        store, timestamp, position = after
+        return timestamp, (position if store == self._key('predictions') else None)
+
+    def load_predictions_page(self, limit=50, after=None, student_name=None):
+        """
+        One page of predictions, newest first
+
+        Returns:
+            tuple: (records, cursor to pass as `after` for the next page, None after the last page)
+        """
+        # Loaded records have no ids, so the position is an offset into the sorted records
+        records = self._newest_first(student_name)
+        timestamp, start = self._cursor_position(after)
+        if start is None:
+            start = 0 if timestamp is None else next(
+                (i for i, record in enumerate(records) if record.get('timestamp', '') < timestamp), len(records)
+            )
+        page = records[start:start + limit]
+        if start + limit >= len(records):
+            return page, None
+        return page, self._page_cursor(page[-1].get('timestamp'), start + limit)
+
+    def iter_predictions(self, batch_size=1000, student_name=None):
+        """Iterate over predictions, newest first; errors are raised, not swallowed"""
+        yield from self._newest_first(student_name)
+
+    def student_names(self):
+        """Names of students with predictions, sorted"""
+        df = self.load_dataframe('predictions')
+        if df.empty or 'student_name' not in df.columns:
+            return []
+        return sorted(df['student_name'].dropna().unique())
+
+    def risk_trend_counts(self, granularity='day'):
+        """
+        Count predictions per period (weeks start on Monday) and risk level
+
+        Returns:
+            list: (period start as datetime, risk_level, count) tuples, oldest first
+        """
+        if granularity not in TREND_GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+
+        df = self.load_dataframe('predictions')
+        if df.empty or 'risk_level' not in df.columns:
+            return []
+
+        timestamps = pd.to_datetime(df['timestamp'], format='ISO8601')
+        if granularity == 'day':
+            periods = timestamps.dt.floor('D')
+        elif granularity == 'week':
+            periods = timestamps.dt.to_period('W').dt.start_time
+        else:
+            periods = timestamps.dt.to_period('M').dt.start_time
+        counts = df.groupby([periods.rename('period'), df['risk_level']]).size()
+        return [(period.to_pydatetime(), risk_level, int(count)) for (period, risk_level), count in counts.items()]
+
+    def score_correlations(self, columns=ANALYTICS_COLUMNS):
+        """
+        Pearson correlation of every pair of columns, each pair over the rows
+        where both values are present
+
+        Returns:
+            dict: {(column_a, column_b): correlation or None}, for both orders of each pair
+        """
+        unknown = [column for column in columns if column not in ANALYTICS_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+        df = self.load_dataframe('predictions')
+        if df.empty or not all(column in df.columns for column in columns):
+            return {}
+        matrix = df[list(columns)].apply(pd.to_numeric, errors='coerce').corr()
+        return {(a, b): None if pd.isna(matrix.loc[a, b]) else float(matrix.loc[a, b]) for a in columns for b in columns}
+
+    def child_observations(self, child_name, start_date=None, end_date=None):
+        """One child's observations between two dates (inclusive; None for no bound), oldest first"""
+        return ObservationIndex(self.load_observations()).query(child_name, start_date, end_date)
+
+    def get_stats(self, estimate=STATS_ESTIMATE):
+        """Row counts and newest timestamps, as in table_counters.empty_stats()"""
+        raise NotImplementedError
+
+    def delete_before(self, table, cutoff):
+        """
+        Delete records older than cutoff (a datetime); records without a
+        valid timestamp are kept
+
+        Returns:
+            dict: removed and remaining records and dropped file partitions,
+            or None when the database is unreachable
+        """
+        raise NotImplementedError
+
+    def delete_benchmark_records(self):
+        """Delete the records of the benchmark students ('eduscan-benchmark-*')"""
+        raise NotImplementedError
+
+    def authenticate(self, username, password):
+        """The user's record, or None for unknown credentials"""
+        raise NotImplementedError
+
+
+class DatabaseRepository(Repository):
+    """
+    PostgreSQL or SQLite, through the functions of utils/db_utils or
+    utils/sqlite_utils
+
+    Instances share the module's connection pool (or per-thread SQLite
+    connections), student id cache and statistics cache.
+    """
+
+    def __init__(self, backend):
+        if backend not in BACKEND_MODULES:
+            raise ValueError(f"Unknown database backend: {backend}")
+        self.name = backend
+        # Raises ImportError when the driver is not installed
+        self.backend = importlib.import_module(BACKEND_MODULES[backend])
+
+    @property
+    def location(self):
+        return self.backend.get_sqlite_path() if self.name == 'sqlite' else ''
+
+    def signature(self, table):
+        try:
+            watermark = self.backend.get_table_watermark(table)
+        except Exception:
+            watermark = None
+        # The database path is used even when unreachable, so it cannot be cached then
+        return ('db', watermark) if watermark is not None else None
+
+    def clear_caches(self):
+        super().clear_caches()
+        self.backend.clear_caches()
+
+    def save_prediction(self, record):
+        saved = self.backend.save_prediction_to_db(record)
+        _data_cache.invalidate(self._key('predictions'))
+        return saved
+
+    def save_predictions(self, records):
+        saved = self.backend.save_predictions_bulk(records)
+        _data_cache.invalidate(self._key('predictions'))
+        return saved
+
+    def save_observation(self, record):
+        saved = self.backend.save_parent_observation_to_db(record)
+        _data_cache.invalidate(self._key('parent_observations'))
+        return saved
+
+    def _read_predictions(self):
+        return self.backend.load_student_predictions()
+
+    def _read_observations(self):
+        return self.backend.load_parent_observations()
+
+    def load_predictions_page(self, limit=50, after=None, student_name=None):
+        # Keyset paging on (timestamp, id); ids start at 1, so (timestamp, 0)
+        # continues a foreign cursor with the strictly older rows
+        timestamp, row_id = self._cursor_position(after)
+        keyset = None if timestamp is None else (timestamp, row_id if row_id is not None else 0)
+        records, next_keyset = self.backend.load_predictions_page(limit, keyset, student_name)
+        if next_keyset is None:
+            return records, None
+        return records, self._page_cursor(*next_keyset)
+
+    def iter_predictions(self, batch_size=1000, student_name=None):
+        yield from self.backend.iter_student_predictions(batch_size, student_name)
+
+    def student_names(self):
+        return self.backend.get_student_names()
+
+    def risk_trend_counts(self, granularity='day'):
+        return self.backend.get_risk_trend_counts(granularity)
+
+    def score_correlations(self, columns=ANALYTICS_COLUMNS):
+        return self.backend.get_score_correlations(list(columns))
+
+    def child_observations(self, child_name, start_date=None, end_date=None):
+        # Reads the (child_name, date) index instead of loading every observation
+        observations = self.backend.load_child_observations(child_name, *day_range(start_date, end_date))
+        if observations is None:
+            raise ConnectionError(f"Cannot connect to the {self.name} database")
+        return observations
+
+    def get_stats(self, estimate=STATS_ESTIMATE):
+        return self.backend.get_database_stats(estimate)
+
+    def delete_before(self, table, cutoff):
+        removed = self.backend.delete_records_before(table, cutoff)
+        _data_cache.invalidate(self._key(table))
+        if removed is None:
+            return None
+        return {
+            'removed': removed,
+            'remaining': (self.backend.get_table_watermark(table) or (0,))[0],
+            'dropped_partitions': []
+        }
+
+    def delete_benchmark_records(self):
+        self.backend.delete_benchmark_students()
+        self.clear_caches()
+
+    def authenticate(self, username, password):
+        return self.backend.authenticate_user_db(username, password)
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+        return (path, stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    except OSError:
+        return (path, None)
+
+
+def _keep_recent(records, cutoff_date):
+    """Keep records from cutoff_date on, and records without a valid timestamp"""
+    kept = []
+    for record in records:
+        try:
+            if datetime.fromisoformat(record.get('timestamp', '')) >= cutoff_date:
+                kept.append(record)
+        except (TypeError, ValueError):
+            # Keep records without valid timestamps
+            kept.append(record)
+    return kept
+
+
+def _default_users():
+    created_date = datetime.now().isoformat()
+    return [
+        {
+            "username": "admin",
+            "password": "admin123",
+            "user_type": "teacher",
+            "full_name": "Administrator",
+            "email": "admin@school.edu",
+            "created_date": created_date
+        },
+        {
+            "username": "teacher1",
+            "password": "teacher123",
+            "user_type": "teacher",
+            "full_name": "Demo Teacher",
+            "email": "teacher@school.edu",
+            "created_date": created_date
+        },
+        {
+            "username": "parent1",
+            "password": "parent123",
+            "user_type": "parent",
+            "full_name": "Demo Parent",
+            "email": "parent@email.com",
+            "created_date": created_date
+        }
+    ]
+
+
+class FileRepository(Repository):
+    """
+    Records in a data directory, used without a database and as the fallback
+    when it fails
+
+    storage_format 'jsonl' keeps append-only files partitioned by month
+    (data/<store>/<YYYY-MM>.jsonl); 'json' keeps the legacy arrays
+    (data/<store>.json), rewritten under a lock on every save.
+    """
+
+    name = 'files'
+
+    # Store name of each table
+    STORES = {'predictions': 'student_data', 'parent_observations': 'parent_observations'}
+
+    def __init__(self, data_directory, storage_format='jsonl'):
+        if storage_format not in ('jsonl', 'json'):
+            raise ValueError(f"Unknown file storage format: {storage_format}")
+        self.data_directory = data_directory
+        self.storage_format = storage_format
+        self._stores = {}
+        self._stores_lock = threading.Lock()
+
+    @property
+    def location(self):
+        return f"{self.storage_format}:{self.data_directory}"
+
+    def get_store(self, name):
+        """
+        Get the month-partitioned store for 'student_data' or 'parent_observations'
+
+        Older single-file stores (<name>.json or <name>.jsonl) are migrated on
+        first use.
+        """
+        with self._stores_lock:
+            if name not in self._stores:
+                store = PartitionedJsonlStore(os.path.join(self.data_directory, name))
+                for extension in ('.json', '.jsonl'):
+                    migrate_to_partitions(os.path.join(self.data_directory, name + extension), store)
+                self._stores[name] = store
+            return self._stores[name]
+
+    def _path(self, table):
+        return os.path.join(self.data_directory, f'{self.STORES[table]}.json')
+
+    def signature(self, table):
+        if self.storage_format == 'jsonl':
+            return ('jsonl', self.get_store(self.STORES[table]).signature())
+        return ('json', _file_signature(self._path(table)))
+
+    def _append(self, table, records):
+        if self.storage_format == 'jsonl':
+            store = self.get_store(self.STORES[table])
+            if len(records) == 1:
+                store.append(records[0])
+            else:
+                store.extend(records)
+        else:
+            # Locked read-modify-write with an atomic rename, so concurrent
+            # sessions neither lose records nor leave a half-written file
+            update_json_array(self._path(table), lambda existing_data: existing_data + list(records))
+        _data_cache.invalidate(self._key(table))
+
+    def save_prediction(self, record):
+        try:
+            self._append('predictions', [record])
+            return True
+        except Exception as e:
+            print(f"Error saving prediction data: {e}")
+            return False
+
+    def save_predictions(self, records):
+        if not records:
+            return 0
+        try:
+            self._append('predictions', records)
+            return len(records)
+        except Exception as e:
+            print(f"Error saving prediction data: {e}")
+            return 0
+
+    def save_observation(self, record):
+        try:
+            self._append('parent_observations', [record])
+            return True
+        except Exception as e:
+            print(f"Error saving parent observation: {e}")
+            return False
+
+    def _read_predictions(self):
+        try:
+            if self.storage_format == 'jsonl':
+                return self.get_store('student_data').load()
+
+            file_path = self._path('predictions')
+            if os.path.exists(file_path):
+                with open(file_path, 'r') as f:
+                    return json.load(f)
+            return []
+
+        except Exception as e:
+            print(f"Error loading student data: {e}")
+            return []
+
+    def _read_observations(self):
+        if self.storage_format == 'jsonl':
+            try:
+                return self.get_store('parent_observations').load()
+            except Exception as e:
+                print(f"Error loading parent observations: {e}")
+                return []
+
+        file_path = self._path('parent_observations')
+        try:
+            if not os.path.exists(file_path):
+                return []
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read().strip()
+            if not content:
+                return []
+            data = json.loads(content)
+            # Ensure data is a list
+            return data if isinstance(data, list) else []
+
+        except (json.JSONDecodeError, UnicodeDecodeError, TypeError) as e:
+            print(f"JSON parsing error in parent observations: {e}")
+            # Keep the corrupted file for recovery instead of replacing it with []
+            try:
+                quarantine_file(file_path)
+            except OSError:
+                pass
+            return []
+        except Exception as e:
+            print(f"Error loading parent observations: {e}")
+            return []
+
+    def load_users(self):
+        """Load users.json, creating it with the default users the first time"""
+        file_path = os.path.join(self.data_directory, 'users.json')
+        try:
+            if os.path.exists(file_path):
+                with open(file_path, 'r') as f:
+                    return json.load(f)
+
+            default_users = _default_users()
+            with open(file_path, 'w') as f:
+                json.dump(default_users, f, indent=2)
+            return default_users
+
+        except Exception as e:
+            print(f"Error loading user data: {e}")
+            return []
+
+    def save_user(self, user_data):
+        """Add a user to users.json, or replace the one with the same username"""
+        file_path = os.path.join(self.data_directory, 'users.json')
+        try:
+            existing_users = []
+            if os.path.exists(file_path):
+                try:
+                    with open(file_path, 'r') as f:
+                        existing_users = json.load(f)
+                except (json.JSONDecodeError, FileNotFoundError):
+                    existing_users = []
+
+            for i, user in enumerate(existing_users):
+                if user['username'] == user_data['username']:
+                    existing_users[i] = user_data
+                    break
+            else:
+                existing_users.append(user_data)
+
+            with open(file_path, 'w') as f:
+                json.dump(existing_users, f, indent=2)
+            return True
+
+        except Exception as e:
+            print(f"Error saving user data: {e}")
+            return False
+
+    def authenticate(self, username, password):
+        for user in self.load_users():
+            if user['username'] == username and user['password'] == password:
+                return user
+        return None
+
+    def get_stats(self, estimate=STATS_ESTIMATE):
+        # Files have no counters, so the records are loaded and counted
+        try:
+            predictions = self.load_predictions()
+            observations = self.load_observations()
+            stats = empty_stats()
+            stats.update({
+                'total_students': len({record.get('student_name') for record in predictions}),
+                'total_predictions': len(predictions),
+                'total_observations': len(observations),
+                'total_users': len(self.load_users())
+            })
+            if predictions:
+                stats['last_prediction_date'] = max(record.get('timestamp', '') for record in predictions)
+            if observations:
+                stats['last_observation_date'] = max(record.get('timestamp', '') for record in observations)
+            return stats
+
+        except Exception as e:
+            print(f"Error getting data summary: {e}")
+            return empty_stats()
+
+    def delete_before(self, table, cutoff):
+        keep = lambda records: _keep_recent(records, cutoff)
+        if self.storage_format == 'jsonl':
+            result = self.get_store(self.STORES[table]).drop_before(cutoff, keep)
+        else:
+            counts = {}
+
+            def count_kept(records):
+                kept = keep(records)
+                counts['removed'] = len(records) - len(kept)
+                return kept
+
+            remaining = update_json_array(self._path(table), count_kept)
+            result = {'removed': counts['removed'], 'remaining': len(remaining), 'dropped_partitions': []}
+        _data_cache.invalidate(self._key(table))
+        return result
+
+    def delete_benchmark_records(self):
+        # Benchmark records are all dated before BENCHMARK_END
+        for table in self.STORES:
+            self.delete_before(table, BENCHMARK_END)
+
+
+def open_repository(backend, data_directory=None, storage_format='jsonl'):
+    """
+    Open the repository of a backend in BACKENDS
+
+    Raises ImportError when a database backend's driver is missing. The file
+    store needs data_directory.
+    """
+    if backend == 'files':
+        return FileRepository(data_directory, storage_format)
+    return DatabaseRepository(backend)
+
+
+# Test and benchmark records belong to 'eduscan-benchmark-*' students and are
+# dated in 1900, so deleting them by name or date cannot touch real data
+BENCHMARK_PREFIX = 'eduscan-benchmark-'
+BENCHMARK_START = datetime(1900, 1, 1)
+BENCHMARK_END = datetime(1901, 1, 1)
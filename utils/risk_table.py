@@ -0,0 +1,131 @@
+"""
+Precomputed risk lookup table for grid-aligned inputs
+The model's outputs are evaluated once over a regular grid of the six input
+features and stored as memory-mapped NumPy arrays next to the model, so
+predictions for on-grid inputs become a single array index
+"""
+
+import json
+import os
+import time
+import numpy as np
+
+
+def make_grid(feature_ranges, feature_columns, score_step=10):
+    """
+    Build a grid specification for the model inputs.
+
+    The 0-100 features (scores and attendance) use score_step; the small
+    integer ratings (behavior, literacy) always use a step of 1.
+    """
+    grid = []
+    for col in feature_columns:
+        low, high = feature_ranges[col][0], feature_ranges[col][1]
+        step = score_step if high - low > 10 else 1
+        grid.append({'feature': col, 'low': low, 'high': high, 'step': step})
+    return grid
+
+
+def _grid_shape(grid):
+    return tuple(int(round((axis['high'] - axis['low']) / axis['step'])) + 1 for axis in grid)
+
+
+def build_table(score_fn, directory, grid, model_hash, name='risk_table', chunk_size=20000):
+    """
+    Evaluate score_fn over every grid point and write the table to disk
+
+    Args:
+        score_fn: function taking an (n, n_features) array and returning
+            (predictions, risk_probabilities)
+        directory (str): directory the table files are written to
+        grid (list): grid specification from make_grid
+        model_hash (str): version of the model the table was built from
+        name (str): base file name of the table
+
+    Returns:
+        dict: the table manifest, including build time and on-disk size
+    """
+    shape = _grid_shape(grid)
+    size = int(np.prod(shape))
+    low = np.array([axis['low'] for axis in grid], dtype=float)
+    step = np.array([axis['step'] for axis in grid], dtype=float)
+
+    probability_path = os.path.join(directory, f"{name}.npy")
+    prediction_path = os.path.join(directory, f"{name}_predictions.npy")
+    manifest_path = os.path.join(directory, f"{name}.json")
+
+    start = time.perf_counter()
+    probabilities = np.lib.format.open_memmap(probability_path + '.tmp', mode='w+', dtype=np.float64, shape=(size,))
+    predictions = np.lib.format.open_memmap(prediction_path + '.tmp', mode='w+', dtype=np.int8, shape=(size,))
+
+    for chunk_start in range(0, size, chunk_size):
+        flat_index = np.arange(chunk_start, min(chunk_start + chunk_size, size))
+        features = np.column_stack(np.unravel_index(flat_index, shape)) * step + low
+        chunk_predictions, chunk_probabilities = score_fn(features)
+        probabilities[flat_index] = chunk_probabilities
+        predictions[flat_index] = chunk_predictions
+
+    probabilities.flush()
+    predictions.flush()
+    del probabilities, predictions
+    build_seconds = time.perf_counter() - start
+
+    # Drop the old manifest first so a reader never pairs it with the new
+    # arrays; the table only becomes visible again once the manifest is back
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    os.replace(probability_path + '.tmp', probability_path)
+    os.replace(prediction_path + '.tmp', prediction_path)
+
+    manifest = {
+        'model_hash': model_hash,
+        'grid': grid,
+        'shape': list(shape),
+        'entries': size,
+        'build_seconds': build_seconds,
+        'size_bytes': os.path.getsize(probability_path) + os.path.getsize(prediction_path),
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    return manifest
+
+
+class RiskTable:
+    """Memory-mapped risk table with O(1) lookup of grid-aligned inputs"""
+
+    def __init__(self, manifest, probabilities, predictions):
+        self.manifest = manifest
+        self.model_hash = manifest['model_hash']
+        self.probabilities = probabilities
+        self.predictions = predictions
+        self._low = [axis['low'] for axis in manifest['grid']]
+        self._step = [axis['step'] for axis in manifest['grid']]
+        self._shape = manifest['shape']
+        self._strides = [int(np.prod(self._shape[i + 1:])) for i in range(len(self._shape))]
+
+    @classmethod
+    def load(cls, directory, name='risk_table'):
+        """Open a table written by build_table, or return None if there is none"""
+        manifest_path = os.path.join(directory, f"{name}.json")
+        if not os.path.exists(manifest_path):
+            return None
+
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        probabilities = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+        predictions = np.load(os.path.join(directory, f"{name}_predictions.npy"), mmap_mode='r')
+        return cls(manifest, probabilities, predictions)
+
+    def lookup(self, values):
+        """Return (prediction, probability) for an on-grid input, or None otherwise"""
+        index = 0
+        for value, low, step, size, stride in zip(values, self._low, self._step, self._shape, self._strides):
+            position = (value - low) / step
+            if not 0 <= position < size or position != int(position):
+                return None
+            cell = int(position)
+            index += cell * stride
+        return int(self.predictions[index]), float(self.probabilities[index])
@@ -0,0 +1,242 @@
+"""
+Shadow scoring of a candidate model against production traffic
+A sampled share of live predictions is handed to a background thread that
+scores the same inputs with a candidate model from the registry and logs
+both results to a local JSONL store. Users only ever see the production
+result; submitting is a non-blocking queue put.
+"""
+
+import json
+import os
+import pickle
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from utils.model_artifact import MANIFEST_NAME, load_artifact
+from utils.model_registry import MODEL_FILE, get_model_metadata, get_registry_directory
+
+# Registry version of the candidate model; shadow scoring is off when unset
+SHADOW_VERSION = os.environ.get('EDUSCAN_SHADOW_VERSION')
+
+# Share of production predictions that are also scored by the candidate
+SHADOW_SAMPLE_RATE = float(os.environ.get('EDUSCAN_SHADOW_SAMPLE_RATE', 0.1))
+
+FEATURE_COLUMNS = ['math_score', 'reading_score', 'writing_score', 'attendance', 'behavior', 'literacy']
+
+
+def get_shadow_log_path():
+    """Get the path of the shadow comparison log"""
+    return os.path.join(os.path.dirname(get_registry_directory()), 'shadow_log.jsonl')
+
+
+def _load_candidate(version):
+    """Load a registry version as a model package"""
+    get_model_metadata(version)
+    version_dir = os.path.join(get_registry_directory(), version)
+
+    artifact_dir = os.path.join(version_dir, 'artifact')
+    if os.path.exists(os.path.join(artifact_dir, MANIFEST_NAME)):
+        return load_artifact(artifact_dir)
+
+    with open(os.path.join(version_dir, MODEL_FILE), 'rb') as f:
+        package = pickle.load(f)
+    if isinstance(package, dict) and 'model' in package:
+        return package
+    return {'model': package, 'scaler': None, 'feature_names': FEATURE_COLUMNS, 'feature_order': FEATURE_COLUMNS}
+
+
+class ShadowScorer:
+    """Background scorer comparing a candidate model with production"""
+
+    def __init__(self, candidate_version, sample_rate=SHADOW_SAMPLE_RATE, log_path=None, max_queue=1000):
+        self.candidate_version = candidate_version
+        self.sample_rate = sample_rate
+        self.log_path = log_path or get_shadow_log_path()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._candidate = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.submitted = 0
+        self.dropped = 0
+        self.scored = 0
+        self.errors = 0
+
+    def submit(self, features, prediction, probability, latency_seconds, production_version, score_fn):
+        """
+        Queue one production prediction for shadow scoring
+
+        Never blocks: unsampled requests return immediately and samples are
+        dropped (and counted) when the worker is behind.
+        """
+        if random.random() >= self.sample_rate:
+            return False
+
+        self._ensure_worker()
+        item = {
+            'features': [float(value) for value in features],
+            'prediction': int(prediction),
+            'probability': float(probability),
+            'latency_ms': latency_seconds * 1000,
+            'production_version': production_version,
+            'submitted_at': datetime.now().isoformat()
+        }
+        try:
+            self._queue.put_nowait((item, score_fn))
+            self.submitted += 1
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _ensure_worker(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item, score_fn = self._queue.get()
+            try:
+                self._score(item, score_fn)
+                self.scored += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Shadow scoring error: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _score(self, item, score_fn):
+        if self._candidate is None:
+            self._candidate = _load_candidate(self.candidate_version)
+
+        start = time.perf_counter()
+        predictions, probabilities = score_fn(self._candidate, np.array([item['features']]))
+        candidate_latency = time.perf_counter() - start
+
+        record = {
+            'timestamp': item['submitted_at'],
+            'production_version': item['production_version'],
+            'candidate_version': self.candidate_version,
+            **dict(zip(FEATURE_COLUMNS, item['features'])),
+            'production_prediction': item['prediction'],
+            'production_probability': item['probability'],
+            'candidate_prediction': int(predictions[0]),
+            'candidate_probability': float(probabilities[0]),
+            'agree': int(predictions[0]) == item['prediction'],
+            'probability_delta': float(probabilities[0]) - item['probability'],
+            'production_latency_ms': item['latency_ms'],
+            'candidate_latency_ms': candidate_latency * 1000
+        }
+        with open(self.log_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def flush(self, timeout=None):
+        """Wait until all queued samples have been scored"""
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    def get_stats(self):
+        """Get submission and scoring counters"""
+        return {
+            'candidate_version': self.candidate_version,
+            'sample_rate': self.sample_rate,
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'scored': self.scored,
+            'errors': self.errors,
+            'queued': self._queue.qsize()
+        }
+
+
+_shadow_scorer = None
+_shadow_lock = threading.Lock()
+
+
+def configure_shadow(candidate_version, sample_rate=SHADOW_SAMPLE_RATE, log_path=None):
+    """Start shadow scoring with a registry version, or stop it with None"""
+    global _shadow_scorer
+    with _shadow_lock:
+        if candidate_version is None:
+            _shadow_scorer = None
+        else:
+            get_model_metadata(candidate_version)
+            _shadow_scorer = ShadowScorer(candidate_version, sample_rate, log_path)
+        return _shadow_scorer
+
+
+def get_shadow_scorer():
+    """Get the active shadow scorer, or None when shadow scoring is off"""
+    global _shadow_scorer
+    if _shadow_scorer is None and SHADOW_VERSION:
+        with _shadow_lock:
+            if _shadow_scorer is None:
+                try:
+                    get_model_metadata(SHADOW_VERSION)
+                    _shadow_scorer = ShadowScorer(SHADOW_VERSION)
+                except ValueError as e:
+                    print(f"Shadow scoring disabled: {e}")
+                    return None
+    return _shadow_scorer
+
+
+def _feature_bins(values, column):
+    """Bin a feature for slicing: every value for small ratings, quartiles for scores"""
+    if column in ('behavior', 'literacy'):
+        return values.round().astype(int).astype(str)
+    return pd.cut(values, bins=[-0.001, 25, 50, 75, 100], labels=['0-25', '25-50', '50-75', '75-100']).astype(str)
+
+
+def shadow_report(log_path=None):
+    """
+    Summarize how the candidate model disagrees with production
+
+    Returns:
+        dict: overall agreement rate, probability deltas and latencies, plus
+            a DataFrame per feature with agreement and mean delta per slice
+    """
+    log_path = log_path or get_shadow_log_path()
+    if not os.path.exists(log_path):
+        return {'comparisons': 0}
+
+    df = pd.read_json(log_path, lines=True)
+    if df.empty:
+        return {'comparisons': 0}
+
+    abs_delta = df['probability_delta'].abs()
+    report = {
+        'comparisons': len(df),
+        'production_versions': sorted(df['production_version'].astype(str).unique()),
+        'candidate_versions': sorted(df['candidate_version'].astype(str).unique()),
+        'agreement_rate': float(df['agree'].mean()),
+        'mean_probability_delta': float(df['probability_delta'].mean()),
+        'mean_abs_probability_delta': float(abs_delta.mean()),
+        'p95_abs_probability_delta': float(abs_delta.quantile(0.95)),
+        'max_abs_probability_delta': float(abs_delta.max()),
+        'production_latency_ms_p50': float(df['production_latency_ms'].median()),
+        'candidate_latency_ms_p50': float(df['candidate_latency_ms'].median()),
+        'candidate_latency_ms_p95': float(df['candidate_latency_ms'].quantile(0.95)),
+        'slices': {}
+    }
+
+    for column in FEATURE_COLUMNS:
+        grouped = df.groupby(_feature_bins(df[column], column))
+        report['slices'][column] = pd.DataFrame({
+            'comparisons': grouped.size(),
+            'agreement_rate': grouped['agree'].mean(),
+            'mean_probability_delta': grouped['probability_delta'].mean()
+        })
+
+    return report
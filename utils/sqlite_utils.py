@@ -0,0 +1,789 @@
+"""
+Embedded SQLite backend
+Implements the same functions as utils/db_utils against the
+database/models.py schema, for deployments without a database server. The
+database runs in WAL mode, so Streamlit sessions can read while another
+one writes, and each thread keeps one open connection.
+"""
+
+import json
+import math
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, date
+import logging
+from utils.migrations import migrate, normalize_subjects
+from utils.repository import (
+    ANALYTICS_COLUMNS, OBSERVATION_FIELDS, PREDICTION_SELECT, prediction_extra, prediction_from_row, record_from_row
+)
+from utils.student_identity import StudentIdCache
+from utils.table_counters import SELECT_COUNTERS, STATS_ESTIMATE, StatsCache, empty_stats, stats_from_counters
+
+logger = logging.getLogger(__name__)
+
+
+def get_sqlite_path():
+    """Get the path of the SQLite database file"""
+    if os.environ.get('EDUSCAN_SQLITE_PATH'):
+        return os.environ['EDUSCAN_SQLITE_PATH']
+
+    if getattr(sys, 'frozen', False):
+        # Running as compiled executable
+        base_path = sys._MEIPASS
+    else:
+        # Running as script
+        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    return os.path.join(base_path, 'data', 'eduscan.db')
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(100),
+    grade_level VARCHAR(10),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    student_id INTEGER REFERENCES students(id),
+    math_score FLOAT,
+    reading_score FLOAT,
+    writing_score FLOAT,
+    attendance FLOAT,
+    behavior INTEGER,
+    literacy INTEGER,
+    prediction INTEGER,
+    probability FLOAT,
+    risk_level VARCHAR(20),
+    model_version VARCHAR(64),
+    notes TEXT,
+    timestamp TIMESTAMP,
+    extra TEXT
+);
+
+CREATE TABLE IF NOT EXISTS parent_observations (
+    id INTEGER PRIMARY KEY,
+    student_id INTEGER REFERENCES students(id),
+    child_name VARCHAR(100),
+    date TIMESTAMP,
+    homework_completion FLOAT,
+    reading_time FLOAT,
+    focus_level VARCHAR(20),
+    subjects_struggled TEXT,
+    behavior_rating INTEGER,
+    mood_rating INTEGER,
+    sleep_hours FLOAT,
+    energy_level VARCHAR(20),
+    social_interactions TEXT,
+    learning_wins TEXT,
+    challenges_faced TEXT,
+    strategies_used TEXT,
+    screen_time FLOAT,
+    physical_activity FLOAT,
+    medication_taken BOOLEAN,
+    special_events TEXT,
+    timestamp TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    username VARCHAR(50) UNIQUE,
+    password VARCHAR(100),
+    user_type VARCHAR(20),
+    full_name VARCHAR(100),
+    email VARCHAR(100),
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS intervention_records (
+    id INTEGER PRIMARY KEY,
+    student_id INTEGER REFERENCES students(id),
+    intervention_type VARCHAR(50),
+    baseline_score FLOAT,
+    current_score FLOAT,
+    weeks_elapsed INTEGER,
+    progress_notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+"""
+
+_local = threading.local()
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+
+def _to_iso(value, default):
+    """Normalize an ISO string (or date) so stored timestamps sort correctly as text"""
+    if value is None:
+        return default
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return datetime.fromisoformat(value).isoformat()
+
+
+def _ensure_schema(conn, path):
+    """Create tables, apply migrations and seed users from users.json (once per process)"""
+    if path in _schema_ready:
+        return
+
+    with _schema_lock:
+        if path in _schema_ready:
+            return
+        conn.executescript(SCHEMA)
+        # Indexes, the student key and row counters (utils/migrations)
+        migrate(conn, 'sqlite')
+
+        if conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0:
+            # Keep the JSON accounts working after switching to SQLite
+            from utils.data_utils import load_user_data
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO users (username, password, user_type, full_name, email, created_date) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (user['username'], user['password'], user.get('user_type'), user.get('full_name'),
+                         user.get('email'), user.get('created_date', datetime.now().isoformat()))
+                        for user in load_user_data()
+                    ]
+                )
+
+        if conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+            _import_file_store(conn)
+            conn.execute("PRAGMA user_version = 1")
+        _schema_ready.add(path)
+
+
+def _import_file_store(conn):
+    """
+    Move records saved by the JSON/JSONL fallback into a new database (runs once)
+
+    Imported partitions are renamed out of the file store, so the records
+    are not counted, listed or cleaned up a second time from there. Records
+    whose timestamp cannot be parsed stay in the file store.
+    """
+    from utils.data_utils import get_record_store
+
+    kept = []
+
+    def insert_all(insert):
+        def consume(records):
+            unparseable = []
+            for record in records:
+                try:
+                    _to_iso(record.get('timestamp'), None)
+                except (TypeError, ValueError):
+                    unparseable.append(record)
+                    continue
+                insert(conn, record)
+            conn.commit()
+            kept.extend(unparseable)
+            return unparseable
+        return consume
+
+    predictions = get_record_store('student_data').hand_off(insert_all(_insert_prediction))
+    observations = get_record_store('parent_observations').hand_off(insert_all(_insert_observation))
+    if predictions or observations:
+        logger.info(f"Imported {predictions} predictions and {observations} observations from the file store")
+    if kept:
+        logger.warning(f"Left {len(kept)} records with unparseable timestamps in the file store")
+
+
+def get_db_connection():
+    """Get this thread's SQLite connection, opening it in WAL mode on first use"""
+    path = get_sqlite_path()
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is not None:
+        return conn
+
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only risks the last commits on power loss, never corruption
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        _ensure_schema(conn, path)
+        connections[path] = conn
+        return conn
+    except Exception as e:
+        logger.error(f"Database connection error: {e}")
+        return None
+
+
+_student_ids = StudentIdCache()
+
+
+def _resolve_student(cur, name, grade_level):
+    """
+    Get a student's cache key and id, creating the student if needed
+
+    grade_level None (parent observations, which do not know the grade)
+    matches the student's oldest row with any grade and creates a missing
+    student as 'Unknown'. The caller caches the id once it has committed.
+    """
+    key = (get_sqlite_path(), name, grade_level)
+    student_id = _student_ids.get(key)
+    if student_id is not None:
+        return key, student_id
+
+    if grade_level is None:
+        student_record = cur.execute(
+            "SELECT id FROM students WHERE name = ? ORDER BY id LIMIT 1", (name,)
+        ).fetchone()
+        if student_record:
+            return key, student_record[0]
+
+    cur.execute(
+        "INSERT INTO students (name, grade_level) VALUES (?, ?) ON CONFLICT (name, grade_level) DO NOTHING",
+        (name, grade_level or 'Unknown')
+    )
+    student_record = cur.execute(
+        "SELECT id FROM students WHERE name = ? AND grade_level = ?", (name, grade_level or 'Unknown')
+    ).fetchone()
+    return key, student_record[0]
+
+
+INSERT_PREDICTION = """
+    INSERT INTO predictions (
+        student_id, math_score, reading_score, writing_score,
+        attendance, behavior, literacy, prediction, probability,
+        risk_level, model_version, notes, timestamp, extra
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _prediction_row(student_id, prediction_data):
+    return (
+        student_id,
+        prediction_data.get('math_score'),
+        prediction_data.get('reading_score'),
+        prediction_data.get('writing_score'),
+        prediction_data.get('attendance'),
+        prediction_data.get('behavior'),
+        prediction_data.get('literacy'),
+        prediction_data.get('prediction'),
+        prediction_data.get('probability'),
+        prediction_data.get('risk_level'),
+        prediction_data.get('model_version'),
+        prediction_data.get('notes', ''),
+        _to_iso(prediction_data.get('timestamp'), datetime.now().isoformat()),
+        prediction_extra(prediction_data)
+    )
+
+
+def _insert_prediction(conn, prediction_data):
+    cur = conn.cursor()
+    student_key, student_id = _resolve_student(cur, prediction_data.get('student_name', 'Unknown Student'),
+                                               prediction_data.get('grade_level') or 'Unknown')
+    cur.execute(INSERT_PREDICTION, _prediction_row(student_id, prediction_data))
+    return student_key, student_id
+
+
+def _insert_observation(conn, observation_data):
+    cur = conn.cursor()
+    child_name = observation_data.get('child_name', 'Unknown Child')
+    student_key, student_id = _resolve_student(cur, child_name, None)
+
+    # Stored as a JSON array (jsonb on PostgreSQL)
+    subjects_struggled = json.dumps(normalize_subjects(observation_data.get('subjects_struggled')))
+
+    cur.execute("""
+        INSERT INTO parent_observations (
+            student_id, child_name, date, homework_completion, reading_time,
+            focus_level, subjects_struggled, behavior_rating, mood_rating,
+            sleep_hours, energy_level, social_interactions, learning_wins,
+            challenges_faced, strategies_used, screen_time, physical_activity,
+            medication_taken, special_events, timestamp
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        student_id,
+        child_name,
+        str(observation_data.get('date') or date.today().isoformat())[:10],
+        observation_data.get('homework_completion'),
+        observation_data.get('reading_time'),
+        observation_data.get('focus_level'),
+        subjects_struggled,
+        observation_data.get('behavior_rating'),
+        observation_data.get('mood_rating'),
+        observation_data.get('sleep_hours'),
+        observation_data.get('energy_level'),
+        observation_data.get('social_interactions', ''),
+        observation_data.get('learning_wins', ''),
+        observation_data.get('challenges_faced', ''),
+        observation_data.get('strategies_used', ''),
+        observation_data.get('screen_time'),
+        observation_data.get('physical_activity'),
+        observation_data.get('medication_taken', False),
+        observation_data.get('special_events', ''),
+        _to_iso(observation_data.get('timestamp'), datetime.now().isoformat())
+    ))
+    return student_key, student_id
+
+
+def save_prediction_to_db(prediction_data):
+    """Save prediction data to the SQLite database"""
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    try:
+        with conn:
+            student_key, student_id = _insert_prediction(conn, prediction_data)
+        _student_ids.put(student_key, student_id)
+
+        logger.info(f"Prediction saved for student: {prediction_data.get('student_name', 'Unknown Student')}")
+        return True
+
+    except Exception as e:
+        # A cached id may point at a student deleted behind our back
+        _student_ids.clear()
+        logger.error(f"Error saving prediction: {e}")
+        return False
+
+
+def save_predictions_bulk(records):
+    """
+    Save many predictions in one transaction
+
+    Students missing from the id cache are upserted with one executemany,
+    and the predictions are inserted with a single executemany.
+
+    Returns:
+        int: number of predictions saved (0 on error)
+    """
+    if not records:
+        return 0
+
+    conn = get_db_connection()
+    if not conn:
+        return 0
+
+    path = get_sqlite_path()
+    keys = [(record.get('student_name', 'Unknown Student'), record.get('grade_level') or 'Unknown') for record in records]
+    student_ids = {key: _student_ids.get((path,) + key) for key in dict.fromkeys(keys)}
+    missing = [key for key, student_id in student_ids.items() if student_id is None]
+
+    try:
+        with conn:
+            if missing:
+                conn.executemany(
+                    "INSERT INTO students (name, grade_level) VALUES (?, ?) ON CONFLICT (name, grade_level) DO NOTHING",
+                    missing
+                )
+                for key in missing:
+                    student_ids[key] = conn.execute(
+                        "SELECT id FROM students WHERE name = ? AND grade_level = ?", key
+                    ).fetchone()[0]
+            conn.executemany(INSERT_PREDICTION, [
+                _prediction_row(student_ids[key], record) for key, record in zip(keys, records)
+            ])
+
+        for key in missing:
+            _student_ids.put((path,) + key, student_ids[key])
+        logger.info(f"Saved {len(records)} predictions for {len(student_ids)} students")
+        return len(records)
+
+    except Exception as e:
+        _student_ids.clear()
+        logger.error(f"Error saving predictions: {e}")
+        return 0
+
+
+def save_parent_observation_to_db(observation_data):
+    """Save parent observation to the SQLite database"""
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    try:
+        with conn:
+            student_key, student_id = _insert_observation(conn, observation_data)
+        _student_ids.put(student_key, student_id)
+
+        logger.info(f"Parent observation saved for: {observation_data.get('child_name', 'Unknown Child')}")
+        return True
+
+    except Exception as e:
+        _student_ids.clear()
+        logger.error(f"Error saving parent observation: {e}")
+        return False
+
+
+def _prediction_dict(row):
+    return prediction_from_row(row)
+
+
+def load_student_predictions():
+    """Load all student prediction data from the SQLite database"""
+    conn = get_db_connection()
+    if not conn:
+        return []
+
+    try:
+        rows = conn.execute(PREDICTION_SELECT + "ORDER BY p.timestamp DESC").fetchall()
+        return [_prediction_dict(row) for row in rows]
+
+    except Exception as e:
+        logger.error(f"Error loading predictions: {e}")
+        return []
+
+
+def load_predictions_page(limit=50, after=None, student_name=None):
+    """
+    Load one page of predictions, newest first, keyset-paginated on (timestamp, id)
+
+    Returns:
+        tuple: (records, cursor for the next page or None after the last page)
+    """
+    conn = get_db_connection()
+    if not conn:
+        return [], None
+
+    conditions, params = [], []
+    if student_name is not None:
+        conditions.append("s.name = ?")
+        params.append(student_name)
+    if after is not None:
+        conditions.append("(p.timestamp, p.id) < (?, ?)")
+        params.extend([_to_iso(after[0], None), after[1]])
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+
+    try:
+        rows = conn.execute(
+            PREDICTION_SELECT + where + "ORDER BY p.timestamp DESC, p.id DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+    except Exception as e:
+        logger.error(f"Error loading predictions: {e}")
+        return [], None
+
+    records = [_prediction_dict(row) for row in rows[:limit]]
+    if len(rows) <= limit:
+        return records, None
+    return records, (records[-1]['timestamp'], records[-1]['id'])
+
+
+def iter_student_predictions(batch_size=1000, student_name=None):
+    """Stream predictions, newest first, fetching batch_size rows at a time; errors are raised"""
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError("Cannot open the SQLite database")
+
+    where, params = "", []
+    if student_name is not None:
+        where, params = "WHERE s.name = ? ", [student_name]
+
+    try:
+        cur = conn.execute(PREDICTION_SELECT + where + "ORDER BY p.timestamp DESC, p.id DESC", params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield _prediction_dict(row)
+    except Exception as e:
+        # Raise rather than end early, so an export is never silently cut short
+        logger.error(f"Error streaming predictions: {e}")
+        raise
+
+
+def _observation_dict(row):
+    observation = record_from_row(OBSERVATION_FIELDS, row)
+    observation['subjects_struggled'] = normalize_subjects(observation['subjects_struggled'])
+    if observation['medication_taken'] is not None:
+        observation['medication_taken'] = bool(observation['medication_taken'])
+    return observation
+
+
+def load_parent_observations():
+    """Load all parent observation data from the SQLite database"""
+    conn = get_db_connection()
+    if not conn:
+        return []
+
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(OBSERVATION_FIELDS)} FROM parent_observations ORDER BY timestamp DESC"
+        ).fetchall()
+        return [_observation_dict(row) for row in rows]
+
+    except Exception as e:
+        logger.error(f"Error loading observations: {e}")
+        return []
+
+
+def load_child_observations(child_name, first_day=None, after_last_day=None):
+    """
+    Load one child's observations with first_day <= date < after_last_day, oldest first
+
+    Uses the (child_name, date) index. Returns None when the database cannot
+    be opened; query errors are raised.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    conditions, params = ["child_name = ?"], [child_name]
+    if first_day is not None:
+        conditions.append("date >= ?")
+        params.append(first_day.isoformat())
+    if after_last_day is not None:
+        conditions.append("date < ?")
+        params.append(after_last_day.isoformat())
+
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(OBSERVATION_FIELDS)} FROM parent_observations "
+            f"WHERE {' AND '.join(conditions)} ORDER BY date, timestamp, id",
+            params
+        ).fetchall()
+    except Exception as e:
+        logger.error(f"Error loading observations for {child_name}: {e}")
+        raise
+    return [_observation_dict(row) for row in rows]
+
+
+def authenticate_user_db(username, password):
+    """Authenticate user against the SQLite database"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    try:
+        user_record = conn.execute(
+            "SELECT id, username, user_type, full_name, email, created_date FROM users WHERE username = ? AND password = ?",
+            (username, password)
+        ).fetchone()
+
+        if user_record:
+            return {
+                'id': user_record[0],
+                'username': user_record[1],
+                'user_type': user_record[2],
+                'full_name': user_record[3],
+                'email': user_record[4],
+                'created_date': user_record[5]
+            }
+        return None
+
+    except Exception as e:
+        logger.error(f"Error authenticating user: {e}")
+        return None
+
+
+_stats_cache = StatsCache()
+
+
+def _query_database_stats():
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    try:
+        return stats_from_counters(conn.execute(SELECT_COUNTERS).fetchall())
+    except Exception as e:
+        logger.error(f"Error getting database stats: {e}")
+        return None
+
+
+def get_database_stats(estimate=STATS_ESTIMATE):
+    """
+    Get database statistics from the trigger-maintained row counters
+
+    Results are reused for EDUSCAN_DB_STATS_TTL seconds. The counters are
+    always installed here, so `estimate` (planner estimates on PostgreSQL)
+    changes nothing.
+    """
+    return _stats_cache.get(get_sqlite_path(), _query_database_stats) or empty_stats()
+
+
+def get_stats_cache_stats():
+    """Get hit counters of the database statistics cache"""
+    return _stats_cache.get_stats()
+
+
+def clear_caches():
+    """Forget cached student ids and statistics, e.g. after rows were deleted behind them"""
+    _student_ids.clear()
+    _stats_cache.clear()
+
+
+# SQLite equivalents of date_trunc (weeks start on Monday, as in PostgreSQL)
+TREND_PERIODS = {
+    'day': "date(timestamp)",
+    'week': "date(timestamp, 'weekday 0', '-6 days')",
+    'month': "strftime('%Y-%m-01', timestamp)"
+}
+
+
+def get_risk_trend_counts(granularity='day'):
+    """
+    Count predictions per period and risk level, aggregated in the database
+
+    Returns:
+        list: (period start as datetime, risk_level, count) tuples, oldest first
+    """
+    if granularity not in TREND_PERIODS:
+        raise ValueError(f"Unknown granularity: {granularity}")
+
+    conn = get_db_connection()
+    if not conn:
+        return []
+
+    try:
+        rows = conn.execute(f"""
+            SELECT {TREND_PERIODS[granularity]} AS period, risk_level, COUNT(*)
+            FROM predictions
+            WHERE timestamp IS NOT NULL
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+        """).fetchall()
+        return [(datetime.fromisoformat(period), risk_level, count) for period, risk_level, count in rows]
+
+    except Exception as e:
+        logger.error(f"Error computing risk trends: {e}")
+        return []
+
+
+def get_score_correlations(columns=ANALYTICS_COLUMNS):
+    """
+    Pearson correlation of every pair of columns, from sums gathered in one scan
+
+    SQLite has no corr(), so each pair collects n, sums, sums of squares and
+    the cross product over rows where both values are present (x + 0 * y is
+    NULL when y is), the same pairwise handling as pandas.
+
+    Returns:
+        dict: {(column_a, column_b): correlation or None}, for both orders of each pair
+    """
+    unknown = [column for column in columns if column not in ANALYTICS_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+    conn = get_db_connection()
+    if not conn:
+        return {}
+
+    pairs = [(a, b) for i, a in enumerate(columns) for b in columns[i:]]
+    aggregates = []
+    for a, b in pairs:
+        aggregates += [
+            f"COUNT({a} * {b})",
+            f"SUM({a} + 0 * {b})", f"SUM({b} + 0 * {a})",
+            f"SUM({a} * {a} + 0 * {b})", f"SUM({b} * {b} + 0 * {a})",
+            f"SUM({a} * {b})"
+        ]
+
+    try:
+        values = conn.execute(f"SELECT {', '.join(aggregates)} FROM predictions").fetchone()
+    except Exception as e:
+        logger.error(f"Error computing correlations: {e}")
+        return {}
+
+    correlations = {}
+    for index, (a, b) in enumerate(pairs):
+        n, sum_a, sum_b, sum_aa, sum_bb, sum_ab = values[index * 6:index * 6 + 6]
+        value = None
+        if n and n > 1:
+            spread_a = n * sum_aa - sum_a * sum_a
+            spread_b = n * sum_bb - sum_b * sum_b
+            # Treat round-off noise on a constant column as zero variance
+            if spread_a > 1e-9 * n * sum_aa and spread_b > 1e-9 * n * sum_bb:
+                value = max(-1.0, min(1.0, (n * sum_ab - sum_a * sum_b) / math.sqrt(spread_a * spread_b)))
+        correlations[(a, b)] = correlations[(b, a)] = value
+    return correlations
+
+
+def get_student_names():
+    """Names of students with at least one prediction, sorted"""
+    conn = get_db_connection()
+    if not conn:
+        return []
+
+    try:
+        rows = conn.execute("""
+            SELECT DISTINCT s.name FROM students s
+            WHERE EXISTS (SELECT 1 FROM predictions p WHERE p.student_id = s.id)
+            ORDER BY s.name
+        """).fetchall()
+        return [row[0] for row in rows]
+
+    except Exception as e:
+        logger.error(f"Error loading student names: {e}")
+        return []
+
+
+def get_table_watermark(table):
+    """Get a cheap change marker for a table: (row count, max id, max timestamp), read from the row counters"""
+    if table not in ('predictions', 'parent_observations'):
+        raise ValueError(f"Unsupported table: {table}")
+
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    try:
+        return tuple(conn.execute(
+            f"SELECT row_count, (SELECT COALESCE(MAX(id), 0) FROM {table}), last_timestamp "
+            "FROM table_counters WHERE table_name = ?",
+            (table,)
+        ).fetchone())
+    except Exception as e:
+        logger.error(f"Error reading watermark for {table}: {e}")
+        return None
+
+
+def delete_records_before(table, cutoff, batch_size=5000):
+    """Delete rows older than cutoff in batches; returns the number of deleted rows"""
+    if table not in ('predictions', 'parent_observations'):
+        raise ValueError(f"Unsupported table: {table}")
+
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    deleted = 0
+    while True:
+        with conn:
+            cur = conn.execute(
+                f"DELETE FROM {table} WHERE id IN (SELECT id FROM {table} WHERE timestamp < ? LIMIT ?)",
+                (_to_iso(cutoff, None), batch_size)
+            )
+        deleted += cur.rowcount
+        if cur.rowcount < batch_size:
+            return deleted
+
+
+def delete_benchmark_students():
+    """Delete the benchmark students ('eduscan-benchmark-*') with their predictions and observations"""
+    conn = get_db_connection()
+    if not conn:
+        return
+
+    with conn:
+        for table in ('predictions', 'parent_observations'):
+            conn.execute(f"""
+                DELETE FROM {table} WHERE student_id IN (
+                    SELECT id FROM students WHERE name LIKE 'eduscan-benchmark-%'
+                )
+            """)
+        conn.execute("DELETE FROM students WHERE name LIKE 'eduscan-benchmark-%'")
+    _student_ids.clear()
+
+
+def close_connections():
+    """Close this thread's connections (e.g. before deleting the database file)"""
+    for conn in getattr(_local, 'connections', {}).values():
+        conn.close()
+    _local.connections = {}
+    _student_ids.clear()
+    _stats_cache.clear()
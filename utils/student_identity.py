@@ -0,0 +1,100 @@
+"""
+Student identity shared by the database backends
+A student is identified by (name, grade_level), enforced by a unique index.
+Each backend keeps an in-process LRU of key -> students.id, so repeat saves
+for the same student do not query the students table at all.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+# Maximum number of student ids kept per backend
+STUDENT_CACHE_SIZE = int(os.environ.get('EDUSCAN_STUDENT_CACHE_SIZE', 10000))
+
+STUDENT_KEY_INDEX = 'students_name_grade_level_key'
+
+# Tables with a student_id column referencing students
+STUDENT_REFERENCES = ('predictions', 'parent_observations', 'intervention_records')
+
+_DUPLICATES = """
+    SELECT s.id FROM students s
+    JOIN students k ON k.name = s.name AND k.grade_level = s.grade_level AND k.id < s.id
+"""
+
+
+def merge_duplicate_students_statements(tables=STUDENT_REFERENCES):
+    """
+    Portable (PostgreSQL and SQLite) statements that fold duplicate students
+    into the oldest row with the same key, repointing the given referencing
+    tables first; run them before creating the unique index
+    """
+    statements = ["UPDATE students SET grade_level = 'Unknown' WHERE grade_level IS NULL"]
+    for table in tables:
+        statements.append(f"""
+            UPDATE {table} SET student_id = (
+                SELECT MIN(k.id) FROM students s
+                JOIN students k ON k.name = s.name AND k.grade_level = s.grade_level
+                WHERE s.id = {table}.student_id
+            )
+            WHERE student_id IN ({_DUPLICATES})
+        """)
+    statements.append(f"DELETE FROM students WHERE id IN ({_DUPLICATES})")
+    return statements
+
+
+CREATE_STUDENT_KEY_INDEX = f"CREATE UNIQUE INDEX IF NOT EXISTS {STUDENT_KEY_INDEX} ON students (name, grade_level)"
+
+
+class StudentIdCache:
+    """Thread-safe LRU of student key -> students.id"""
+
+    def __init__(self, maxsize=STUDENT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        """Return the cached id for key, or None on a miss"""
+        with self._lock:
+            student_id = self._entries.get(key)
+            if student_id is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return student_id
+
+    def put(self, key, student_id):
+        """
+        Remember an id, evicting the least recently used entries when full
+
+        Only call this after the transaction that created the student has
+        committed, so a rolled back insert is never cached.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = student_id
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Forget all ids, e.g. after students were deleted or merged"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """Get size and hit counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0
+            }
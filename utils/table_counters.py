@@ -0,0 +1,283 @@
+"""
+Row counters shared by the database backends
+COUNT(*) scans the whole table, so the database statistics read row counts
+and the newest timestamps from a small table_counters table instead. Triggers
+keep it current on every insert, delete and truncate, whichever code path
+writes, and results are reused for a short TTL on top of that.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+# Seconds get_database_stats results are reused
+STATS_TTL = float(os.environ.get('EDUSCAN_DB_STATS_TTL', 30))
+
+# Accept PostgreSQL planner estimates instead of COUNT(*) for tables without a counter
+STATS_ESTIMATE = os.environ.get('EDUSCAN_DB_STATS_ESTIMATE', '').lower() in ('1', 'true', 'yes')
+
+# Counted table -> (statistics key, timestamp column tracked alongside the count)
+COUNTED_TABLES = {
+    'students': ('total_students', None),
+    'predictions': ('total_predictions', 'timestamp'),
+    'parent_observations': ('total_observations', 'timestamp'),
+    'users': ('total_users', None),
+    'intervention_records': ('total_interventions', None)
+}
+
+# Statistics key of the newest timestamp per table
+LAST_TIMESTAMP_KEYS = {
+    'predictions': 'last_prediction_date',
+    'parent_observations': 'last_observation_date'
+}
+
+CREATE_COUNTERS_TABLE = """
+    CREATE TABLE IF NOT EXISTS table_counters (
+        table_name VARCHAR(64) PRIMARY KEY,
+        row_count BIGINT NOT NULL DEFAULT 0,
+        last_timestamp TIMESTAMP
+    )
+"""
+
+SELECT_COUNTERS = "SELECT table_name, row_count, last_timestamp FROM table_counters"
+
+# One statement-level trigger function for all tables: it runs once per
+# INSERT/DELETE statement, so a bulk insert updates the counter row once
+_POSTGRES_COUNTER_FUNCTION = """
+    CREATE OR REPLACE FUNCTION table_counters_update() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        delta BIGINT;
+        newest TIMESTAMP;
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            UPDATE table_counters SET row_count = 0, last_timestamp = NULL WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END IF;
+
+        IF TG_OP = 'INSERT' THEN
+            IF TG_NARGS > 0 THEN
+                EXECUTE format('SELECT count(*), max(%I) FROM new_rows', TG_ARGV[0]) INTO delta, newest;
+            ELSE
+                SELECT count(*) INTO delta FROM new_rows;
+            END IF;
+            UPDATE table_counters SET row_count = row_count + delta, last_timestamp = GREATEST(last_timestamp, newest)
+            WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END IF;
+
+        IF TG_OP = 'DELETE' THEN
+            SELECT count(*) INTO delta FROM old_rows;
+            UPDATE table_counters SET row_count = row_count - delta WHERE table_name = TG_TABLE_NAME;
+        END IF;
+        -- Deleted or updated rows may have held the newest timestamp; the
+        -- timestamp index makes the recomputation a single lookup
+        IF TG_NARGS > 0 THEN
+            EXECUTE format(
+                'UPDATE table_counters SET last_timestamp = (SELECT max(%I) FROM %I.%I) WHERE table_name = $1',
+                TG_ARGV[0], TG_TABLE_SCHEMA, TG_TABLE_NAME
+            ) USING TG_TABLE_NAME;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+"""
+
+
+def _seed_counter(table):
+    """Statement (PostgreSQL and SQLite) that sets a counter from the table's current rows"""
+    # SQLite needs the WHERE to parse ON CONFLICT after INSERT ... SELECT
+    column = COUNTED_TABLES[table][1]
+    newest = f"MAX({column})" if column else "NULL"
+    return f"""
+        INSERT INTO table_counters (table_name, row_count, last_timestamp)
+        SELECT '{table}', COUNT(*), {newest} FROM {table} WHERE true
+        ON CONFLICT (table_name) DO UPDATE SET row_count = excluded.row_count, last_timestamp = excluded.last_timestamp
+    """
+
+
+def _postgres_counter_statements(tables):
+    statements = [_POSTGRES_COUNTER_FUNCTION]
+    for table in tables:
+        column = COUNTED_TABLES[table][1]
+        argument = f"'{column}'" if column else ""
+        statements += [
+            f"DROP TRIGGER IF EXISTS table_counters_insert ON {table}",
+            f"DROP TRIGGER IF EXISTS table_counters_delete ON {table}",
+            f"DROP TRIGGER IF EXISTS table_counters_truncate ON {table}",
+            f"""CREATE TRIGGER table_counters_insert AFTER INSERT ON {table}
+                REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION table_counters_update({argument})""",
+            f"""CREATE TRIGGER table_counters_delete AFTER DELETE ON {table}
+                REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION table_counters_update({argument})""",
+            f"""CREATE TRIGGER table_counters_truncate AFTER TRUNCATE ON {table}
+                FOR EACH STATEMENT EXECUTE FUNCTION table_counters_update()"""
+        ]
+        if column:
+            statements += [
+                f"DROP TRIGGER IF EXISTS table_counters_update ON {table}",
+                f"""CREATE TRIGGER table_counters_update AFTER UPDATE OF {column} ON {table}
+                    FOR EACH STATEMENT EXECUTE FUNCTION table_counters_update({argument})"""
+            ]
+        # Creating the triggers locked the table against writes, so the seed
+        # count cannot miss a row committed in between
+        statements.append(_seed_counter(table))
+    return statements
+
+
+def _sqlite_counter_statements(tables):
+    # SQLite only has row-level triggers; its single writer makes the
+    # per-row counter update uncontended
+    statements = []
+    for table in tables:
+        column = COUNTED_TABLES[table][1]
+        newest = newest_on_delete = ""
+        if column:
+            newest = (f", last_timestamp = CASE WHEN last_timestamp IS NULL OR NEW.{column} > last_timestamp "
+                      f"THEN NEW.{column} ELSE last_timestamp END")
+            newest_on_delete = (f", last_timestamp = CASE WHEN OLD.{column} >= last_timestamp "
+                                f"THEN (SELECT MAX({column}) FROM {table}) ELSE last_timestamp END")
+        statements += [
+            f"DROP TRIGGER IF EXISTS table_counters_{table}_insert",
+            f"DROP TRIGGER IF EXISTS table_counters_{table}_delete",
+            f"""CREATE TRIGGER table_counters_{table}_insert AFTER INSERT ON {table} BEGIN
+                UPDATE table_counters SET row_count = row_count + 1{newest} WHERE table_name = '{table}';
+            END""",
+            f"""CREATE TRIGGER table_counters_{table}_delete AFTER DELETE ON {table} BEGIN
+                UPDATE table_counters SET row_count = row_count - 1{newest_on_delete} WHERE table_name = '{table}';
+            END"""
+        ]
+        if column:
+            statements += [
+                f"DROP TRIGGER IF EXISTS table_counters_{table}_update",
+                f"""CREATE TRIGGER table_counters_{table}_update AFTER UPDATE OF {column} ON {table} BEGIN
+                    UPDATE table_counters SET last_timestamp = (SELECT MAX({column}) FROM {table})
+                    WHERE table_name = '{table}';
+                END"""
+            ]
+        statements.append(_seed_counter(table))
+    return statements
+
+
+def install_counters_statements(dialect, tables):
+    """
+    Statements that add counter triggers to the given tables and seed their
+    counters; run them in one transaction after CREATE_COUNTERS_TABLE
+
+    Args:
+        dialect (str): 'postgresql' or 'sqlite'
+        tables (list): counted tables that exist but have no counter row yet
+    """
+    if dialect == 'postgresql':
+        return _postgres_counter_statements(tables)
+    if dialect == 'sqlite':
+        return _sqlite_counter_statements(tables)
+    raise ValueError(f"Unsupported dialect: {dialect}")
+
+
+def combined_stats_query(tables, estimate=False):
+    """
+    One query returning every count and newest timestamp, for databases
+    without counters
+
+    With estimate (PostgreSQL only) counts come from pg_class.reltuples,
+    falling back to COUNT(*) for tables that were never analyzed.
+
+    Returns:
+        str: a query whose single row matches stats_columns(tables)
+    """
+    columns = []
+    for table in tables:
+        if estimate:
+            columns.append(f"""(SELECT CASE WHEN c.reltuples > 0 THEN c.reltuples::bigint
+                                       ELSE (SELECT COUNT(*) FROM {table}) END
+                                FROM pg_class c WHERE c.oid = '{table}'::regclass)""")
+        else:
+            columns.append(f"(SELECT COUNT(*) FROM {table})")
+    for table in LAST_TIMESTAMP_KEYS:
+        if table in tables:
+            columns.append(f"(SELECT MAX({COUNTED_TABLES[table][1]}) FROM {table})")
+    return "SELECT " + ",\n       ".join(columns)
+
+
+def stats_columns(tables):
+    """Statistics keys in the order of combined_stats_query's columns"""
+    return ([COUNTED_TABLES[table][0] for table in tables] +
+            [LAST_TIMESTAMP_KEYS[table] for table in LAST_TIMESTAMP_KEYS if table in tables])
+
+
+def _isoformat(value):
+    if isinstance(value, str):
+        # SQLite returns the stored text, e.g. SQLAlchemy's '2024-01-31 09:00:00.000000'
+        try:
+            return datetime.fromisoformat(value).isoformat()
+        except ValueError:
+            return value
+    return value.isoformat() if value is not None else None
+
+
+def empty_stats():
+    """Statistics reported when the database is unreachable"""
+    stats = {key: 0 for key, _ in COUNTED_TABLES.values()}
+    stats.update({key: None for key in LAST_TIMESTAMP_KEYS.values()})
+    return stats
+
+
+def stats_from_row(tables, row):
+    """Build the statistics dict from a combined_stats_query row"""
+    stats = empty_stats()
+    for key, value in zip(stats_columns(tables), row):
+        stats[key] = _isoformat(value) if key in LAST_TIMESTAMP_KEYS.values() else int(value)
+    return stats
+
+
+def stats_from_counters(rows):
+    """Build the statistics dict from SELECT_COUNTERS rows"""
+    stats = empty_stats()
+    for table, row_count, last_timestamp in rows:
+        if table not in COUNTED_TABLES:
+            continue
+        stats[COUNTED_TABLES[table][0]] = int(row_count)
+        if table in LAST_TIMESTAMP_KEYS:
+            stats[LAST_TIMESTAMP_KEYS[table]] = _isoformat(last_timestamp)
+    return stats
+
+
+class StatsCache:
+    """Thread-safe cache reusing statistics for `ttl` seconds"""
+
+    def __init__(self, ttl=STATS_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key, loader):
+        """
+        Return the cached value for key, calling loader() when it is missing
+        or older than the TTL
+
+        A None result (database unreachable) is returned but not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._hits += 1
+                return entry[1]
+
+            # Loading under the lock means concurrent reruns share one query
+            self._misses += 1
+            value = loader()
+            if value is not None and self.ttl > 0:
+                self._entries[key] = (time.monotonic(), value)
+            return value
+
+    def clear(self):
+        """Forget all cached statistics"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """Get size and hit counters"""
+        with self._lock:
+            return {'entries': len(self._entries), 'ttl': self.ttl, 'hits': self._hits, 'misses': self._misses}
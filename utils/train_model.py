@@ -0,0 +1,245 @@
+"""
+Reproducible training for the learning difficulty detector
+Replaces the manual GridSearchCV run in the training notebook. The grid
+search runs in parallel, every (parameters, fold) fit is cached by a hash of
+the data so repeat runs only fit what changed, and the result is written as a
+complete model package (model, scaler, feature order, metrics) into the
+model registry.
+
+Usage:
+    python -m utils.train_model student_learning_dataset.csv --workers 4 --promote
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from joblib import Memory, Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from utils.model_registry import get_registry_directory, promote, register_model
+
+# Column names used by the training dataset, in model input order
+TRAINING_COLUMNS = ['Math_Score', 'Reading_Score', 'Writing_Score', 'Attendance_Rate', 'Behavior_Score', 'Literacy_Level']
+
+# The same features as named by the app, accepted as an alternative
+APP_COLUMNS = ['math_score', 'reading_score', 'writing_score', 'attendance', 'behavior', 'literacy']
+
+DEFAULT_PARAM_GRID = {
+    'n_estimators': [100, 200],
+    'max_depth': [None, 10],
+    'min_samples_split': [2, 5],
+    'min_samples_leaf': [1, 2]
+}
+
+
+def get_cache_directory():
+    """Get the directory used to cache fitted folds"""
+    return os.path.join(os.path.dirname(get_registry_directory()), 'train_cache')
+
+
+def load_training_data(csv_path, target='Risk_Label'):
+    """Read a training CSV and return the feature matrix, labels and feature names"""
+    df = pd.read_csv(csv_path)
+    df.columns = df.columns.str.strip().str.replace(" ", "_")
+
+    if all(col in df.columns for col in TRAINING_COLUMNS):
+        feature_columns = TRAINING_COLUMNS
+    elif all(col in df.columns for col in APP_COLUMNS):
+        feature_columns = APP_COLUMNS
+    else:
+        raise ValueError(f"CSV must contain the columns {', '.join(TRAINING_COLUMNS)}")
+    if target not in df.columns:
+        raise ValueError(f"Missing target column: {target}")
+
+    df = df.dropna(subset=feature_columns + [target])
+    X = df[feature_columns].to_numpy(dtype=np.float64)
+    y = df[target].to_numpy()
+    return X, y, feature_columns
+
+
+def hash_training_data(X, y, **settings):
+    """Hash the training data and the settings that influence the fitted folds"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X).tobytes())
+    digest.update(np.ascontiguousarray(y).astype(str).astype('U').tobytes())
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def _fit_fold(data_hash, params, fold, n_folds, seed, X, y):
+    """Fit one parameter combination on one CV fold and return its F1 score"""
+    splits = list(StratifiedKFold(n_splits=n_folds).split(X, y))
+    train_index, test_index = splits[fold]
+
+    model = RandomForestClassifier(random_state=seed, n_jobs=1, **params)
+    model.fit(X[train_index], y[train_index])
+    return f1_score(y[test_index], model.predict(X[test_index]))
+
+
+def _fit_final(data_hash, params, seed, X, y):
+    """Refit the best parameters on the whole training split"""
+    model = RandomForestClassifier(random_state=seed, n_jobs=1, **params)
+    model.fit(X, y)
+    return model
+
+
+def train(csv_path, target='Risk_Label', param_grid=None, n_folds=5, test_size=0.2, seed=42,
+          workers=1, cache_dir=None):
+    """
+    Run the grid search and build a complete model package
+
+    Args:
+        csv_path (str): training CSV
+        target (str): label column
+        param_grid (dict): RandomForest parameter grid; defaults to the notebook's grid
+        n_folds (int): cross-validation folds
+        test_size (float): share of rows held out for the reported metrics
+        seed (int): random seed for the split and the forests
+        workers (int): parallel fits (-1 uses every core)
+        cache_dir (str): fitted-fold cache; defaults to data/train_cache
+
+    Returns:
+        dict: model package ready for load_model / the registry
+    """
+    param_grid = param_grid or DEFAULT_PARAM_GRID
+    start = time.perf_counter()
+
+    X, y, feature_columns = load_training_data(csv_path, target)
+    X_train_raw, X_test_raw, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed)
+
+    # Fit the scaler on the training split only, so test metrics are not leaked
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X_train_raw)
+    X_test = scaler.transform(X_test_raw)
+
+    data_hash = hash_training_data(X_train, y_train, n_folds=n_folds, seed=seed)
+    memory = Memory(cache_dir or get_cache_directory(), verbose=0)
+    fit_fold = memory.cache(_fit_fold, ignore=['X', 'y'])
+    fit_final = memory.cache(_fit_final, ignore=['X', 'y'])
+
+    candidates = [dict(zip(param_grid, values)) for values in itertools.product(*param_grid.values())]
+    jobs = [(params, fold) for params in candidates for fold in range(n_folds)]
+
+    # Only dispatch fits missing from the cache, so a repeat run on the same
+    # data does not even start worker processes
+    missing = [
+        (params, fold) for params, fold in jobs
+        if not fit_fold.check_call_in_cache(data_hash, params, fold, n_folds, seed, X_train, y_train)
+    ]
+    if missing:
+        Parallel(n_jobs=workers)(
+            delayed(fit_fold)(data_hash, params, fold, n_folds, seed, X_train, y_train)
+            for params, fold in missing
+        )
+    print(f"Fitted {len(missing)} of {len(jobs)} folds ({len(jobs) - len(missing)} cached)")
+    scores = [fit_fold(data_hash, params, fold, n_folds, seed, X_train, y_train) for params, fold in jobs]
+
+    cv_scores = [float(np.mean(scores[i * n_folds:(i + 1) * n_folds])) for i in range(len(candidates))]
+    best = int(np.argmax(cv_scores))
+    best_params = candidates[best]
+    model = fit_final(data_hash, best_params, seed, X_train, y_train)
+
+    y_pred = model.predict(X_test)
+    y_prob = model.predict_proba(X_test)[:, 1]
+    metrics = {
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'precision': float(precision_score(y_test, y_pred, zero_division=0)),
+        'recall': float(recall_score(y_test, y_pred, zero_division=0)),
+        'f1': float(f1_score(y_test, y_pred, zero_division=0)),
+        'roc_auc': float(roc_auc_score(y_test, y_prob)) if len(np.unique(y_test)) > 1 else None,
+        'cv_f1': cv_scores[best],
+        'n_train': int(len(y_train)),
+        'n_test': int(len(y_test))
+    }
+
+    elapsed = time.perf_counter() - start
+    print(f"Best parameters: {best_params} (CV F1 {cv_scores[best]:.3f}) in {elapsed:.1f} s")
+
+    return {
+        'model': model,
+        'scaler': scaler,
+        'feature_names': list(feature_columns),
+        'feature_order': list(feature_columns),
+        'model_type': 'RandomForestClassifier',
+        'version': '1.0',
+        'trained_on': os.path.basename(csv_path),
+        'trained_at': datetime.now().isoformat(),
+        'metrics': metrics,
+        'params': best_params,
+        'data_hash': data_hash,
+        'training_seconds': elapsed
+    }
+
+
+def train_and_register(csv_path, promote_model=False, notes='', **train_options):
+    """Train a model, store it as a new registry version and optionally promote it"""
+    package = train(csv_path, **train_options)
+
+    with tempfile.NamedTemporaryFile(suffix='.pkl', delete=False) as f:
+        pickle.dump(package, f)
+        package_path = f.name
+    try:
+        metadata = register_model(package_path, metrics=package['metrics'],
+                                  trained_at=package['trained_at'], notes=notes)
+    finally:
+        os.remove(package_path)
+
+    if promote_model:
+        promote(metadata['version'])
+    return metadata
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the EduScan learning difficulty detector")
+    parser.add_argument('csv', help="Training data CSV")
+    parser.add_argument('--target', default='Risk_Label')
+    parser.add_argument('--workers', type=int, default=-1, help="Parallel fits (-1 uses every core)")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--param-grid', help="Parameter grid as a JSON object")
+    parser.add_argument('--cache-dir')
+    parser.add_argument('--notes', default='')
+    parser.add_argument('--promote', action='store_true', help="Make the new version the active model")
+    args = parser.parse_args(argv)
+
+    try:
+        metadata = train_and_register(
+            args.csv,
+            promote_model=args.promote,
+            notes=args.notes,
+            target=args.target,
+            param_grid=json.loads(args.param_grid) if args.param_grid else None,
+            n_folds=args.folds,
+            test_size=args.test_size,
+            seed=args.seed,
+            workers=args.workers,
+            cache_dir=args.cache_dir
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    print(f"Registered {metadata['version']}: {json.dumps(metadata['metrics'])}")
+    if args.promote:
+        print(f"Promoted {metadata['version']}")
+    return 0
+
+
+if __name__ == '__main__':
+    # Import through the package so cached fits are keyed on utils.train_model,
+    # not __main__, and are shared with programmatic train() calls
+    from utils.train_model import main as package_main
+    sys.exit(package_main())
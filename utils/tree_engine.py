@@ -0,0 +1,177 @@
+"""
+Pure-NumPy inference engine for tree ensembles
+Flattens a fitted RandomForestClassifier into contiguous arrays and scores
+whole batches with vectorized traversal, without sklearn's per-call overhead
+"""
+
+import numpy as np
+
+
+class CompiledForest:
+    """
+    Flattened representation of a tree ensemble.
+
+    All trees share one set of node arrays. Leaves point to themselves as both
+    children, so every sample can simply be advanced max_depth times without
+    checking whether it already reached a leaf.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, classes, max_depth,
+                 cast_float32=True):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = max_depth
+        # sklearn casts inputs to float32 before comparing them to the
+        # float64 thresholds; doing the same keeps results bit-identical
+        self.cast_float32 = cast_float32
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def apply(self, X):
+        """Return the leaf index reached in every tree, shape (n_samples, n_trees)"""
+        X = np.asarray(X, dtype=np.float64)
+        if self.cast_float32:
+            X = X.astype(np.float32).astype(np.float64)
+
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        """Class probabilities, averaged over trees in the same order as sklearn"""
+        leaf_values = self.value[self.apply(X)]
+
+        # Accumulate tree by tree (not with a pairwise sum) so the floating
+        # point result matches RandomForestClassifier.predict_proba exactly
+        proba = np.zeros((leaf_values.shape[0], leaf_values.shape[2]), dtype=np.float64)
+        for tree in range(self.n_trees):
+            proba += leaf_values[:, tree]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        """Predicted class labels"""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def compile_forest(model):
+    """Compile a fitted RandomForestClassifier into a CompiledForest"""
+    estimators = getattr(model, 'estimators_', None)
+    if not estimators or not all(hasattr(tree, 'tree_') for tree in estimators):
+        raise TypeError(f"Cannot compile model of type {type(model).__name__}")
+    if getattr(model, 'n_outputs_', 1) != 1:
+        raise TypeError("Only single-output forests can be compiled")
+
+    n_classes = len(model.classes_)
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    max_depth = 0
+    offset = 0
+
+    for estimator in estimators:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left < 0
+
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+        # Normalize leaf values exactly like DecisionTreeClassifier.predict_proba
+        proba = tree.value[:, 0, :n_classes].astype(np.float64)
+        normalizer = proba.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(proba / normalizer)
+
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += tree.node_count
+
+    return CompiledForest(
+        feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+        threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+        left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+        right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+        value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+        roots=np.asarray(roots, dtype=np.intp),
+        classes=np.asarray(model.classes_),
+        max_depth=int(max_depth)
+    )
+
+
+def _scaled_goes_left(x, mean, scale, threshold):
+    """Split decision of the original pipeline: scale in float64, compare as float32"""
+    scaled = ((x - mean) / scale).astype(np.float32).astype(np.float64)
+    return scaled <= threshold
+
+
+def fuse_scaler(forest, mean, scale):
+    """
+    Fold a per-feature affine scaler into the split thresholds of a forest.
+
+    For each split the original decision float32((x - mean) / scale) <= t is
+    monotone in the raw value x, so it is equivalent to x <= T for a single
+    raw-space threshold T. T starts at t * scale + mean and is then refined
+    by bisection to the largest float64 that still goes left, which makes the
+    fused forest agree with the scaled pipeline on every input.
+    """
+    mean = np.zeros(forest.feature.max() + 1) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones_like(mean) if scale is None else np.asarray(scale, dtype=np.float64)
+
+    is_leaf = forest.left == np.arange(forest.n_nodes)
+    splits = np.flatnonzero(~is_leaf)
+    m = mean[forest.feature[splits]]
+    s = scale[forest.feature[splits]]
+    t = forest.threshold[splits]
+
+    # Bracket the exact boundary: lo goes left, hi goes right
+    estimate = t * s + m
+    delta = (np.abs(estimate) + np.abs(m) + 1.0) * 1e-6
+    lo, hi = estimate - delta, estimate + delta
+    for _ in range(64):
+        bad_lo = ~_scaled_goes_left(lo, m, s, t)
+        bad_hi = _scaled_goes_left(hi, m, s, t)
+        if not (bad_lo.any() or bad_hi.any()):
+            break
+        delta = np.where(bad_lo | bad_hi, delta * 2, delta)
+        lo = np.where(bad_lo, estimate - delta, lo)
+        hi = np.where(bad_hi, estimate + delta, hi)
+
+    # Bisect until lo and hi are adjacent floats
+    for _ in range(2100):
+        mid = lo + (hi - lo) / 2
+        open_interval = (mid != lo) & (mid != hi)
+        if not open_interval.any():
+            break
+        left = _scaled_goes_left(mid, m, s, t)
+        lo = np.where(open_interval & left, mid, lo)
+        hi = np.where(open_interval & ~left, mid, hi)
+
+    threshold = forest.threshold.copy()
+    threshold[splits] = lo
+
+    return CompiledForest(
+        feature=forest.feature,
+        threshold=threshold,
+        left=forest.left,
+        right=forest.right,
+        value=forest.value,
+        roots=forest.roots,
+        classes=forest.classes_,
+        max_depth=forest.max_depth,
+        cast_float32=False
+    )